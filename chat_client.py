@@ -31,6 +31,20 @@ peer_app = WeApRous()
 connected_peers = set()
 connected_peers_lock = threading.Lock()  # Lock để thread-safe
 
+# Bản sao cục bộ danh sách peer của 'general' và version của nó,
+# cập nhật bằng delta từ /get-list?since=<version>
+peer_list_cache = {}
+peer_list_version = None
+peer_list_lock = threading.Lock()
+# True khi luồng watch (long-poll /watch) đang giữ cache cập nhật:
+# get_peer_list() khi đó trả về cache, không cần hỏi tracker
+peer_list_watching = False
+WATCH_RETRY_DELAY = 2  # Giây chờ trước khi watch lại sau lỗi
+
+# Lease do tracker cấp ở /submit-info (giây); heartbeat 3 lần mỗi lease
+# để một heartbeat bị mất không làm peer bị coi là offline
+LEASE_TTL = 30
+
 
 
 
@@ -255,31 +269,9 @@ def register_to_tracker(username, password):
         return False
 
 
-def login_to_tracker(username, password):
-    payload = {'username': username, 'password': password}
-
-    response_body = call_API(
-        MY_IP, 
-        MY_PORT, 
-        'POST', 
-        '/login', 
-        payload
-    )
-
-    if response_body and response_body.get('status') == 200:
-        print("[Tracker] Login successful.")
-        return True
-    
-    else:
-        error_msg = response_body.get('message', 'Connection failed') if response_body else 'Cannot connect to tracker server. Make sure tracker server is running.'
-        print(f"[Tracker] Login failed: {error_msg}")
-        return False
-
-
-
-
-
 def submit_info_to_tracker():
+    global LEASE_TTL
+
     payload = {'username': MY_USERNAME, 'ip': MY_IP, 'port': MY_PEER_PORT}
 
     submit = call_API(
@@ -291,6 +283,7 @@ def submit_info_to_tracker():
     )
 
     if submit and submit.get('status') == 200:
+        LEASE_TTL = submit.get('ttl', LEASE_TTL)
         print("[Tracker] Send info to tracker successfully.")
         return True
     
@@ -299,6 +292,55 @@ def submit_info_to_tracker():
         return False
 
 
+def start_session(password, channels):
+    """
+    Khởi động phiên với tracker trong MỘT round trip (/batch): login,
+    submit-info, join các kênh, rồi lấy danh sách kênh. Batch dừng ở thao
+    tác đầu tiên lỗi (vd: sai mật khẩu thì không submit-info).
+    """
+    global LEASE_TTL
+
+    ops = [
+        {'path': '/login', 'body': {'username': MY_USERNAME, 'password': password}},
+        {'path': '/submit-info', 'body': {'username': MY_USERNAME, 'ip': MY_IP, 'port': MY_PEER_PORT}},
+    ]
+    ops += [{'path': '/join-channel', 'body': {'username': MY_USERNAME, 'channel': channel}}
+            for channel in channels]
+    ops.append({'path': '/get-channels'})
+
+    body = call_API(MY_IP, MY_PORT, 'POST', '/batch', {'ops': ops})
+    if not body or body.get('status') != 200:
+        print(f"[Tracker] Cannot start session: {body or 'Cannot connect to tracker server.'}")
+        return False
+
+    results = body.get('results', [])
+    for op, result in zip(ops, results):
+        if result.get('status') != 200:
+            print(f"[Tracker] {op['path']} failed: {result.get('message', result)}")
+            return False
+    if len(results) < len(ops):
+        return False
+
+    LEASE_TTL = results[1].get('ttl', LEASE_TTL)
+    print("[Tracker] Login successful, info submitted.")
+    for channel in channels:
+        print(f"[Tracker] Joined channel {channel}.")
+    print(f"[Tracker] {len(results[-1].get('channels', {}))} channel(s) on the tracker.")
+    return True
+
+
+def send_heartbeats():
+    """Luồng nền: gia hạn lease online; lease đã hết hạn thì gửi lại info."""
+    while True:
+        time.sleep(LEASE_TTL / 3.0)
+
+        body = call_API(MY_IP, MY_PORT, 'POST', '/heartbeat', {'username': MY_USERNAME})
+
+        if body and body.get('status') == 404:
+            print("[Tracker] Lease expired, submitting info again.")
+            submit_info_to_tracker()
+
+
 def logout_from_tracker():
     """Thông báo logout đến tracker server"""
     # Xóa tất cả connected peers
@@ -326,21 +368,73 @@ def logout_from_tracker():
 
 
 
+def _apply_peer_list(get_body):
+    """Áp dụng câu trả lời của /get-list hoặc /watch (full hoặc delta) vào cache."""
+    global peer_list_version
+
+    with peer_list_lock:
+        if get_body.get('full', True):
+            peer_list_cache.clear()
+            peer_list_cache.update(get_body.get('peers', {}))
+        else:
+            peer_list_cache.update(get_body.get('changed', {}))
+            for username in get_body.get('removed', []):
+                peer_list_cache.pop(username, None)
+        peer_list_version = get_body.get('version')
+        return dict(peer_list_cache)
+
+
 def get_peer_list():
+    if peer_list_watching:
+        with peer_list_lock:
+            return dict(peer_list_cache)
+
+    # Gửi version đã có để tracker chỉ trả về phần thay đổi
+    path = '/get-list'
+    if peer_list_version is not None:
+        path += f'?since={peer_list_version}'
+
     get_body = call_API(
         MY_IP,
         MY_PORT,
         'GET',
-        '/get-list',
+        path,
         dict=None
     )
 
     if get_body and get_body.get('status') == 200:
-        return get_body.get('peers', {})
+        return _apply_peer_list(get_body)
     
     else:
         print(f"[Tracker] Failed to get peer list: {get_body}")
         return {}
+
+
+def watch_peer_list():
+    """
+    Luồng nền: long-poll /watch?since=<version> liên tục, tracker chỉ trả lời
+    khi danh sách peer của 'general' thay đổi (hoặc hết timeout), thay cho
+    việc hỏi /get-list mỗi lần cần danh sách peer.
+    Long-poll giữ kết nối đến 25s nhưng không chiếm worker của tracker
+    (/watch là route long_lived, nằm ngoài --max-in-flight); vượt
+    --max-long-lived thì nhận 503 và quay về /get-list một lúc.
+    """
+    global peer_list_watching
+
+    while True:
+        path = '/watch'
+        if peer_list_version is not None:
+            path += f'?since={peer_list_version}'
+
+        get_body = call_API(MY_IP, MY_PORT, 'GET', path, dict=None)
+
+        if get_body and get_body.get('status') == 200:
+            _apply_peer_list(get_body)
+            peer_list_watching = True
+        else:
+            # Tracker không trả lời: quay lại hỏi /get-list cho đến khi watch được
+            peer_list_watching = False
+            time.sleep(WATCH_RETRY_DELAY)
     
 
 
@@ -830,16 +924,14 @@ if __name__ == "__main__":
     parser.add_argument("username", help="Tên đăng nhập của bạn (vd: alice, bob)")
     parser.add_argument("password", help="Mật khẩu của bạn (vd: 123, 456)")
     parser.add_argument("port", type=int, help="Cổng P2P bạn muốn lắng nghe (vd: 9001, 9002)")
+    parser.add_argument("--join", nargs='*', default=[], metavar="CHANNEL",
+                        help="Các kênh tham gia ngay khi khởi động")
     args = parser.parse_args()
 
     MY_USERNAME = args.username
     MY_PEER_PORT = args.port
 
-    # 1. Đăng nhập vào Tracker
-    if not login_to_tracker(MY_USERNAME, args.password):
-        exit()
-
-    # 2. Khởi động P2P Server (trên luồng riêng)
+    # 1. Khởi động P2P Server (trên luồng riêng)
     # daemon=True để luồng này tự tắt khi chương trình chính (UI) thoát
     server_thread = threading.Thread(target=start_p2p_server, daemon=True)
     server_thread.start()
@@ -847,8 +939,15 @@ if __name__ == "__main__":
     # Chờ server khởi động một chút
     time.sleep(3) 
 
-    # 3. Gửi thông tin IP/Port của P2P server cho Tracker
-    submit_info_to_tracker()
+    # 2-3. Đăng nhập, gửi IP/Port của P2P server và join kênh: một /batch
+    if not start_session(args.password, args.join):
+        exit()
+
+    # Giữ lease online bằng heartbeat
+    threading.Thread(target=send_heartbeats, daemon=True).start()
+
+    # Theo dõi thay đổi danh sách peer (push) thay vì hỏi lại tracker mỗi lần
+    threading.Thread(target=watch_peer_list, daemon=True).start()
 
     # 4. Khởi động UI (trên luồng chính)
     try:
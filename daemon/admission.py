@@ -0,0 +1,231 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.admission
+~~~~~~~~~~~~~~~~~
+
+This module provides the admission control of the backend server.
+
+Accepted connections wait in a bounded queue served by a fixed number of
+worker threads (the maximum number of requests in flight). Under overload
+some requests are refused quickly with ``503 Service Unavailable`` and a
+``Retry-After`` header, so the latency of the admitted requests stays bounded:
+
+- a connection arriving on a full queue is shed at once;
+- a connection taken from the queue is shed when it waited too long, with a
+  controlled-delay (CoDel-style) bound: while the queue keeps draining the
+  allowed wait is ``interval``, but once the queue has not been empty for a
+  whole ``interval`` (a standing queue) the allowed wait drops to ``target``.
+
+Long-lived requests (long polls, event streams: routes declared with
+``long_lived=True``) would pin a worker each for as long as they stay open,
+so a few idle watchers could get ordinary requests shed. Once such a
+request is parsed, its worker :meth:`detaches <AdmissionController.detach>`
+it: the request leaves the in-flight count for a separate bound,
+``max_long_lived`` (beyond it the request gets a 503), and a new worker
+takes the freed place in the pool.
+
+Usage Example:
+--------------
+>>> admission = AdmissionController(max_in_flight=16, target=0.05, interval=0.5)
+>>> create_backend("127.0.0.1", 9000, routes, admission=admission)
+"""
+
+import collections
+import threading
+import time
+
+#: Queue wait tolerated while a standing queue exists, in seconds.
+DEFAULT_TARGET = 0.05
+
+#: Window after which a never-empty queue counts as standing, and queue wait
+#: tolerated otherwise, in seconds.
+DEFAULT_INTERVAL = 0.5
+
+#: Seconds suggested to shed clients through ``Retry-After``.
+DEFAULT_RETRY_AFTER = 1
+
+#: Default number of long-lived requests held outside the worker pool.
+DEFAULT_MAX_LONG_LIVED = 256
+
+#: Sheds between two summary lines in the log.
+LOG_EVERY = 100
+
+
+def overloaded_response(retry_after=DEFAULT_RETRY_AFTER):
+    """
+    Builds the response of a shed request.
+
+    :param retry_after (int): seconds the client should wait before retrying.
+
+    :rtype bytes: encoded ``503 Service Unavailable`` response.
+    """
+    body = "503 Service Unavailable"
+    return (
+        "HTTP/1.1 503 Service Unavailable\r\n"
+        "Content-Type: text/plain\r\n"
+        "Content-Length: {}\r\n"
+        "Retry-After: {}\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+        "{}"
+    ).format(len(body), retry_after, body).encode('utf-8')
+
+
+class AdmissionController:
+    """
+    Bounded request queue with controlled-delay shedding.
+
+    :attrs max_in_flight (int): requests handled concurrently (worker count).
+    :attrs max_queue (int): connections allowed to wait for a worker.
+    :attrs target (float): tolerated wait under a standing queue, in seconds.
+    :attrs interval (float): standing-queue window and normal tolerated wait.
+    :attrs retry_after (int): ``Retry-After`` of shed responses.
+    :attrs max_long_lived (int): long-lived requests held outside the pool.
+    :attrs admitted (int): requests handed to a worker.
+    :attrs shed_queue_full (int): connections shed because the queue was full.
+    :attrs shed_delay (int): connections shed because they waited too long.
+    :attrs shed_long_lived (int): long-lived requests refused, bound reached.
+    """
+
+    def __init__(self, max_in_flight, max_queue=None, target=DEFAULT_TARGET,
+                 interval=DEFAULT_INTERVAL, retry_after=DEFAULT_RETRY_AFTER,
+                 max_long_lived=DEFAULT_MAX_LONG_LIVED):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(1, int(max_queue)) if max_queue else 4 * self.max_in_flight
+        self.target = float(target)
+        self.interval = float(interval)
+        self.retry_after = retry_after
+        self.max_long_lived = max(0, int(max_long_lived))
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_delay = 0
+        self.shed_long_lived = 0
+        self.in_flight = 0
+        self.long_lived = 0
+        self.max_sojourn = 0.0
+        self._queue = collections.deque()
+        self._last_empty = time.monotonic()
+        self._stopped = False
+        self._cond = threading.Condition()
+
+    def submit(self, conn, addr):
+        """
+        Queues an accepted connection.
+
+        :param conn (socket.socket): client connection socket.
+        :param addr (tuple): client address.
+
+        :rtype bool: ``False`` when the queue is full and the caller must shed.
+        """
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.shed_queue_full += 1
+                self._log_shed()
+                return False
+            self._queue.append((conn, addr, time.monotonic()))
+            self._cond.notify()
+            return True
+
+    def take(self):
+        """
+        Waits for the next queued connection (called by the workers).
+
+        :rtype tuple: ``(conn, addr, shed)``; ``shed`` is ``True`` when the
+                      connection waited beyond the current bound. ``None``
+                      once the controller is stopped.
+        """
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            conn, addr, enqueued_at = self._queue.popleft()
+            now = time.monotonic()
+            if not self._queue:
+                self._last_empty = now
+
+            sojourn = now - enqueued_at
+            self.max_sojourn = max(self.max_sojourn, sojourn)
+            standing = now - self._last_empty > self.interval
+            if sojourn > (self.target if standing else self.interval):
+                self.shed_delay += 1
+                self._log_shed()
+                return conn, addr, True
+            self.admitted += 1
+            self.in_flight += 1
+            return conn, addr, False
+
+    def detach(self):
+        """
+        Moves an admitted request out of the in-flight count, as a
+        long-lived one; its worker then leaves the pool for a new one.
+
+        :rtype bool: ``False`` when ``max_long_lived`` are already held and
+                     the request must be refused.
+        """
+        with self._cond:
+            if self.long_lived >= self.max_long_lived:
+                self.shed_long_lived += 1
+                self._log_shed()
+                return False
+            self.in_flight -= 1
+            self.long_lived += 1
+            return True
+
+    def done(self, detached=False):
+        """Marks an admitted request as finished (``detached``: see :meth:`detach`)."""
+        with self._cond:
+            if detached:
+                self.long_lived -= 1
+            else:
+                self.in_flight -= 1
+
+    def stop(self):
+        """Wakes the workers up and makes them exit; the connections still
+        queued are closed."""
+        with self._cond:
+            self._stopped = True
+            queued, self._queue = self._queue, collections.deque()
+            self._cond.notify_all()
+        for conn, addr, enqueued_at in queued:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _log_shed(self):
+        shed = self.shed_queue_full + self.shed_delay + self.shed_long_lived
+        if shed == 1 or shed % LOG_EVERY == 0:
+            print("[Admission] Shedding load: {}".format(self._stats()))
+
+    def _stats(self):
+        return {
+            'admitted': self.admitted,
+            'shed_queue_full': self.shed_queue_full,
+            'shed_delay': self.shed_delay,
+            'shed_long_lived': self.shed_long_lived,
+            'in_flight': self.in_flight,
+            'long_lived': self.long_lived,
+            'queued': len(self._queue),
+            'max_sojourn_ms': round(self.max_sojourn * 1000, 1),
+        }
+
+    def stats(self):
+        """
+        Returns the admission counters.
+
+        :rtype dict: admitted and shed requests, current load, worst queue wait.
+        """
+        with self._cond:
+            return self._stats()
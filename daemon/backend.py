@@ -30,25 +30,43 @@ Requirements:
 
 Notes:
 ------
-- The server create daemon threads for client handling.
+- The server create daemon threads for client handling. With an
+  :class:`AdmissionController <AdmissionController>` a fixed pool of workers
+  serves a bounded queue instead, and excess load is shed with 503.
 - The current implementation error handling is minimal, socket errors are printed to the console.
 - The actual request processing is delegated to the HttpAdapter class.
 
 Usage Example:
 --------------
 >>> create_backend("127.0.0.1", 9000, routes={})
+>>> create_backend("127.0.0.1", 9000, routes={}, unix_path="/run/weaprous/app.sock")
 
 """
 
+import os
+import itertools
 import socket
+import selectors
 import threading
+import time
 import argparse
 
 from .response import *
 from .httpadapter import HttpAdapter
 from .dictionary import CaseInsensitiveDict
+from .admission import overloaded_response
+from .lifecycle import Lifecycle, accept, create_listener
 
-def handle_client(ip, port, conn, addr, routes):
+#: Default length of the kernel accept queue (``listen`` backlog).
+DEFAULT_BACKLOG = 50
+
+#: Seconds spent reading the request of a connection being shed.
+SHED_READ_TIMEOUT = 0.1
+
+#: Connections being shed at once; beyond, one is closed unanswered.
+MAX_SHEDDING = 1024
+
+def handle_client(ip, port, conn, addr, routes, deadlines=None, detach=None):
     """
     Initializes an HttpAdapter instance and delegates the client handling logic to it.
 
@@ -57,63 +75,287 @@ def handle_client(ip, port, conn, addr, routes):
     :param conn (socket.socket): Client connection socket.
     :param addr (tuple): client address (IP, port).
     :param routes (dict): Dictionary of route handlers.
+    :param deadlines (ClientDeadlines): slow-client read/write limits.
+    :param detach (callable): called before a long-lived hook runs.
     """
-    daemon = HttpAdapter(ip, port, conn, addr, routes)
+    daemon = HttpAdapter(ip, port, conn, addr, routes, deadlines, detach)
 
     # Handle client
     daemon.handle_client(conn, addr, routes)
 
-def run_backend(ip, port, routes):
+class _Shedder:
+    """
+    Answers the connections refused by admission control with a fast 503,
+    off the accept loop and the workers: one thread multiplexes them with a
+    selector, waiting up to :data:`SHED_READ_TIMEOUT` for each request so it
+    is consumed first (closing with unread data sends a reset and the client
+    would never see the 503).
+
+    :attrs response (bytes): the 503 response sent.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._incoming = []
+        self._count = 0
+        self._stopped = False
+        # Connections being read, oldest first: they share one timeout, so
+        # insertion order is deadline order
+        self._deadlines = {}
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, name="BackendShedder", daemon=True)
+        self._thread.start()
+
+    def shed(self, conn):
+        """Hands a connection over to be answered; never blocks."""
+        with self._lock:
+            refused = self._stopped or self._count >= MAX_SHEDDING
+            if not refused:
+                self._incoming.append(conn)
+                self._count += 1
+        if refused:
+            conn.close()
+            return
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            # Wake-up buffer full: the thread is already due to wake up
+            pass
+
+    def stop(self):
+        """Answers the connections still pending and stops the thread."""
+        with self._lock:
+            self._stopped = True
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+        self._thread.join()
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _answer(self, conn):
+        self._selector.unregister(conn)
+        del self._deadlines[conn]
+        try:
+            conn.recv(4096)
+        except OSError:
+            pass
+        try:
+            conn.send(self.response)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        with self._lock:
+            self._count -= 1
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._deadlines:
+                timeout = max(0, next(iter(self._deadlines.values())) - time.monotonic())
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is not self._wake_r:
+                    self._answer(key.fileobj)
+                    continue
+                try:
+                    while self._wake_r.recv(4096):
+                        pass
+                except OSError:
+                    pass
+                with self._lock:
+                    incoming, self._incoming = self._incoming, []
+                    stopped = self._stopped
+                deadline = time.monotonic() + SHED_READ_TIMEOUT
+                for conn in incoming:
+                    conn.setblocking(False)
+                    self._selector.register(conn, selectors.EVENT_READ)
+                    self._deadlines[conn] = deadline
+                if stopped:
+                    for conn in list(self._deadlines):
+                        self._answer(conn)
+                    return
+            now = time.monotonic()
+            while self._deadlines:
+                conn, deadline = next(iter(self._deadlines.items()))
+                if deadline > now:
+                    break
+                self._answer(conn)
+
+def _serve(ip, port, conn, addr, routes, deadlines, lifecycle, detach=None):
+    """Handles one client and reports its end to the drain counter."""
+    try:
+        handle_client(ip, port, conn, addr, routes, deadlines, detach)
+    except Exception as e:
+        print("[Backend] Error handling {}: {}".format(addr, e))
+    finally:
+        lifecycle.in_flight.exit()
+
+_worker_ids = itertools.count()
+
+def _start_worker(ip, port, routes, admission, shedder, deadlines, lifecycle):
+    threading.Thread(target=_admission_worker,
+                     args=(ip, port, routes, admission, shedder, deadlines, lifecycle),
+                     name="BackendWorker-{}".format(next(_worker_ids)), daemon=True).start()
+
+def _admission_worker(ip, port, routes, admission, shedder, deadlines, lifecycle):
+    """
+    Worker thread serving the admission queue until the controller stops,
+    or until it serves a long-lived request: a new worker then takes its
+    place in the pool.
+
+    :param admission (AdmissionController): queue shared with the accept loop.
+    :param shedder (_Shedder): answers the connections that waited too long.
+    :param deadlines (ClientDeadlines): slow-client read/write limits.
+    :param lifecycle (Lifecycle): drain counter of the server.
+    """
+    while True:
+        item = admission.take()
+        if item is None:
+            return
+        conn, addr, shed = item
+        if shed:
+            shedder.shed(conn)
+            lifecycle.in_flight.exit()
+            continue
+        detached = []
+
+        def detach():
+            if not admission.detach():
+                return False
+            detached.append(True)
+            _start_worker(ip, port, routes, admission, shedder, deadlines, lifecycle)
+            return True
+
+        try:
+            _serve(ip, port, conn, addr, routes, deadlines, lifecycle, detach)
+        finally:
+            admission.done(bool(detached))
+        if detached:
+            return
+
+def run_backend(ip, port, routes, unix_path=None, backlog=DEFAULT_BACKLOG, admission=None,
+                deadlines=None, lifecycle=None, reuse_port=False):
     """
     Starts the backend server, binds to the specified IP and port, and listens for incoming
     connections. Each connection is handled in a separate thread. The backend accepts incoming
     connections and spawns a thread for each client.
 
+    With ``unix_path`` the server listens on a Unix domain socket instead, so a
+    co-located proxy can reach it with ``proxy_pass unix:/path.sock;`` without
+    going through the TCP loopback stack.
+
+    With ``admission`` the accepted connections are queued for
+    ``admission.max_in_flight`` worker threads; a full queue or a request
+    that waited too long is answered ``503`` with ``Retry-After``. Requests
+    of ``long_lived`` routes leave the pool once parsed (up to
+    ``admission.max_long_lived`` of them).
+
+    On Ctrl+C or ``SIGTERM`` the server stops accepting and lets the requests
+    in flight finish (up to ``lifecycle.drain_timeout``); on ``SIGUSR2`` it
+    hands its listening socket to a new copy of itself before draining.
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict): Dictionary of route handlers.
+    :param unix_path (str): optional Unix domain socket path to listen on.
+    :param backlog (int): length of the kernel accept queue.
+    :param admission (AdmissionController): optional admission control.
+    :param deadlines (ClientDeadlines): header/body/write deadlines and minimum
+                                        transfer rate imposed on clients.
+    :param lifecycle (Lifecycle): stop/restart control, created when omitted.
+    :param reuse_port (bool): bind with ``SO_REUSEPORT`` so that a new instance
+                              can start on the same port before this one stops.
     """
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
+    lifecycle = lifecycle or Lifecycle("Backend")
+    server = None
+    shedder = None
 
     try:
-        server.bind((ip, port))
-        server.listen(50)
-        print("[Backend] Listening on port {}".format(port))
+        if unix_path:
+            server, inherited = create_listener(socket.AF_UNIX, unix_path, backlog)
+            print("[Backend] Listening on unix:{}".format(unix_path))
+        else:
+            server, inherited = create_listener(socket.AF_INET, (ip, port), backlog, reuse_port)
+            print("[Backend] Listening on port {}".format(port))
         if routes != {}:
             print("[Backend] route settings {}".format(routes))
 
+        if admission is not None:
+            shedder = _Shedder(overloaded_response(admission.retry_after))
+            for i in range(admission.max_in_flight):
+                _start_worker(ip, port, routes, admission, shedder, deadlines, lifecycle)
+            print("[Backend] Admission control: {} worker(s), queue {}, target {}s, interval {}s, "
+                  "long-lived {}".format(admission.max_in_flight, admission.max_queue, admission.target,
+                                         admission.interval, admission.max_long_lived))
+
+        lifecycle.install_signal_handlers(server)
+        lifecycle.notify_ready()
+
         while True:
-            conn, addr = server.accept()
+            accepted = accept(server, lifecycle)
+            if accepted is None:
+                break
+            conn, addr = accepted
+            lifecycle.in_flight.enter()
+            if admission is not None:
+                if not admission.submit(conn, addr):
+                    shedder.shed(conn)
+                    lifecycle.in_flight.exit()
+                continue
             client_thread = threading.Thread(
-                target=handle_client,
-                args=(ip, port, conn, addr, routes),
+                target=_serve,
+                args=(ip, port, conn, addr, routes, deadlines, lifecycle),
                 daemon=True
             )
             client_thread.start()
-            print("[Backend] Started thread {} for client {}".format(client_thread.name, addr))
-            #
-            #  TODO: implement the step of the client incomping connection
-            #        using multi-thread programming with the
-            #        provided handle_client routine
-            #
     except socket.error as e:
         print("Socket error: {}".format(e))
     except KeyboardInterrupt:
         print("\n [Backend] Server is shutting down.")
     finally:
-        server.close()
+        # Stop accepting, then let the requests in flight finish
+        if server is not None:
+            server.close()
+        lifecycle.drain()
+        if admission is not None:
+            admission.stop()
+            if shedder is not None:
+                shedder.stop()
+            print("[Backend] Admission stats: {}".format(admission.stats()))
+        if unix_path and not lifecycle.handed_over:
+            try:
+                os.unlink(unix_path)
+            except OSError:
+                pass
         print("[Backend] Server socket closed.")
 
-def create_backend(ip, port, routes={}):
+def create_backend(ip, port, routes={}, unix_path=None, backlog=DEFAULT_BACKLOG, admission=None,
+                   deadlines=None, lifecycle=None, reuse_port=False):
     """
     Entry point for creating and running the backend server.
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict, optional): Dictionary of route handlers. Defaults to empty dict.
+    :param unix_path (str, optional): listen on this Unix domain socket instead of TCP.
+    :param backlog (int, optional): length of the kernel accept queue.
+    :param admission (AdmissionController, optional): bounded in-flight
+                     requests with load shedding; unbounded threads when omitted.
+    :param deadlines (ClientDeadlines, optional): slow-client limits, the
+                     ``daemon.deadline`` defaults when omitted.
+    :param lifecycle (Lifecycle, optional): graceful stop and restart control.
+    :param reuse_port (bool, optional): bind with ``SO_REUSEPORT``.
     """
-    print("[Backend] Starting Backend Server on {}:{}".format(ip, port))
-    run_backend(ip, port, routes)
\ No newline at end of file
+    if unix_path:
+        print("[Backend] Starting Backend Server on unix:{}".format(unix_path))
+    else:
+        print("[Backend] Starting Backend Server on {}:{}".format(ip, port))
+    run_backend(ip, port, routes, unix_path, backlog, admission, deadlines, lifecycle, reuse_port)
\ No newline at end of file
@@ -0,0 +1,539 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.balancer
+~~~~~~~~~~~~~~~~~
+
+This module provides the load-balancing primitives used by the proxy to pick
+an upstream among several ``proxy_pass`` alternatives of a virtual host.
+
+Every upstream address is represented by a single :class:`Backend <Backend>`
+object shared by all hosts that point to it, so the live in-flight counter
+reflects the real load of the backend. The weight and the failure settings
+are per group membership: an :class:`Upstream <Upstream>` pairs the backend
+with them (and with its ejection and breaker state), so two hosts giving
+the same address different weights or ``max_fails`` do not override each
+other. An :class:`UpstreamGroup <UpstreamGroup>` applies the host's
+``dist_policy`` on top of its upstreams.
+
+Only available upstreams are selected: an upstream is unavailable while the
+active health checker reports it down or while it is ejected after
+``max_fails`` consecutive forwarding failures (for ``fail_timeout`` seconds).
+An upstream whose :class:`CircuitBreaker <CircuitBreaker>` is open (or busy
+with its half-open trial) is unavailable as well. When every upstream of a
+group is unavailable, the group fails open.
+
+Supported policies:
+-------------------
+- round-robin: smooth weighted round-robin (plain rotation when all weights are equal).
+- least-conn: upstream with the fewest in-flight requests relative to its weight.
+- power-of-two: two random upstreams are sampled and the less loaded one wins.
+- hash: consistent hashing of a request key (client IP, header, cookie or JSON
+  field) onto a ring of virtual nodes, so a given key sticks to one upstream
+  and adding or removing an upstream only remaps about 1/N of the keys.
+
+Usage Example:
+--------------
+>>> group = UpstreamGroup([get_upstream('127.0.0.1:9001', 3),
+...                        get_upstream('127.0.0.1:9002')], 'least-conn')
+>>> upstream = group.select()
+>>> upstream.acquire()
+>>> upstream.release()
+"""
+
+import bisect
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+
+from .breaker import CircuitBreaker, DEFAULT_THRESHOLD, DEFAULT_RESET_TIMEOUT
+
+#: Policy names accepted by ``dist_policy`` mapped to their canonical form.
+POLICY_ALIASES = {
+    'round-robin': 'round-robin',
+    'roundrobin': 'round-robin',
+    'rr': 'round-robin',
+    'weighted-round-robin': 'round-robin',
+    'wrr': 'round-robin',
+    'least-conn': 'least-conn',
+    'least_conn': 'least-conn',
+    'leastconn': 'least-conn',
+    'power-of-two': 'power-of-two',
+    'p2c': 'power-of-two',
+    'random-two': 'power-of-two',
+    'hash': 'hash',
+    'consistent-hash': 'hash',
+}
+
+DEFAULT_POLICY = 'round-robin'
+
+#: Virtual nodes placed on the hash ring per unit of weight.
+DEFAULT_VNODES = 160
+
+#: Hash key used when ``hash_key`` is not configured.
+DEFAULT_HASH_KEY = ('ip', None)
+
+#: Consecutive forwarding failures before an upstream is ejected.
+DEFAULT_MAX_FAILS = 3
+
+#: Seconds an ejected upstream stays out of rotation.
+DEFAULT_FAIL_TIMEOUT = 10.0
+
+#: Address prefix of upstreams reached over a Unix domain socket.
+UNIX_PREFIX = 'unix:'
+
+
+def normalize_policy(policy):
+    """
+    Maps a ``dist_policy`` value to its canonical policy name.
+
+    :param policy (str): policy name as written in the configuration.
+
+    :rtype str: canonical policy name, ``round-robin`` for unknown values.
+    """
+    if not policy:
+        return DEFAULT_POLICY
+    canonical = POLICY_ALIASES.get(policy.strip().lower())
+    if canonical is None:
+        print("[Balancer] Unknown policy '{}', falling back to {}".format(policy, DEFAULT_POLICY))
+        return DEFAULT_POLICY
+    return canonical
+
+
+class Backend:
+    """
+    A backend address, shared by every group that forwards to it, with the
+    number of requests currently being forwarded to it and its health.
+
+    :attrs address (str): ``host:port`` or ``unix:/path.sock`` string as
+                          written in ``proxy_pass``.
+    :attrs host (str): backend host (``localhost`` for a Unix socket).
+    :attrs port (int): backend port (``None`` for a Unix socket).
+    :attrs path (str): Unix domain socket path, ``None`` for a TCP upstream.
+    :attrs in_flight (int): live count of requests forwarded and not finished.
+    :attrs healthy (bool): verdict of the active health checker.
+    :attrs upstreams (list): the :class:`Upstream <Upstream>` memberships of the backend.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        if address.startswith(UNIX_PREFIX):
+            self.path = address[len(UNIX_PREFIX):]
+            self.host, self.port = 'localhost', None
+        else:
+            host, _, port = address.rpartition(':')
+            self.path = None
+            self.host = host or address
+            self.port = int(port) if port.isdigit() else 80
+        self.in_flight = 0
+        self.healthy = True
+        self.upstreams = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Marks a request as in flight on this backend."""
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        """Marks a previously acquired request as finished."""
+        with self._lock:
+            if self.in_flight > 0:
+                self.in_flight -= 1
+
+    def readmit(self):
+        """Forgets the failure streaks of the backend's upstreams, when the
+        health checker sees it come back up; ejections and breakers keep
+        their own timers."""
+        for upstream in list(self.upstreams):
+            upstream.readmit()
+
+    def __repr__(self):
+        return "<Backend {} in_flight={}>".format(self.address, self.in_flight)
+
+
+class Upstream:
+    """
+    A backend as a member of upstream groups: its weight and its passive
+    ejection and circuit breaker settings, with their failure state. Groups
+    configuring a backend alike share one object; groups configuring it
+    differently each get their own, over the same :class:`Backend <Backend>`.
+
+    :attrs backend (Backend): the shared backend (address, load, health).
+    :attrs weight (int): relative share of traffic (>= 1).
+    :attrs failures (int): consecutive failed forwards.
+    :attrs ejected_until (float): monotonic time until which the upstream is ejected.
+    :attrs max_fails (int): failures before ejection.
+    :attrs fail_timeout (float): ejection duration in seconds.
+    :attrs breaker (CircuitBreaker): circuit breaker of the upstream.
+    """
+
+    def __init__(self, backend, weight=1, max_fails=DEFAULT_MAX_FAILS, fail_timeout=DEFAULT_FAIL_TIMEOUT,
+                 breaker_threshold=DEFAULT_THRESHOLD, breaker_reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.backend = backend
+        self.address = backend.address
+        self.host = backend.host
+        self.port = backend.port
+        self.path = backend.path
+        self.weight = max(1, int(weight))
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.max_fails = max_fails
+        self.fail_timeout = fail_timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout)
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return self.backend.in_flight
+
+    @property
+    def healthy(self):
+        return self.backend.healthy
+
+    @healthy.setter
+    def healthy(self, value):
+        self.backend.healthy = value
+
+    def acquire(self):
+        """Marks a request as in flight on the backend."""
+        self.backend.acquire()
+
+    def release(self):
+        """Marks a previously acquired request as finished."""
+        self.backend.release()
+
+    def load(self):
+        """
+        In-flight requests normalized by weight, used by the load-aware policies.
+
+        :rtype float: lower values mean a less loaded upstream.
+        """
+        return self.backend.in_flight / float(self.weight)
+
+    def available(self, now=None):
+        """
+        Tells whether the upstream may receive traffic.
+
+        :param now (float): current ``time.monotonic()``, computed when omitted.
+
+        :rtype bool: healthy, not ejected and with a closed (or due) circuit.
+        """
+        if not self.backend.healthy:
+            return False
+        now = now if now is not None else time.monotonic()
+        if self.ejected_until and now < self.ejected_until:
+            return False
+        return self.breaker.ready(now)
+
+    def report_success(self):
+        """
+        Records a successful forward: resets the failure streak, readmits an
+        ejected upstream and closes the circuit. Only real proxied responses
+        call it; the health checker uses :meth:`readmit`.
+        """
+        with self._lock:
+            self.failures = 0
+            self.ejected_until = 0.0
+        self.breaker.record_success()
+
+    def readmit(self):
+        """Forgets the failure streak (the backend came back up)."""
+        with self._lock:
+            self.failures = 0
+
+    def report_failure(self):
+        """
+        Records a failed forward and ejects the upstream for ``fail_timeout``
+        seconds once ``max_fails`` consecutive failures are reached.
+        """
+        self.breaker.record_failure()
+        with self._lock:
+            self.failures += 1
+            if self.failures < self.max_fails:
+                return
+            self.failures = 0
+            self.ejected_until = time.monotonic() + self.fail_timeout
+        print("[Balancer] Ejected upstream {} for {}s".format(self.address, self.fail_timeout))
+
+    def __repr__(self):
+        return "<Upstream {} weight={} in_flight={}>".format(self.address, self.weight, self.in_flight)
+
+
+#: Registry of every known backend, keyed by ``host:port``.
+_BACKENDS = {}
+
+#: Registry of the upstreams, keyed by address and settings.
+_UPSTREAMS = {}
+_UPSTREAMS_LOCK = threading.Lock()
+
+
+def get_backend(address):
+    """
+    Returns the shared :class:`Backend <Backend>` of an address, creating it
+    on first use.
+
+    :param address (str): ``host:port`` of the backend.
+
+    :rtype Backend: the shared backend object.
+    """
+    with _UPSTREAMS_LOCK:
+        backend = _BACKENDS.get(address)
+        if backend is None:
+            backend = _BACKENDS[address] = Backend(address)
+        return backend
+
+
+def get_upstream(address, weight=1, max_fails=DEFAULT_MAX_FAILS, fail_timeout=DEFAULT_FAIL_TIMEOUT,
+                 breaker_threshold=DEFAULT_THRESHOLD, breaker_reset_timeout=DEFAULT_RESET_TIMEOUT):
+    """
+    Returns the :class:`Upstream <Upstream>` of an address with the given
+    settings, creating it on first use. Every caller passing the same
+    settings (e.g. the same host compiled again on reload) gets the same
+    object, so its failure state carries over; other settings get another
+    upstream over the same shared :class:`Backend <Backend>`.
+
+    :param address (str): ``host:port`` of the backend.
+    :param weight (int): configured weight.
+    :param max_fails (int): failures before ejection.
+    :param fail_timeout (float): ejection duration in seconds.
+    :param breaker_threshold (int): consecutive failures opening the circuit.
+    :param breaker_reset_timeout (float): seconds before a half-open trial.
+
+    :rtype Upstream: the upstream object.
+    """
+    key = (address, max(1, int(weight)), max_fails, fail_timeout, breaker_threshold, breaker_reset_timeout)
+    with _UPSTREAMS_LOCK:
+        upstream = _UPSTREAMS.get(key)
+        if upstream is None:
+            backend = _BACKENDS.get(address)
+            if backend is None:
+                backend = _BACKENDS[address] = Backend(address)
+            upstream = Upstream(backend, *key[1:])
+            _UPSTREAMS[key] = upstream
+            backend.upstreams.append(upstream)
+        return upstream
+
+
+def forget_upstream(address):
+    """
+    Drops a backend and its upstreams from the registries, e.g. once it has
+    been removed from the configuration and drained. A later
+    ``get_upstream`` starts afresh.
+
+    :param address (str): ``host:port`` of the backend.
+    """
+    with _UPSTREAMS_LOCK:
+        _BACKENDS.pop(address, None)
+        for key in [key for key in _UPSTREAMS if key[0] == address]:
+            del _UPSTREAMS[key]
+
+
+def _ring_hash(value):
+    """Maps a string to a 64-bit point on the hash ring."""
+    digest = hashlib.md5(value.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class HashRing:
+    """
+    A consistent-hash ring with virtual nodes.
+
+    Each upstream is placed ``vnodes * weight`` times on the ring; a key is
+    served by the first point clockwise from its own hash.
+
+    :attrs vnodes (int): virtual nodes per unit of weight.
+    """
+
+    def __init__(self, upstreams, vnodes=DEFAULT_VNODES):
+        self.vnodes = max(1, int(vnodes))
+        points = []
+        for upstream in upstreams:
+            for i in range(self.vnodes * upstream.weight):
+                points.append((_ring_hash("{}#{}".format(upstream.address, i)), upstream))
+        points.sort(key=lambda point: point[0])
+        self._points = [point[0] for point in points]
+        self._upstreams = [point[1] for point in points]
+
+    def lookup(self, key, available=None):
+        """
+        Finds the upstream owning a key, skipping clockwise past the points of
+        unavailable upstreams.
+
+        :param key (str): routing key.
+        :param available (set): upstreams allowed to own the key, all when ``None``.
+
+        :rtype Upstream: owner of the key, or ``None`` for an empty ring.
+        """
+        if not self._points:
+            return None
+        count = len(self._points)
+        index = bisect.bisect(self._points, _ring_hash(key))
+        for step in range(count):
+            upstream = self._upstreams[(index + step) % count]
+            if available is None or upstream in available:
+                return upstream
+        return self._upstreams[index % count]
+
+
+def extract_hash_key(spec, request, addr=None):
+    """
+    Extracts the routing key of a request for the ``hash`` policy.
+
+    :param spec (tuple): ``(kind, name)`` where kind is ``ip``, ``header``,
+                         ``cookie`` or ``json`` and name the field to read.
+    :param request (str): raw HTTP request.
+    :param addr (tuple): client address (IP, port).
+
+    :rtype str: the key, falling back to the client IP when the field is absent.
+    """
+    kind, name = spec or DEFAULT_HASH_KEY
+    client_ip = addr[0] if addr else ''
+    if kind == 'ip' or not name or not request:
+        return client_ip
+
+    head, _, body = request.partition('\r\n\r\n')
+    headers = {}
+    for line in head.split('\r\n')[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+
+    value = None
+    if kind == 'header':
+        value = headers.get(name.lower())
+    elif kind == 'cookie':
+        for pair in headers.get('cookie', '').split(';'):
+            if '=' in pair:
+                key, cookie = pair.split('=', 1)
+                if key.strip() == name:
+                    value = cookie.strip()
+                    break
+    elif kind == 'json':
+        try:
+            data = json.loads(body)
+            if isinstance(data, dict) and data.get(name) is not None:
+                value = str(data.get(name))
+        except ValueError:
+            value = None
+
+    return value if value else client_ip
+
+
+class UpstreamGroup:
+    """
+    The set of upstreams serving one virtual host together with the policy
+    used to choose among them.
+
+    :attrs upstreams (list): list of :class:`Upstream <Upstream>`.
+    :attrs policy (str): canonical policy name.
+    :attrs hash_key (tuple): ``(kind, name)`` routing key of the ``hash`` policy.
+    """
+
+    def __init__(self, upstreams, policy=DEFAULT_POLICY, hash_key=None, vnodes=DEFAULT_VNODES):
+        self.upstreams = list(upstreams)
+        self.policy = normalize_policy(policy)
+        self.hash_key = hash_key or DEFAULT_HASH_KEY
+        self._ring = HashRing(self.upstreams, vnodes) if self.policy == 'hash' else None
+        # next() on itertools.count is atomic under the GIL, so the rotating
+        # policies advance without taking a lock
+        self._counter = itertools.count()
+        self._schedule = self._smooth_weighted_schedule(self.upstreams)
+
+    @staticmethod
+    def _smooth_weighted_schedule(upstreams):
+        """
+        Precomputes one period of smooth weighted round-robin (as in nginx):
+        every upstream gains its weight, the richest one is picked and pays
+        the total back. With equal weights this is a plain rotation.
+
+        :rtype list: upstreams in serving order, ``sum(weights)`` long.
+        """
+        if not upstreams:
+            return []
+        current = [0] * len(upstreams)
+        total = sum(u.weight for u in upstreams)
+        schedule = []
+        for _ in range(total):
+            best = 0
+            for i, upstream in enumerate(upstreams):
+                current[i] += upstream.weight
+                if current[i] > current[best]:
+                    best = i
+            current[best] -= total
+            schedule.append(upstreams[best])
+        return schedule
+
+    def select(self, key=None, exclude=None):
+        """
+        Picks an available upstream according to the group's policy.
+
+        :param key (str): routing key, only used by the ``hash`` policy.
+        :param exclude (collection): upstreams already tried for this request.
+
+        :rtype Upstream: the selected upstream, or ``None`` for an empty group
+                         or when every upstream is excluded.
+        """
+        upstreams = self.upstreams
+        if exclude:
+            upstreams = [u for u in upstreams if u not in exclude]
+        if not upstreams:
+            return None
+        if len(upstreams) == 1:
+            return upstreams[0]
+
+        now = time.monotonic()
+        candidates = [u for u in upstreams if u.available(now)]
+        if not candidates:
+            # Every upstream is down: fail open rather than refusing traffic
+            candidates = upstreams
+        elif len(candidates) == 1:
+            return candidates[0]
+
+        if self.policy == 'hash':
+            available = None if len(candidates) == len(self.upstreams) else set(candidates)
+            return self._ring.lookup(key or '', available)
+        if self.policy == 'least-conn':
+            return self._select_least_conn(candidates)
+        if self.policy == 'power-of-two':
+            return self._select_power_of_two(candidates)
+        return self._select_round_robin(candidates)
+
+    def _select_round_robin(self, candidates):
+        # Walk the precomputed schedule, skipping unavailable upstreams
+        schedule = self._schedule
+        count = len(schedule)
+        start = next(self._counter)
+        for step in range(count):
+            upstream = schedule[(start + step) % count]
+            if upstream in candidates:
+                return upstream
+        return candidates[0]
+
+    def _select_least_conn(self, candidates):
+        # Start the scan at a rotating offset so ties are spread evenly
+        start = next(self._counter)
+        best = None
+        count = len(candidates)
+        for i in range(count):
+            upstream = candidates[(start + i) % count]
+            if best is None or upstream.load() < best.load():
+                best = upstream
+        return best
+
+    def _select_power_of_two(self, candidates):
+        first, second = random.sample(candidates, 2)
+        return first if first.load() <= second.load() else second
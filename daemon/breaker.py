@@ -0,0 +1,108 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.breaker
+~~~~~~~~~~~~~~~~~
+
+This module provides the per-upstream circuit breaker of the proxy.
+
+States:
+-------
+- closed: requests flow; ``threshold`` consecutive failures open the circuit.
+- open: requests are refused without touching the network for ``reset_timeout`` seconds.
+- half-open: after the reset timeout a single trial request is let through;
+  its success closes the circuit, its failure opens it again.
+
+Usage Example:
+--------------
+>>> breaker = CircuitBreaker(threshold=5, reset_timeout=30)
+>>> if breaker.allow():
+...     ok = do_request()
+...     breaker.record_success() if ok else breaker.record_failure()
+"""
+
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+#: Consecutive failures opening the circuit.
+DEFAULT_THRESHOLD = 5
+
+#: Seconds the circuit stays open before a half-open trial.
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker.
+
+    :attrs state (str): ``closed``, ``open`` or ``half-open``.
+    :attrs threshold (int): consecutive failures opening the circuit.
+    :attrs reset_timeout (float): seconds before a half-open trial.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.state = CLOSED
+        self.threshold = max(1, int(threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def ready(self, now=None):
+        """
+        Tells, without claiming anything, whether :meth:`allow` could succeed.
+
+        :param now (float): current ``time.monotonic()``, computed when omitted.
+
+        :rtype bool: ``True`` when closed or when an open circuit is due for a trial.
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            now = now if now is not None else time.monotonic()
+            return now - self.opened_at >= self.reset_timeout
+        return False
+
+    def allow(self):
+        """
+        Claims the right to send a request. In the open state this moves the
+        circuit to half-open and grants the single trial request.
+
+        :rtype bool: ``True`` if the request may be sent.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """Closes the circuit and resets the failure streak."""
+        with self._lock:
+            self.failures = 0
+            self.state = CLOSED
+
+    def record_failure(self):
+        """Counts a failure, opening the circuit on threshold or failed trial."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.failures = 0
@@ -0,0 +1,279 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.cache
+~~~~~~~~~~~~~~~~~
+
+This module provides the shared response cache of the proxy.
+
+Responses to ``GET`` and ``HEAD`` requests are stored when the upstream gives
+them an explicit freshness lifetime (``Cache-Control: max-age`` /
+``s-maxage`` or ``Expires``) and does not forbid shared caching
+(``no-store``, ``no-cache``, ``private``). Entries are keyed by
+host + method + path, extended with the request values of the headers
+listed in the response ``Vary``. The cache is bounded in bytes and evicts
+the least recently used entries first.
+
+Usage Example:
+--------------
+>>> cache = ResponseCache(max_bytes=64 * 1024 * 1024)
+>>> response = cache.lookup('app1.local', raw_request)
+>>> if response is None:
+...     response = forward(raw_request)
+...     cache.store('app1.local', raw_request, response)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+#: Default size of the shared cache in bytes.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+#: Methods whose responses may be cached.
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+#: Status codes whose responses may be cached.
+CACHEABLE_STATUS = (200, 203, 300, 301, 404, 410)
+
+#: The counters are logged once every this many stores.
+LOG_EVERY = 1000
+
+
+def parse_size(value):
+    """
+    Parses a size such as ``64m``, ``512k`` or ``1048576``.
+
+    :param value (str): size with an optional ``k``, ``m`` or ``g`` suffix.
+
+    :rtype int: size in bytes.
+    """
+    value = value.strip().lower()
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _parse_head(head):
+    """Splits a raw head into its first line and a lower-cased header dict."""
+    lines = head.split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def _parse_cache_control(value):
+    """Parses a Cache-Control header into a directive -> value dict."""
+    directives = {}
+    for part in value.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip()] = arg.strip().strip('"')
+    return directives
+
+
+def freshness_lifetime(headers, now=None):
+    """
+    Computes how long a response may be served from a shared cache.
+
+    :param headers (dict): lower-cased response headers.
+    :param now (float): current wall-clock time, computed when omitted.
+
+    :rtype float: lifetime in seconds, 0 when the response must not be cached.
+    """
+    directives = _parse_cache_control(headers.get('cache-control', ''))
+    if 'no-store' in directives or 'no-cache' in directives or 'private' in directives:
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except ValueError:
+                return 0
+    if 'expires' in headers:
+        try:
+            expires = parsedate_to_datetime(headers['expires']).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return 0
+        return max(0, expires - (now if now is not None else time.time()))
+    return 0
+
+
+class ResponseCache:
+    """
+    A thread-safe, byte-bounded LRU cache of raw HTTP responses.
+
+    :attrs max_bytes (int): capacity in bytes.
+    :attrs size (int): bytes currently stored.
+    :attrs hits (int): lookups served from the cache.
+    :attrs misses (int): lookups that had to go to an upstream.
+    :attrs stores (int): responses stored.
+    :attrs evictions (int): entries evicted to make room.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        #: full key -> (response bytes, expires_at monotonic, stored_at monotonic)
+        self._entries = OrderedDict()
+        #: base key -> header names listed in Vary
+        self._vary = {}
+        #: base key -> number of variants stored under it
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def _keys(self, hostname, request):
+        """Returns ``(base_key, request_headers)`` or ``(None, None)`` if uncacheable."""
+        head = request.split('\r\n\r\n', 1)[0]
+        request_line, headers = _parse_head(head)
+        parts = request_line.split(' ')
+        if len(parts) < 2 or parts[0].upper() not in CACHEABLE_METHODS:
+            return None, None
+        return (hostname.lower(), parts[0].upper(), parts[1]), headers
+
+    @staticmethod
+    def _full_key(base_key, vary, headers):
+        return base_key + tuple(headers.get(name, '') for name in vary)
+
+    def lookup(self, hostname, request):
+        """
+        Returns a fresh cached response for the request, if any.
+
+        :param hostname (str): virtual host of the request.
+        :param request (str): raw HTTP request.
+
+        :rtype bytes: the cached response with ``Age`` and ``X-Cache: HIT``
+                      headers, or ``None`` on a miss.
+        """
+        base_key, headers = self._keys(hostname, request)
+        if base_key is None:
+            return None
+        directives = _parse_cache_control(headers.get('cache-control', ''))
+        if 'no-cache' in directives or 'no-store' in directives or 'no-cache' in headers.get('pragma', ''):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            key = self._full_key(base_key, self._vary.get(base_key, ()), headers)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            response, _, stored_at = entry
+
+        head, _, body = response.partition(b'\r\n\r\n')
+        extra = "\r\nAge: {}\r\nX-Cache: HIT".format(int(now - stored_at)).encode('utf-8')
+        return head + extra + b'\r\n\r\n' + body
+
+    def store(self, hostname, request, response):
+        """
+        Stores an upstream response if it is cacheable.
+
+        :param hostname (str): virtual host of the request.
+        :param request (str): raw HTTP request.
+        :param response (bytes): raw HTTP response from the upstream.
+
+        :rtype bool: ``True`` if the response was stored.
+        """
+        base_key, req_headers = self._keys(hostname, request)
+        if base_key is None or len(response) > self.max_bytes:
+            return False
+
+        head = response.split(b'\r\n\r\n', 1)[0].decode('latin-1')
+        status_line, headers = _parse_head(head)
+        parts = status_line.split(' ')
+        if len(parts) < 2 or not parts[1].isdigit() or int(parts[1]) not in CACHEABLE_STATUS:
+            return False
+        if 'set-cookie' in headers:
+            return False
+        if 'authorization' in req_headers and 'public' not in headers.get('cache-control', ''):
+            return False
+        vary = tuple(sorted(name.strip().lower() for name in headers.get('vary', '').split(',') if name.strip()))
+        if '*' in vary:
+            return False
+        lifetime = freshness_lifetime(headers)
+        if lifetime <= 0:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            if self._vary.get(base_key, vary) != vary:
+                # The Vary set changed: drop the variants keyed the old way
+                for key in [k for k in self._entries if k[:3] == base_key]:
+                    self._remove(key)
+            key = self._full_key(base_key, vary, req_headers)
+            if key in self._entries:
+                self._remove(key)
+            self._vary[base_key] = vary
+            self._variants[base_key] = self._variants.get(base_key, 0) + 1
+            self._entries[key] = (response, now + lifetime, now)
+            self.size += len(response)
+            self.stores += 1
+            while self.size > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            log = self.stores % LOG_EVERY == 0
+        if log:
+            print("[Cache] {}".format(self.stats()))
+        return True
+
+    def _remove(self, key):
+        """Drops an entry; the caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[0])
+        base_key = key[:3]
+        left = self._variants[base_key] - 1
+        if left:
+            self._variants[base_key] = left
+        else:
+            # Last variant gone: forget how the base key varies
+            del self._variants[base_key]
+            self._vary.pop(base_key, None)
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        :rtype dict: hits, misses, stores, evictions, entries, bytes and hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hit_ratio': (self.hits / float(lookups)) if lookups else 0.0,
+            }
@@ -0,0 +1,119 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.coalesce
+~~~~~~~~~~~~~~~~~
+
+This module provides request coalescing (single-flight) for the proxy.
+
+Concurrent callers asking for the same key share one execution: the first
+caller (the leader) runs the upstream call while the others wait for its
+result. An optional micro-TTL keeps a successful result for a short while
+after completion so that a burst of polls arriving just after the flight
+lands is answered without a new upstream call.
+
+Usage Example:
+--------------
+>>> flights = SingleFlight()
+>>> response = flights.do(('app2.local', 'GET', '/get-list'),
+...                       lambda: forward(raw_request), ttl=0.2)
+"""
+
+import threading
+import time
+
+
+class _Flight:
+    """A call in progress (or recently finished) shared by several callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires_at = 0.0
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    :attrs executions (int): calls actually executed.
+    :attrs shared (int): calls answered by another caller's execution.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, ttl=0.0, keep=None):
+        """
+        Runs ``fn`` once for all concurrent callers of ``key``.
+
+        :param key (hashable): identity of the call.
+        :param fn (callable): function producing the result.
+        :param ttl (float): seconds a finished result keeps being served.
+        :param keep (callable): predicate telling whether a result may be
+                                kept for the micro-TTL, all results when omitted.
+
+        :rtype object: the result of ``fn`` (re-raises its exception).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.done.is_set() and flight.expires_at <= time.monotonic():
+                del self._flights[key]
+                flight = None
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                leader = True
+                self.executions += 1
+            else:
+                leader = False
+                flight.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if ttl > 0 and flight.error is None and (keep is None or keep(flight.result)):
+                    flight.expires_at = time.monotonic() + ttl
+                else:
+                    self._flights.pop(key, None)
+            flight.done.set()
+
+        if flight.waiters:
+            print("[SingleFlight] {} answered {} waiting request(s)".format(key, flight.waiters))
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self):
+        """
+        Returns the coalescing counters.
+
+        :rtype dict: executions, shared answers and flights currently tracked.
+        """
+        with self._lock:
+            return {'executions': self.executions, 'shared': self.shared, 'flights': len(self._flights)}
@@ -0,0 +1,682 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.config
+~~~~~~~~~~~~~~~~~
+
+This module parses the nginx-style proxy configuration (``config/proxy.conf``)
+into a typed model and converts it to the ``routes`` dictionary consumed by
+``daemon.routing.compile_routes``.
+
+The parser works in three steps:
+
+- a tokenizer producing words, quoted strings, ``{``, ``}`` and ``;`` with
+  their line numbers (``#`` starts a comment);
+- a block parser producing a tree of :class:`Directive <Directive>`;
+- a builder validating every directive against :data:`DIRECTIVES` (known
+  name, allowed context, argument count and value) into a
+  :class:`ProxyConfig <ProxyConfig>`.
+
+Every problem raises :class:`ConfigError <ConfigError>` with the file and line.
+
+Grammar:
+--------
+::
+
+    upstream tracker_pool {
+        server 127.0.0.1:8000 weight=2;
+        server 127.0.0.1:8001;
+        dist_policy hash;
+        hash_key json username;
+    }
+
+    host "app2.local" {
+        proxy_set_header Host $host;
+        ssl_certificate certs/app2.local.pem;
+        ssl_certificate_key certs/app2.local.key;
+        proxy_pass http://192.168.56.210:9002 weight=3;
+        proxy_pass unix:/run/weaprous/app2.sock;
+        dist_policy least-conn;
+
+        location /static/ {
+            proxy_pass http://127.0.0.1:9100;
+            proxy_cache on;
+        }
+        location /internal/ {
+            deny all;
+        }
+        location /get-* {
+            proxy_pass http://tracker_pool;
+        }
+    }
+
+A directive directly followed by ``}`` may omit its ``;``.
+"""
+
+import math
+
+from .balancer import POLICY_ALIASES, UNIX_PREFIX
+from .cache import parse_size
+from .ratelimit import parse_rate
+
+
+class ConfigError(ValueError):
+    """
+    Invalid proxy configuration.
+
+    :attrs source (str): configuration file name.
+    :attrs line (int): line of the offending token, 0 when unknown.
+    """
+
+    def __init__(self, message, source='<config>', line=0):
+        self.source = source
+        self.line = line
+        if line:
+            message = "{}:{}: {}".format(source, line, message)
+        else:
+            message = "{}: {}".format(source, message)
+        ValueError.__init__(self, message)
+
+
+# --- Tokenizer ---------------------------------------------------------------
+
+WORD = 'word'
+STRING = 'string'
+OPEN = '{'
+CLOSE = '}'
+END = ';'
+
+
+def tokenize(text, source='<config>'):
+    """
+    Splits a configuration text into tokens.
+
+    :param text (str): configuration text.
+    :param source (str): file name used in error messages.
+
+    :rtype list: ``(kind, value, line)`` tuples.
+    """
+    tokens = []
+    i = 0
+    line = 1
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char == '\n':
+            line += 1
+            i += 1
+        elif char.isspace():
+            i += 1
+        elif char == '#':
+            while i < length and text[i] != '\n':
+                i += 1
+        elif char in '{};':
+            tokens.append((char, char, line))
+            i += 1
+        elif char in '"\'':
+            start_line = line
+            i += 1
+            value = []
+            while i < length and text[i] != char:
+                if text[i] == '\\' and i + 1 < length:
+                    i += 1
+                if text[i] == '\n':
+                    line += 1
+                value.append(text[i])
+                i += 1
+            if i >= length:
+                raise ConfigError("unterminated string", source, start_line)
+            tokens.append((STRING, ''.join(value), start_line))
+            i += 1
+        else:
+            start = i
+            while i < length and not text[i].isspace() and text[i] not in '{};"\'':
+                i += 1
+            tokens.append((WORD, text[start:i], line))
+    return tokens
+
+
+# --- Block parser ------------------------------------------------------------
+
+class Directive:
+    """
+    One parsed directive.
+
+    :attrs name (str): directive name.
+    :attrs args (list): arguments.
+    :attrs block (list): child directives, ``None`` for a simple directive.
+    :attrs line (int): line of the directive name.
+    """
+
+    __slots__ = ('name', 'args', 'block', 'line')
+
+    def __init__(self, name, args, block, line):
+        self.name = name
+        self.args = args
+        self.block = block
+        self.line = line
+
+    def __repr__(self):
+        return "<Directive {} {} line={}>".format(self.name, self.args, self.line)
+
+
+def parse_directives(tokens, source='<config>'):
+    """
+    Builds the directive tree of a token list.
+
+    :param tokens (list): output of :func:`tokenize`.
+    :param source (str): file name used in error messages.
+
+    :rtype list: top-level :class:`Directive <Directive>` objects.
+    """
+    position = [0]
+
+    def parse_block(depth, open_line):
+        directives = []
+        while True:
+            if position[0] >= len(tokens):
+                if depth:
+                    raise ConfigError("unexpected end of file, missing '}'", source, open_line)
+                return directives
+            kind, value, line = tokens[position[0]]
+            if kind == CLOSE:
+                if not depth:
+                    raise ConfigError("unexpected '}'", source, line)
+                position[0] += 1
+                return directives
+            if kind != WORD:
+                raise ConfigError("unexpected '{}'".format(value), source, line)
+
+            name = value
+            args = []
+            position[0] += 1
+            while True:
+                if position[0] >= len(tokens):
+                    raise ConfigError("unexpected end of file, expecting ';' after '{}'".format(name), source, line)
+                kind, value, token_line = tokens[position[0]]
+                if kind in (WORD, STRING):
+                    args.append(value)
+                    position[0] += 1
+                elif kind == END:
+                    position[0] += 1
+                    directives.append(Directive(name, args, None, line))
+                    break
+                elif kind == OPEN:
+                    position[0] += 1
+                    directives.append(Directive(name, args, parse_block(depth + 1, token_line), line))
+                    break
+                else:
+                    # '}' right after a directive: tolerate the missing ';'
+                    if not depth:
+                        raise ConfigError("unexpected '}'", source, token_line)
+                    directives.append(Directive(name, args, None, line))
+                    break
+
+    return parse_block(0, 0)
+
+
+# --- Value parsers -----------------------------------------------------------
+
+def _number(value):
+    number = float(value)
+    if number < 0:
+        raise ValueError("must not be negative")
+    return number
+
+
+def _integer(value):
+    number = int(value)
+    if number < 0:
+        raise ValueError("must not be negative")
+    return number
+
+
+def _positive_integer(value):
+    number = int(value)
+    if number < 1:
+        raise ValueError("must be at least 1")
+    return number
+
+
+def _on_off(value):
+    if value not in ('on', 'off'):
+        raise ValueError("expected 'on' or 'off'")
+    return value == 'on'
+
+
+def _policy(value):
+    if value.lower() not in POLICY_ALIASES:
+        raise ValueError("unknown policy, expected one of {}".format(
+            ', '.join(sorted(set(POLICY_ALIASES.values())))))
+    return value.lower()
+
+
+def _deny(value):
+    if value != 'all':
+        raise ValueError("expected 'all'")
+    return True
+
+
+def _path(value):
+    if not value.startswith('/'):
+        raise ValueError("path must start with '/'")
+    return value
+
+
+def _file(value):
+    if not value:
+        raise ValueError("empty file name")
+    return value
+
+
+def _hash_key(kind, name=None):
+    if kind not in ('ip', 'header', 'cookie', 'json'):
+        raise ValueError("expected ip, header <name>, cookie <name> or json <field>")
+    if kind != 'ip' and name is None:
+        raise ValueError("'{}' needs a name".format(kind))
+    return (kind, name)
+
+
+def _rate_limit(rate, burst=None):
+    """Parses ``<rate> [burst=N]`` into ``(requests per second, burst)``."""
+    rate = parse_rate(rate)
+    if burst is None:
+        return (rate, max(1, int(math.ceil(rate))))
+    if not burst.startswith('burst='):
+        raise ValueError("unknown parameter '{}', expected burst=N".format(burst))
+    return (rate, _positive_integer(burst[len('burst='):]))
+
+
+#: Directive name -> (option key, argument count (min, max), value parser,
+#: contexts). Options are stored under their key in the route params. The
+#: parser gets the single argument, every argument of a directive taking
+#: ``(1, None)`` one at a time, and all arguments at once otherwise.
+DIRECTIVES = {
+    'dist_policy': ('policy', (1, 1), _policy, ('host', 'location', 'upstream')),
+    'hash_key': ('hash_key', (1, 2), _hash_key, ('host', 'location', 'upstream')),
+    'hash_vnodes': ('hash_vnodes', (1, 1), _positive_integer, ('host', 'location', 'upstream')),
+    'health_check': ('health_check', (1, 1), _path, ('host', 'location', 'upstream')),
+    'health_check_interval': ('health_interval', (1, 1), _number, ('host', 'location', 'upstream')),
+    'max_fails': ('max_fails', (1, 1), _positive_integer, ('host', 'location', 'upstream')),
+    'fail_timeout': ('fail_timeout', (1, 1), _number, ('host', 'location', 'upstream')),
+    'breaker_threshold': ('breaker_threshold', (1, 1), _positive_integer, ('host', 'location', 'upstream')),
+    'breaker_reset_timeout': ('breaker_reset_timeout', (1, 1), _number, ('host', 'location', 'upstream')),
+    'proxy_connect_timeout': ('connect_timeout', (1, 1), _number, ('host', 'location')),
+    'proxy_read_timeout': ('read_timeout', (1, 1), _number, ('host', 'location')),
+    'proxy_timeout': ('total_timeout', (1, 1), _number, ('host', 'location')),
+    'proxy_next_upstream_tries': ('tries', (1, 1), _positive_integer, ('host', 'location')),
+    'proxy_cache': ('cache', (1, 1), _on_off, ('host', 'location')),
+    'proxy_cache_size': ('cache_size', (1, 1), parse_size, ('host', 'location')),
+    'proxy_coalesce': ('coalesce', (1, None), _path, ('host', 'location')),
+    'proxy_coalesce_ttl': ('coalesce_ttl', (1, 1), _number, ('host', 'location')),
+    'limit_req_per_ip': ('limit_req_per_ip', (1, 2), _rate_limit, ('host',)),
+    'limit_req_per_host': ('limit_req_per_host', (1, 2), _rate_limit, ('host',)),
+    'limit_conn_per_ip': ('limit_conn_per_ip', (1, 1), _positive_integer, ('host',)),
+    'limit_conn_per_host': ('limit_conn_per_host', (1, 1), _positive_integer, ('host',)),
+    'deny': ('deny', (1, 1), _deny, ('host', 'location')),
+    'ssl_certificate': ('ssl_certificate', (1, 1), _file, ('host',)),
+    'ssl_certificate_key': ('ssl_certificate_key', (1, 1), _file, ('host',)),
+}
+
+#: Directives handled by the builder itself, with their contexts.
+STRUCTURAL = {
+    'host': ('main',),
+    'upstream': ('main',),
+    'location': ('host',),
+    'proxy_pass': ('host', 'location'),
+    'server': ('upstream',),
+    'proxy_set_header': ('host', 'location'),
+}
+
+
+# --- Model -------------------------------------------------------------------
+
+class ServerConfig:
+    """
+    One backend address with its weight.
+
+    :attrs address (str): ``host:port``.
+    :attrs weight (int): relative share of traffic.
+    """
+
+    __slots__ = ('address', 'weight', 'line')
+
+    def __init__(self, address, weight=1, line=0):
+        self.address = address
+        self.weight = weight
+        self.line = line
+
+    def __repr__(self):
+        return "<Server {} weight={}>".format(self.address, self.weight)
+
+
+class UpstreamConfig:
+    """
+    A named ``upstream`` group referenced by ``proxy_pass http://<name>;``.
+
+    :attrs name (str): group name.
+    :attrs servers (list): :class:`ServerConfig <ServerConfig>` entries.
+    :attrs options (dict): balancing and health options of the group.
+    """
+
+    def __init__(self, name, line=0):
+        self.name = name
+        self.servers = []
+        self.options = {}
+        self.line = line
+
+
+class RouteConfig:
+    """
+    Common part of ``host`` and ``location`` blocks.
+
+    :attrs targets (list): ``(target, weight, line)`` from ``proxy_pass``;
+                           a target is an address or an upstream group name.
+    :attrs options (dict): options set in this block.
+    :attrs set_headers (list): ``(name, value)`` from ``proxy_set_header``.
+    """
+
+    def __init__(self, line=0):
+        self.targets = []
+        self.options = {}
+        self.set_headers = []
+        self.line = line
+
+
+class LocationConfig(RouteConfig):
+    """
+    A ``location <prefix>`` block inside a host.
+
+    :attrs prefix (str): path prefix matched against the request path.
+    """
+
+    def __init__(self, prefix, line=0):
+        RouteConfig.__init__(self, line)
+        self.prefix = prefix
+
+
+class HostConfig(RouteConfig):
+    """
+    A ``host "<name>"`` block.
+
+    :attrs name (str): virtual host matched against the ``Host`` header.
+    :attrs locations (list): :class:`LocationConfig <LocationConfig>` entries.
+    """
+
+    def __init__(self, name, line=0):
+        RouteConfig.__init__(self, line)
+        self.name = name
+        self.locations = []
+
+
+class ProxyConfig:
+    """
+    The whole proxy configuration.
+
+    :attrs source (str): configuration file name.
+    :attrs hosts (dict): host name -> :class:`HostConfig <HostConfig>`.
+    :attrs upstreams (dict): group name -> :class:`UpstreamConfig <UpstreamConfig>`.
+    """
+
+    def __init__(self, source='<config>'):
+        self.source = source
+        self.hosts = {}
+        self.upstreams = {}
+
+    def _servers(self, route):
+        """Expands the ``proxy_pass`` targets of a block into servers and group options."""
+        servers = []
+        options = {}
+        for target, weight, line in route.targets:
+            group = self.upstreams.get(target)
+            if group is None:
+                servers.append(ServerConfig(target, weight, line))
+                continue
+            if weight != 1:
+                raise ConfigError("weight= is not allowed on upstream group '{}'".format(target),
+                                  self.source, line)
+            servers.extend(group.servers)
+            options.update(group.options)
+        return servers, options
+
+    def _route(self, route, parent=None):
+        """
+        Builds one ``(proxy_map, policy, params)`` route tuple.
+
+        :param route (RouteConfig): host or location block.
+        :param parent (tuple): ``(options, servers, group_options, headers)``
+                               inherited from the host, ``None`` for a host.
+
+        :rtype tuple: the route tuple and what a nested location inherits.
+        """
+        options, inherited_servers, inherited_group, headers = parent or ({}, [], {}, [])
+        servers, group_options = self._servers(route)
+        if not servers:
+            servers, group_options = inherited_servers, inherited_group
+        own = dict(options)
+        own.update(route.options)
+
+        # The group's balancing options follow its servers; block options win
+        params = dict(group_options)
+        params.update(own)
+        policy = params.pop('policy', 'round-robin')
+        params['weights'] = dict((s.address, s.weight) for s in servers if s.weight != 1)
+        params['set_headers'] = list(headers) + list(route.set_headers)
+
+        proxy_map = [s.address for s in servers]
+        if len(proxy_map) == 1:
+            proxy_map = proxy_map[0]
+        return (proxy_map, policy, params), (own, servers, group_options, params['set_headers'])
+
+    def to_routes(self):
+        """
+        Converts the model to the ``routes`` dictionary of the proxy.
+
+        Each host maps to ``(proxy_map, policy, params)``; ``params['locations']``
+        lists ``(prefix, route)`` for its ``location`` blocks, which inherit
+        the host's options, servers and headers unless they override them.
+
+        :rtype dict: hostname -> route tuple.
+        """
+        routes = {}
+        for name, host in self.hosts.items():
+            route, inherited = self._route(host)
+            locations = []
+            for location in host.locations:
+                locations.append((location.prefix, self._route(location, inherited)[0]))
+            if locations:
+                route[2]['locations'] = locations
+            routes[name] = route
+        return routes
+
+
+# --- Builder -----------------------------------------------------------------
+
+def _parse_proxy_pass(directive, source):
+    """
+    Parses ``proxy_pass http://target [weight=N];`` (or ``server target [weight=N];``)
+    into ``(target, weight, line)``; a target is ``host:port``, ``unix:/path.sock``
+    or an upstream group name.
+    """
+    if not 1 <= len(directive.args) <= 2:
+        raise ConfigError("'{}' expects a target and an optional weight=N".format(directive.name),
+                          source, directive.line)
+    target = directive.args[0]
+    if target.startswith('http://'):
+        target = target[len('http://'):]
+    if target.startswith(UNIX_PREFIX):
+        # nginx spells it http://unix:/path.sock: with a trailing colon
+        target = target.rstrip(':')
+        if len(target) == len(UNIX_PREFIX):
+            raise ConfigError("'{}' has an empty socket path".format(directive.name), source, directive.line)
+    else:
+        target = target.rstrip('/')
+    if not target:
+        raise ConfigError("'{}' has an empty target".format(directive.name), source, directive.line)
+
+    weight = 1
+    if len(directive.args) == 2:
+        option = directive.args[1]
+        if not option.startswith('weight='):
+            raise ConfigError("unknown proxy_pass parameter '{}'".format(option), source, directive.line)
+        try:
+            weight = _positive_integer(option[len('weight='):])
+        except ValueError as e:
+            raise ConfigError("invalid weight '{}': {}".format(option, e), source, directive.line)
+    return target, weight, directive.line
+
+
+def _apply_option(options, directive, context, source):
+    """Validates a simple option directive and stores its value."""
+    key, (min_args, max_args), parser, contexts = DIRECTIVES[directive.name]
+    if context not in contexts:
+        raise ConfigError("'{}' is not allowed in {}".format(directive.name, context), source, directive.line)
+    count = len(directive.args)
+    if count < min_args or (max_args is not None and count > max_args):
+        expected = str(min_args) if min_args == max_args else "{}..{}".format(min_args, max_args or 'n')
+        raise ConfigError("'{}' expects {} argument(s), got {}".format(directive.name, expected, count),
+                          source, directive.line)
+    if directive.name in options.get('_seen', ()):
+        raise ConfigError("duplicate '{}'".format(directive.name), source, directive.line)
+    options.setdefault('_seen', set()).add(directive.name)
+
+    try:
+        if max_args is None:
+            value = frozenset(parser(arg) for arg in directive.args)
+        elif max_args == 1:
+            value = parser(directive.args[0])
+        else:
+            value = parser(*directive.args)
+    except ValueError as e:
+        raise ConfigError("invalid value for '{}': {}".format(directive.name, e), source, directive.line)
+    options[key] = value
+
+
+def _build_route(route, directives, context, source):
+    """Fills a host or location model from its directives."""
+    for directive in directives:
+        if directive.name in DIRECTIVES:
+            if directive.block is not None:
+                raise ConfigError("'{}' does not take a block".format(directive.name), source, directive.line)
+            _apply_option(route.options, directive, context, source)
+        elif directive.name == 'proxy_pass':
+            route.targets.append(_parse_proxy_pass(directive, source))
+        elif directive.name == 'proxy_set_header':
+            if len(directive.args) not in (1, 2):
+                raise ConfigError("'proxy_set_header' expects a name and a value", source, directive.line)
+            value = directive.args[1] if len(directive.args) == 2 else ''
+            route.set_headers.append((directive.args[0], value))
+        elif directive.name == 'location' and context == 'host':
+            if len(directive.args) != 1 or directive.block is None:
+                raise ConfigError("'location' expects a prefix and a block", source, directive.line)
+            try:
+                # "location /get-*" reads as the prefix "/get-"
+                prefix = _path(directive.args[0].rstrip('*'))
+            except ValueError as e:
+                raise ConfigError("invalid location '{}': {}".format(directive.args[0], e), source, directive.line)
+            if any(l.prefix == prefix for l in route.locations):
+                raise ConfigError("duplicate location '{}'".format(prefix), source, directive.line)
+            location = LocationConfig(prefix, directive.line)
+            _build_route(location, directive.block, 'location', source)
+            route.locations.append(location)
+        elif directive.name in STRUCTURAL:
+            raise ConfigError("'{}' is not allowed in {}".format(directive.name, context), source, directive.line)
+        else:
+            raise ConfigError("unknown directive '{}'".format(directive.name), source, directive.line)
+    route.options.pop('_seen', None)
+
+
+def _build_upstream(group, directives, source):
+    """Fills an upstream group model from its directives."""
+    for directive in directives:
+        if directive.name == 'server':
+            if not 1 <= len(directive.args) <= 2:
+                raise ConfigError("'server' expects an address and an optional weight=N", source, directive.line)
+            target, weight, line = _parse_proxy_pass(directive, source)
+            group.servers.append(ServerConfig(target, weight, line))
+        elif directive.name in DIRECTIVES:
+            _apply_option(group.options, directive, 'upstream', source)
+        elif directive.name in STRUCTURAL:
+            raise ConfigError("'{}' is not allowed in upstream".format(directive.name), source, directive.line)
+        else:
+            raise ConfigError("unknown directive '{}'".format(directive.name), source, directive.line)
+    group.options.pop('_seen', None)
+    if not group.servers:
+        raise ConfigError("upstream '{}' has no server".format(group.name), source, group.line)
+
+
+def parse_config(text, source='<config>'):
+    """
+    Parses and validates a configuration text.
+
+    :param text (str): configuration text.
+    :param source (str): file name used in error messages.
+
+    :rtype ProxyConfig: the configuration model.
+    :raises ConfigError: on any syntax or validation error.
+    """
+    config = ProxyConfig(source)
+    directives = parse_directives(tokenize(text, source), source)
+
+    # Upstream groups first, so hosts may reference groups defined later
+    for directive in directives:
+        if directive.name != 'upstream':
+            continue
+        if len(directive.args) != 1 or directive.block is None:
+            raise ConfigError("'upstream' expects a name and a block", source, directive.line)
+        name = directive.args[0]
+        if name in config.upstreams:
+            raise ConfigError("duplicate upstream '{}'".format(name), source, directive.line)
+        group = UpstreamConfig(name, directive.line)
+        _build_upstream(group, directive.block, source)
+        config.upstreams[name] = group
+
+    for directive in directives:
+        if directive.name == 'upstream':
+            continue
+        if directive.name != 'host':
+            if directive.name in DIRECTIVES or directive.name in STRUCTURAL:
+                raise ConfigError("'{}' is not allowed at top level".format(directive.name), source, directive.line)
+            raise ConfigError("unknown directive '{}'".format(directive.name), source, directive.line)
+        if len(directive.args) != 1 or directive.block is None:
+            raise ConfigError("'host' expects a quoted name and a block", source, directive.line)
+        name = directive.args[0]
+        if name in config.hosts:
+            raise ConfigError("duplicate host '{}'".format(name), source, directive.line)
+        host = HostConfig(name, directive.line)
+        _build_route(host, directive.block, 'host', source)
+        if 'ssl_certificate_key' in host.options and 'ssl_certificate' not in host.options:
+            raise ConfigError("host '{}' has ssl_certificate_key without ssl_certificate".format(name),
+                              source, directive.line)
+        if not host.targets and not host.locations:
+            raise ConfigError("host '{}' has no proxy_pass".format(name), source, directive.line)
+        for location in host.locations:
+            if not location.targets and not host.targets:
+                raise ConfigError("location '{}' of host '{}' has no proxy_pass".format(location.prefix, name),
+                                  source, location.line)
+        config.hosts[name] = host
+
+    return config
+
+
+def load_config(path):
+    """
+    Reads and parses a configuration file.
+
+    :param path (str): configuration file.
+
+    :rtype ProxyConfig: the configuration model.
+    :raises ConfigError: on any syntax or validation error.
+    """
+    with open(path, 'r') as f:
+        return parse_config(f.read(), path)
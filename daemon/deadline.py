@@ -0,0 +1,268 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.deadline
+~~~~~~~~~~~~~~~~~
+
+This module protects the servers against slow or stalled clients
+(slowloris-style attacks).
+
+Reading a request and writing a response are split into three phases, each
+bounded by one deadline kept in the shared :class:`TimerWheel <TimerWheel>`
+rather than one timer (or one blocking timeout) per socket:
+
+- **header**: the request line and headers must arrive within ``header_timeout``;
+- **body**: the body must arrive within ``body_timeout`` plus the time needed
+  to transfer ``Content-Length`` bytes at ``min_rate`` bytes per second;
+- **write**: the response must be accepted within ``write_timeout`` plus its
+  size at ``min_rate``.
+
+A kept-alive connection waiting for its next request is bounded by
+``keepalive_timeout`` instead of the header deadline, and is closed quietly
+when it expires.
+
+When a deadline expires the wheel shuts the socket down (only its reading
+side during the read phases, so that a ``408`` can still be sent), which
+wakes the thread blocked in ``recv``/``sendall`` up; the phase then raises
+:class:`DeadlineExceeded <DeadlineExceeded>`.
+
+Usage Example:
+--------------
+>>> deadlines = ClientDeadlines(header_timeout=10, min_rate=512)
+>>> raw = read_request(conn, deadlines)
+>>> send_response(conn, response, deadlines)
+"""
+
+import socket
+import threading
+
+from .timerwheel import TimerWheel
+
+#: Default deadlines and limits, in seconds and bytes.
+DEFAULT_HEADER_TIMEOUT = 10.0
+DEFAULT_BODY_TIMEOUT = 30.0
+DEFAULT_WRITE_TIMEOUT = 30.0
+DEFAULT_MIN_RATE = 512
+DEFAULT_MAX_HEADER_SIZE = 64 * 1024
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+DEFAULT_KEEPALIVE_TIMEOUT = 15.0
+DEFAULT_KEEPALIVE_REQUESTS = 100
+
+#: Wheel shared by every client connection of the process.
+CLIENT_TIMERS = TimerWheel()
+
+
+class DeadlineExceeded(Exception):
+    """
+    A client did not complete a phase in time.
+
+    :attrs phase (str): ``header``, ``body`` or ``write``.
+    """
+
+    def __init__(self, phase):
+        Exception.__init__(self, "client {} deadline exceeded".format(phase))
+        self.phase = phase
+
+
+class RequestTooLarge(Exception):
+    """
+    A request exceeded the header or body size limit.
+
+    :attrs status (int): ``431`` for headers, ``413`` for the body.
+    """
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class ClientDeadlines:
+    """
+    Per-connection read and write limits.
+
+    :attrs header_timeout (float): seconds to receive the request head.
+    :attrs body_timeout (float): base seconds to receive the body.
+    :attrs write_timeout (float): base seconds to send the response.
+    :attrs min_rate (int): minimum transfer rate in bytes per second, added
+                           to the body and write allowances.
+    :attrs max_header_size (int): largest accepted request head in bytes.
+    :attrs max_body_size (int): largest accepted body in bytes.
+    :attrs keepalive_timeout (float): seconds an idle connection is kept open
+                                      for its next request, 0 to disable.
+    :attrs keepalive_requests (int): requests served on one connection.
+    """
+
+    def __init__(self, header_timeout=DEFAULT_HEADER_TIMEOUT, body_timeout=DEFAULT_BODY_TIMEOUT,
+                 write_timeout=DEFAULT_WRITE_TIMEOUT, min_rate=DEFAULT_MIN_RATE,
+                 max_header_size=DEFAULT_MAX_HEADER_SIZE, max_body_size=DEFAULT_MAX_BODY_SIZE,
+                 keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT, keepalive_requests=DEFAULT_KEEPALIVE_REQUESTS):
+        self.header_timeout = float(header_timeout)
+        self.body_timeout = float(body_timeout)
+        self.write_timeout = float(write_timeout)
+        self.min_rate = max(1, int(min_rate))
+        self.max_header_size = int(max_header_size)
+        self.max_body_size = int(max_body_size)
+        self.keepalive_timeout = float(keepalive_timeout)
+        self.keepalive_requests = max(1, int(keepalive_requests))
+
+    def allowance(self, base, size):
+        """Seconds allowed to move ``size`` bytes: ``base`` plus ``size / min_rate``."""
+        return base + float(size) / self.min_rate
+
+
+#: Limits used when a server is not given its own.
+DEFAULT_DEADLINES = ClientDeadlines()
+
+
+class _Phase:
+    """Arms a wheel timer shutting ``conn`` down unless the phase ends first."""
+
+    def __init__(self, conn, seconds, wheel, how=socket.SHUT_RD):
+        self.conn = conn
+        self.how = how
+        self.expired = False
+        self._lock = threading.Lock()
+        self._timer = wheel.schedule(seconds, self._expire)
+
+    def _expire(self):
+        with self._lock:
+            self.expired = True
+        try:
+            # Plain socket shutdown: on a TLS connection it keeps the SSL
+            # object, so a 408 can still be written through it
+            socket.socket.shutdown(self.conn, self.how)
+        except OSError:
+            pass
+
+    def done(self):
+        """Disarms the timer; tells whether the deadline had already expired."""
+        self._timer.cancel()
+        with self._lock:
+            return self.expired
+
+
+def _content_length(head):
+    """Returns the ``Content-Length`` of a raw request head, 0 when absent."""
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            try:
+                return max(0, int(value.strip()))
+            except ValueError:
+                return 0
+    return 0
+
+
+def read_request(conn, deadlines=None, wheel=None, idle_timeout=None):
+    """
+    Reads a whole request (head and ``Content-Length`` body) within deadlines.
+
+    :param conn (socket.socket): client connection.
+    :param deadlines (ClientDeadlines): limits, :data:`DEFAULT_DEADLINES` if omitted.
+    :param wheel (TimerWheel): timer wheel, :data:`CLIENT_TIMERS` if omitted.
+    :param idle_timeout (float): head deadline of a kept-alive connection;
+                                 a client sending nothing in that time is
+                                 treated as having closed the connection.
+
+    :rtype bytes: the raw request, empty when the client closed without sending.
+    :raises DeadlineExceeded: when the head or the body arrived too slowly.
+    :raises RequestTooLarge: when the head or the body is over its limit.
+    """
+    deadlines = deadlines or DEFAULT_DEADLINES
+    wheel = wheel or CLIENT_TIMERS
+
+    data = b''
+    head_timeout = deadlines.header_timeout if idle_timeout is None else idle_timeout
+    phase = _Phase(conn, head_timeout, wheel)
+    try:
+        while b'\r\n\r\n' not in data:
+            if len(data) > deadlines.max_header_size:
+                raise RequestTooLarge(431, "request header fields too large")
+            try:
+                chunk = conn.recv(4096)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                if phase.expired and (data or idle_timeout is None):
+                    raise DeadlineExceeded('header')
+                return data
+            data += chunk
+    finally:
+        phase.done()
+
+    head, _, body = data.partition(b'\r\n\r\n')
+    length = _content_length(head)
+    if length > deadlines.max_body_size:
+        raise RequestTooLarge(413, "request body too large")
+    missing = length - len(body)
+    if missing <= 0:
+        return data
+
+    phase = _Phase(conn, deadlines.allowance(deadlines.body_timeout, missing), wheel)
+    try:
+        while missing > 0:
+            try:
+                chunk = conn.recv(min(65536, missing))
+            except OSError:
+                chunk = b''
+            if not chunk:
+                break
+            data += chunk
+            missing -= len(chunk)
+    finally:
+        expired = phase.done()
+    if missing > 0 and expired:
+        raise DeadlineExceeded('body')
+    return data
+
+
+def send_response(conn, data, deadlines=None, wheel=None):
+    """
+    Sends a response within the write deadline.
+
+    :param conn (socket.socket): client connection.
+    :param data (bytes): response to send.
+    :param deadlines (ClientDeadlines): limits, :data:`DEFAULT_DEADLINES` if omitted.
+    :param wheel (TimerWheel): timer wheel, :data:`CLIENT_TIMERS` if omitted.
+
+    :raises DeadlineExceeded: when the client did not read the response in time.
+    """
+    deadlines = deadlines or DEFAULT_DEADLINES
+    wheel = wheel or CLIENT_TIMERS
+    phase = _Phase(conn, deadlines.allowance(deadlines.write_timeout, len(data)), wheel,
+                   socket.SHUT_RDWR)
+    try:
+        conn.sendall(data)
+    except OSError:
+        if phase.done():
+            raise DeadlineExceeded('write')
+        raise
+    if phase.done():
+        raise DeadlineExceeded('write')
+
+
+def status_response(status, reason):
+    """
+    Builds the small plain-text response sent before dropping a client.
+
+    :rtype bytes: encoded HTTP response.
+    """
+    body = "{} {}".format(status, reason)
+    return (
+        "HTTP/1.1 {}\r\n"
+        "Content-Type: text/plain\r\n"
+        "Content-Length: {}\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+        "{}"
+    ).format(body, len(body), body).encode('utf-8')
@@ -0,0 +1,152 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.health
+~~~~~~~~~~~~~~~~~
+
+This module provides the active health checker of the proxy upstreams.
+
+A single background thread periodically sends a ``GET`` probe to every
+watched :class:`Backend <Backend>` and flips its ``healthy`` flag. Any HTTP
+answer below 500 counts as alive; a refused, timed out or 5xx probe marks
+the upstream down until a later probe succeeds.
+
+Passive outlier ejection is implemented on the upstream itself
+(:meth:`Upstream.report_failure`), from the outcome of real forwarded requests.
+A probe never ends an ejection nor closes a circuit breaker: those follow
+their own timers and half-open trials, so a backend answering probes but
+failing real traffic stays out. A backend coming back up only has its
+failure streaks reset (:meth:`Backend.readmit`).
+
+Usage Example:
+--------------
+>>> checker = HealthChecker()
+>>> checker.watch(get_backend('127.0.0.1:9000'), '/', interval=5)
+>>> checker.start()
+"""
+
+import socket
+import threading
+import time
+
+#: Seconds between two probes of the same upstream.
+DEFAULT_INTERVAL = 5.0
+
+#: Connect and read timeout of a single probe, in seconds.
+DEFAULT_PROBE_TIMEOUT = 1.0
+
+
+def probe(upstream, path='/', timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Sends one health probe to an upstream.
+
+    :param upstream (Upstream): upstream to probe.
+    :param path (str): request path of the probe.
+    :param timeout (float): connect and read timeout in seconds.
+
+    :rtype bool: ``True`` if the upstream answered with a status below 500.
+    """
+    request = (
+        "GET {} HTTP/1.1\r\n"
+        "Host: {}\r\n"
+        "User-Agent: WeApRous-HealthCheck/1.0\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    ).format(path, upstream.address)
+
+    try:
+        if upstream.path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(upstream.path)
+            except OSError:
+                sock.close()
+                raise
+        else:
+            sock = socket.create_connection((upstream.host, upstream.port), timeout=timeout)
+        with sock:
+            sock.settimeout(timeout)
+            sock.sendall(request.encode('utf-8'))
+            status_line = sock.recv(64).split(b'\r\n', 1)[0].decode('latin-1')
+    except (socket.error, OSError):
+        return False
+
+    parts = status_line.split(' ')
+    if len(parts) < 2 or not parts[1].isdigit():
+        return False
+    return int(parts[1]) < 500
+
+
+class HealthChecker(threading.Thread):
+    """
+    Background thread probing upstreams and maintaining their ``healthy`` flag.
+
+    :attrs targets (dict): address -> [upstream, path, interval, next_due].
+    :attrs timeout (float): probe timeout in seconds.
+    """
+
+    def __init__(self, timeout=DEFAULT_PROBE_TIMEOUT):
+        threading.Thread.__init__(self, name="HealthChecker", daemon=True)
+        self.targets = {}
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def watch(self, upstream, path='/', interval=DEFAULT_INTERVAL):
+        """
+        Registers an upstream for active checking, or updates the probe path
+        and interval of an upstream already watched (its schedule is kept).
+
+        :param upstream (Upstream): upstream to probe.
+        :param path (str): request path of the probe.
+        :param interval (float): seconds between two probes.
+        """
+        with self._lock:
+            target = self.targets.get(upstream.address)
+            if target is None:
+                self.targets[upstream.address] = [upstream, path, float(interval), 0.0]
+            else:
+                target[0], target[1], target[2] = upstream, path, float(interval)
+
+    def retain(self, addresses):
+        """
+        Stops probing every upstream whose address is not listed.
+
+        :param addresses (set): addresses to keep watching.
+        """
+        with self._lock:
+            for address in [a for a in self.targets if a not in addresses]:
+                del self.targets[address]
+
+    def stop(self):
+        """Stops the checker loop."""
+        self._stop_event.set()
+
+    def run(self):
+        print("[Health] Checking {} upstream(s)".format(len(self.targets)))
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [target for target in self.targets.values() if target[3] <= now]
+            for target in due:
+                upstream, path, interval, _ = target
+                healthy = probe(upstream, path, self.timeout)
+                if healthy != upstream.healthy:
+                    print("[Health] Upstream {} is now {}".format(
+                        upstream.address, "UP" if healthy else "DOWN"))
+                    if healthy:
+                        upstream.readmit()
+                upstream.healthy = healthy
+                target[3] = time.monotonic() + interval
+            self._stop_event.wait(0.5)
@@ -18,11 +18,30 @@ This module provides a http adapter object to manage and persist
 http settings (headers, bodies). The adapter supports both
 raw URL paths and RESTful route definitions, and integrates with
 Request and Response objects to handle client-server communication.
+
+A hook may return a ``stream`` (an iterable of ``str``/``bytes`` chunks)
+instead of a body: the head is sent at once and each chunk as soon as it
+is produced, until the iterable ends or the client goes away (e.g. for
+server-sent events). The body is delimited by the end of the connection.
+
+Before calling the hook of a ``long_lived`` route the adapter calls its
+``detach`` callback, if any, so admission control can give the worker back
+to the pool; a refusal is answered ``503``.
 """
 
 from .request import Request
 from .response import Response
 from .dictionary import CaseInsensitiveDict
+from .admission import overloaded_response
+from .deadline import (DeadlineExceeded, RequestTooLarge, read_request,
+                       send_response, status_response)
+
+#: Reason phrases of the statuses sent to rejected clients.
+_REJECT_REASONS = {
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+}
 
 class HttpAdapter:
     """
@@ -42,6 +61,7 @@ class HttpAdapter:
         routes (dict): Mapping of route paths to handler functions.
         request (Request): Request object for parsing incoming data.
         response (Response): Response object for building and sending replies.
+        deadlines (ClientDeadlines): read/write deadlines of the connection.
     """
 
     __attrs__ = [
@@ -52,9 +72,11 @@ class HttpAdapter:
         "routes",
         "request",
         "response",
+        "deadlines",
+        "detach",
     ]
 
-    def __init__(self, ip, port, conn, connaddr, routes):
+    def __init__(self, ip, port, conn, connaddr, routes, deadlines=None, detach=None):
         """
         Initialize a new HttpAdapter instance.
 
@@ -63,6 +85,10 @@ class HttpAdapter:
         :param conn (socket): Active socket connection.
         :param connaddr (tuple): Address of the connected client.
         :param routes (dict): Mapping of route paths to handler functions.
+        :param deadlines (ClientDeadlines): slow-client limits, the module
+                                            defaults when omitted.
+        :param detach (callable): called before a long-lived hook; returns
+                                  ``False`` to refuse it.
         """
 
         #: IP address.
@@ -79,6 +105,10 @@ class HttpAdapter:
         self.request = Request()
         #: Response
         self.response = Response()
+        #: Slow-client deadlines
+        self.deadlines = deadlines
+        #: Long-lived request callback
+        self.detach = detach
 
     def handle_client(self, conn, addr, routes):
         """
@@ -101,9 +131,20 @@ class HttpAdapter:
         # Response handler
         resp = Response()
         self.response = resp
+        # Chunks returned by a streaming hook
+        stream = None
 
         try:
-            msg = conn.recv(1024).decode('utf-8')
+            try:
+                msg = read_request(conn, self.deadlines).decode('utf-8')
+            except DeadlineExceeded as e:
+                print("[HttpAdapter] Dropping slow client {}: {}".format(addr, e))
+                conn.sendall(status_response(408, _REJECT_REASONS[408]))
+                return
+            except RequestTooLarge as e:
+                print("[HttpAdapter] Rejecting request from {}: {}".format(addr, e))
+                conn.sendall(status_response(e.status, _REJECT_REASONS[e.status]))
+                return
             if not msg:
                 conn.close()
                 return
@@ -116,10 +157,19 @@ class HttpAdapter:
             print("[HttpAdapter] Headers: {}".format(req.headers))
             print("[HttpAdapter] Body: {}".format(req.body[:100] if req.body else 'None'))
 
+            if req.hook and getattr(req.hook, '_long_lived', False) and self.detach is not None:
+                if not self.detach():
+                    print("[HttpAdapter] Too many long-lived requests, refusing {}".format(req.path))
+                    send_response(conn, overloaded_response(), self.deadlines)
+                    return
+
             if req.hook:
                 print("[HttpAdapter] Executing hook for path: {}".format(req.path))
                 try:
-                    hook_result = req.hook(headers=req.headers, body=req.body)
+                    if getattr(req.hook, '_route_query', False):
+                        hook_result = req.hook(headers=req.headers, body=req.body, query=req.query)
+                    else:
+                        hook_result = req.hook(headers=req.headers, body=req.body)
                     
                     print("[HttpAdapter] Hook returned: {}".format(hook_result))
                     
@@ -142,7 +192,10 @@ class HttpAdapter:
                             print("[HttpAdapter] Set cookie: {}".format(hook_result['set_cookie']))
                         
                         # Set body/content
-                        if 'body' in hook_result:
+                        if 'stream' in hook_result:
+                            stream = hook_result['stream']
+                            print("[HttpAdapter] Streaming response")
+                        elif 'body' in hook_result:
                             resp._content = hook_result['body']
                             if isinstance(resp._content, str):
                                 resp._content = resp._content.encode('utf-8')
@@ -170,12 +223,18 @@ class HttpAdapter:
             else:
                 print("[HttpAdapter] No hook found for path: {} (falling back to static handler)".format(req.path))
 
+            if stream is not None:
+                self.send_stream(conn, req, resp, stream)
+                return
+
             # Build and send response
             print("[HttpAdapter] Building response with status: {}".format(resp.status_code))
             response = resp.build_response(req)
             print("[HttpAdapter] Sending response ({} bytes)".format(len(response)))
-            conn.sendall(response)
+            send_response(conn, response, self.deadlines)
             
+        except DeadlineExceeded as e:
+            print("[HttpAdapter] Dropping slow client {}: {}".format(addr, e))
         except Exception as e:
             print("[HttpAdapter] Error handling client: {}".format(e))
             import traceback
@@ -192,6 +251,39 @@ class HttpAdapter:
                 pass
             print("[HttpAdapter] Connection closed for {}".format(addr))
 
+    def send_stream(self, conn, req, resp, stream):
+        """
+        Sends a streamed response: the head, then each chunk of ``stream``
+        as it is produced, each within the write deadline.
+
+        :param conn (socket): The client socket connection.
+        :param req (Request): The request being answered.
+        :param resp (Response): status and headers of the response.
+        :param stream (iterable): ``str`` or ``bytes`` chunks of the body.
+        """
+        if not resp.status_code:
+            resp.status_code = 200
+        if not resp.reason:
+            resp.reason = "OK"
+        # No buffered body: the chunks follow the head
+        resp._content = b''
+        sent = 0
+        try:
+            send_response(conn, resp.build_response_header(req, stream=True), self.deadlines)
+            for chunk in stream:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                send_response(conn, chunk, self.deadlines)
+                sent += len(chunk)
+        except (OSError, DeadlineExceeded) as e:
+            # The client went away; the stream is simply abandoned
+            print("[HttpAdapter] Stream to {} ended: {}".format(self.connaddr, e))
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+        print("[HttpAdapter] Streamed {} bytes".format(sent))
+
     @property
     def extract_cookies(self, req, resp):
         """
@@ -0,0 +1,291 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.lifecycle
+~~~~~~~~~~~~~~~~~
+
+This module provides graceful shutdown and zero-downtime restart for the
+accept loops of the backend and the proxy.
+
+- **Graceful drain**: on ``SIGTERM`` or Ctrl+C the server stops accepting,
+  then waits up to ``drain_timeout`` seconds for the requests in flight to
+  finish before returning.
+- **Zero-downtime restart**: on ``SIGUSR2`` the server starts a new copy of
+  itself (same interpreter and arguments) that inherits the listening sockets
+  (file descriptor passing through ``WEAPROUS_LISTEN_FD``). Once the new
+  process reports it is accepting (through the ``WEAPROUS_READY_FD`` pipe),
+  the old one stops accepting and drains. The kernel accept queue is shared
+  during the overlap, so no connection is refused.
+- Alternatively a listener can be opened with ``SO_REUSEPORT`` so that a new
+  instance started by hand binds the same port next to the old one, which is
+  then stopped with ``SIGTERM``.
+
+Usage Example:
+--------------
+>>> lifecycle = Lifecycle("Backend", drain_timeout=30)
+>>> server = create_listener(socket.AF_INET, ("0.0.0.0", 9000), backlog=50)
+>>> lifecycle.install_signal_handlers(server)
+>>> lifecycle.notify_ready()
+>>> while lifecycle.accepting():
+...     conn, addr = accept(server, lifecycle)
+"""
+
+import os
+import select
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+#: Environment variable carrying the inherited listening socket descriptors,
+#: comma separated, in the order the listeners are created.
+LISTEN_FD_ENV = 'WEAPROUS_LISTEN_FD'
+
+#: Environment variable carrying the write end of the readiness pipe.
+READY_FD_ENV = 'WEAPROUS_READY_FD'
+
+#: Seconds in-flight requests get to finish after the listener is closed.
+DEFAULT_DRAIN_TIMEOUT = 30.0
+
+#: Seconds a restarted process gets to report it is accepting.
+READY_TIMEOUT = 10.0
+
+#: Seconds between two checks of the stop flag by the accept loop.
+ACCEPT_POLL = 0.5
+
+
+class InFlight:
+    """
+    Counter of the connections being served.
+
+    :attrs count (int): connections accepted and not finished.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._cond = threading.Condition()
+
+    def enter(self):
+        """Registers an accepted connection."""
+        with self._cond:
+            self.count += 1
+
+    def exit(self):
+        """Registers the end of a connection."""
+        with self._cond:
+            self.count -= 1
+            if self.count <= 0:
+                self._cond.notify_all()
+
+    def wait_idle(self, timeout):
+        """
+        Waits until no connection is in flight.
+
+        :param timeout (float): maximum wait in seconds.
+
+        :rtype bool: ``True`` if every connection finished in time.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.count <= 0, timeout)
+
+
+def create_listener(family, address, backlog, reuse_port=False):
+    """
+    Returns the listening socket of the server: the one inherited from the
+    process that restarted us, or a new one bound to ``address``. A stale
+    Unix socket file left by a previous run is replaced; any other kind of
+    file at that path is left untouched (and the bind fails).
+
+    :param family (int): ``socket.AF_INET`` or ``socket.AF_UNIX``.
+    :param address (tuple or str): ``(ip, port)`` or Unix socket path.
+    :param backlog (int): length of the kernel accept queue.
+    :param reuse_port (bool): set ``SO_REUSEPORT`` so another instance can
+                              bind the same port during a restart.
+
+    :rtype tuple: ``(socket, inherited)``, the socket bound and listening.
+    """
+    fds = os.environ.pop(LISTEN_FD_ENV, None)
+    if fds:
+        # Listeners are created in the same order as before the restart
+        fd, _, rest = fds.partition(',')
+        if rest:
+            os.environ[LISTEN_FD_ENV] = rest
+        server = socket.socket(fileno=int(fd))
+        print("[Lifecycle] Inherited listening socket fd {} ({})".format(fd, server.getsockname()))
+        return server, True
+
+    server = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        if family == socket.AF_UNIX:
+            try:
+                if stat.S_ISSOCK(os.stat(address).st_mode):
+                    os.unlink(address)
+            except FileNotFoundError:
+                pass
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port and hasattr(socket, 'SO_REUSEPORT'):
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server.bind(address)
+        server.listen(backlog)
+    except OSError:
+        server.close()
+        raise
+    return server, False
+
+
+class Lifecycle:
+    """
+    Stop and restart control of one accept loop.
+
+    :attrs name (str): log tag of the server.
+    :attrs drain_timeout (float): seconds granted to in-flight requests.
+    :attrs in_flight (InFlight): connections being served.
+    :attrs handed_over (bool): the listener now belongs to a restarted process.
+    """
+
+    def __init__(self, name, drain_timeout=DEFAULT_DRAIN_TIMEOUT):
+        self.name = name
+        self.drain_timeout = drain_timeout
+        self.in_flight = InFlight()
+        self.handed_over = False
+        self._stopping = threading.Event()
+
+    def accepting(self):
+        """Tells whether the accept loop must keep running."""
+        return not self._stopping.is_set()
+
+    def stop(self):
+        """Asks the accept loop to stop; in-flight requests are drained."""
+        if not self._stopping.is_set():
+            print("[{}] Graceful shutdown requested".format(self.name))
+        self._stopping.set()
+
+    def install_signal_handlers(self, *listeners):
+        """
+        Stops on ``SIGTERM`` and restarts on ``SIGUSR2``. Does nothing when
+        not called from the main thread.
+
+        :param listeners (socket.socket): listening sockets handed to the new
+                                          process on restart, in creation order.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        if hasattr(signal, 'SIGUSR2'):
+            signal.signal(signal.SIGUSR2, lambda signum, frame: threading.Thread(
+                target=self.restart, args=(listeners,), name="Restart", daemon=True).start())
+            print("[{}] pid {}: SIGTERM drains, SIGUSR2 restarts without downtime".format(
+                self.name, os.getpid()))
+
+    def notify_ready(self):
+        """Tells the process that restarted us that we are accepting."""
+        fd = os.environ.pop(READY_FD_ENV, None)
+        if fd is None:
+            return
+        try:
+            os.write(int(fd), b'1')
+            os.close(int(fd))
+        except OSError:
+            pass
+
+    def restart(self, listeners, argv=None):
+        """
+        Starts a new process on the same listening sockets, then drains.
+
+        :param listeners (list): listening sockets to hand over.
+        :param argv (list): command of the new process, ours when omitted.
+
+        :rtype bool: ``True`` if the new process took over.
+        """
+        argv = argv or [sys.executable] + sys.argv
+        ready_r, ready_w = os.pipe()
+        env = dict(os.environ)
+        fds = [listener.fileno() for listener in listeners]
+        env[LISTEN_FD_ENV] = ','.join(str(fd) for fd in fds)
+        env[READY_FD_ENV] = str(ready_w)
+        print("[{}] Restarting: {}".format(self.name, ' '.join(argv)))
+        try:
+            child = subprocess.Popen(argv, env=env, pass_fds=fds + [ready_w])
+        except OSError as e:
+            print("[{}] Restart failed, keeping this process: {}".format(self.name, e))
+            os.close(ready_r)
+            os.close(ready_w)
+            return False
+        os.close(ready_w)
+
+        # Wait for the new process to accept before we stop accepting
+        deadline = time.monotonic() + READY_TIMEOUT
+        ready = False
+        while not ready and time.monotonic() < deadline and child.poll() is None:
+            ready = bool(_read_ready(ready_r, 0.2))
+        os.close(ready_r)
+        if not ready:
+            print("[{}] New process {} did not get ready, keeping this one".format(self.name, child.pid))
+            if child.poll() is None:
+                child.terminate()
+            return False
+
+        print("[{}] New process {} is accepting, draining this one".format(self.name, child.pid))
+        self.handed_over = True
+        self.stop()
+        return True
+
+    def drain(self):
+        """
+        Waits for the in-flight connections after the listener was closed.
+
+        :rtype bool: ``True`` if they all finished within the drain timeout.
+        """
+        pending = self.in_flight.count
+        if pending:
+            print("[{}] Draining {} in-flight connection(s) (up to {}s)".format(
+                self.name, pending, self.drain_timeout))
+        drained = self.in_flight.wait_idle(self.drain_timeout)
+        if not drained:
+            print("[{}] Drain timeout: abandoning {} connection(s)".format(self.name, self.in_flight.count))
+        return drained
+
+
+def _read_ready(fd, timeout):
+    """Reads the readiness byte of a restarted process, ``b''`` on timeout."""
+    readable, _, _ = select.select([fd], [], [], timeout)
+    if not readable:
+        return b''
+    return os.read(fd, 1)
+
+
+def accept(server, lifecycle):
+    """
+    Accepts the next connection while the lifecycle allows it.
+
+    The listener is polled every :data:`ACCEPT_POLL` seconds so that a stop
+    request is noticed even when no client connects.
+
+    :param server (socket.socket): listening socket.
+    :param lifecycle (Lifecycle): stop control.
+
+    :rtype tuple: ``(conn, addr)``, or ``None`` once stopping.
+    """
+    server.settimeout(ACCEPT_POLL)
+    while lifecycle.accepting():
+        try:
+            conn, addr = server.accept()
+        except socket.timeout:
+            continue
+        conn.settimeout(None)
+        return conn, addr
+    return None
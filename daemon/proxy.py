@@ -25,13 +25,28 @@ Requirement:
 - response: customized :class: `Response <Response>` utilities.
 - httpadapter: :class: `HttpAdapter <HttpAdapter >` adapter for HTTP request processing.
 - dictionary: :class: `CaseInsensitiveDict <CaseInsensitiveDict>` for managing headers and cookies.
+- routing: :class: `RoutingTable <RoutingTable>` compiled once from the routes.
+- balancer: :class: `UpstreamGroup <UpstreamGroup>` load-balancing policies over upstreams.
+- health: :class: `HealthChecker <HealthChecker>` active probing of upstreams.
+- breaker: :class: `CircuitBreaker <CircuitBreaker>` consulted through each upstream.
+- cache: :class: `ResponseCache <ResponseCache>` shared by hosts enabling ``proxy_cache``.
+- coalesce: :class: `SingleFlight <SingleFlight>` collapsing identical concurrent GETs.
+- tls: :class: `TLSTerminator <TLSTerminator>` HTTPS listener with per-host certificates.
 
 """
 import socket
 import threading
+import time
 from .response import *
 from .httpadapter import HttpAdapter
 from .dictionary import CaseInsensitiveDict
+from .health import HealthChecker, DEFAULT_INTERVAL
+from .cache import ResponseCache
+from .coalesce import SingleFlight
+from .deadline import DeadlineExceeded, RequestTooLarge, DEFAULT_DEADLINES, read_request, send_response
+from .lifecycle import Lifecycle, accept, create_listener
+from .balancer import forget_upstream
+from .routing import RoutingTable, LiveRoutes, compile_routes, table_upstreams
 
 #: A dictionary mapping hostnames to backend IP and port tuples.
 #: Used to determine routing targets for incoming requests.
@@ -41,110 +56,439 @@ PROXY_PASS = {
     "app2.local": ('192.168.56.103', 9002),
 }
 
-# Round-robin state per hostname (thread-safe)
-_RR_STATE = {}
-_RR_STATE_LOCK = threading.Lock()
+# Last routes dictionary compiled on behalf of a caller passing a plain dict
+_COMPILED = (None, None)
+_COMPILED_LOCK = threading.Lock()
 
+#: Response cache shared by every host with ``proxy_cache on``.
+RESPONSE_CACHE = ResponseCache()
 
-def forward_request(host, port, request):
+#: In-flight upstream calls shared by identical requests on ``proxy_coalesce`` paths.
+COALESCER = SingleFlight()
+
+#: Active health checker, created when a host first configures ``health_check``.
+_HEALTH_CHECKER = None
+
+#: TLS terminator of the running proxy, ``None`` when it only speaks plaintext.
+_TLS = None
+
+#: Seconds a removed upstream is given to finish its in-flight requests.
+DRAIN_TIMEOUT = 60.0
+
+# Serializes the table swaps with the drained upstreams being forgotten, so
+# an address re-added meanwhile keeps its shared object
+_RELOAD_LOCK = threading.Lock()
+
+
+#: Methods that may be replayed on another upstream after a partial exchange.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE')
+
+
+class UpstreamError(Exception):
+    """
+    Failure of an exchange with an upstream.
+
+    :attrs connect_failed (bool): the request was never sent, so it is safe to retry.
+    :attrs timed_out (bool): a connect, read or total deadline expired.
     """
-    Forwards an HTTP request to a backend server and retrieves the response.
+
+    def __init__(self, message, connect_failed=False, timed_out=False):
+        Exception.__init__(self, message)
+        self.connect_failed = connect_failed
+        self.timed_out = timed_out
+
+
+def _error_response(status, reason, headers=None):
+    """
+    Builds a small plain-text error response.
+
+    :params status (int): HTTP status code.
+    :params reason (str): reason phrase, also used as the body.
+    :params headers (dict): extra response headers, e.g. ``Retry-After``.
+
+    :rtype bytes: encoded HTTP response.
+    """
+    body = "{} {}".format(status, reason)
+    extra = "".join("{}: {}\r\n".format(name, value) for name, value in (headers or {}).items())
+    return (
+        "HTTP/1.1 {}\r\n"
+        "Content-Type: text/plain\r\n"
+        "Content-Length: {}\r\n"
+        "{}"
+        "Connection: close\r\n"
+        "\r\n"
+        "{}"
+    ).format(body, len(body), extra, body).encode('utf-8')
+
+
+def _exchange(host, port, request, timeouts, path=None):
+    """
+    Sends a request to a backend and reads the whole response within deadlines.
 
     :params host (str): IP address of the backend server.
     :params port (int): port number of the backend server.
     :params request (str): incoming HTTP request.
+    :params timeouts (tuple): ``(connect, read, total)`` deadlines in seconds.
+    :params path (str): Unix domain socket of a co-located backend; when set,
+                        ``host`` and ``port`` are ignored.
 
-    :rtype bytes: Raw HTTP response from the backend server. If the connection
-                  fails, returns a 404 Not Found response.
+    :rtype bytes: raw HTTP response.
+    :raises UpstreamError: on connection failure or expired deadline.
     """
-
-    backend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    connect_timeout, read_timeout, total_timeout = timeouts
+    deadline = time.monotonic() + total_timeout
+    if path is not None:
+        backend = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        backend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
     try:
-        backend.connect((host, port))
-        backend.sendall(request.encode())
-        response = b""
-        while True:
-            chunk = backend.recv(4096)
-            if not chunk:
+        backend.settimeout(max(0.001, min(connect_timeout, total_timeout)))
+        try:
+            backend.connect(path if path is not None else (host, port))
+        except socket.timeout:
+            raise UpstreamError("connect timed out", connect_failed=True, timed_out=True)
+        except OSError as e:
+            raise UpstreamError(str(e), connect_failed=True)
+
+        try:
+            backend.sendall(request.encode())
+            response = b""
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("total deadline exceeded")
+                backend.settimeout(min(read_timeout, remaining))
+                chunk = backend.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+            return response
+        except socket.timeout as e:
+            raise UpstreamError(str(e) or "read timed out", timed_out=True)
+        except OSError as e:
+            raise UpstreamError(str(e))
+    finally:
+        backend.close()
+
+
+def _as_table(routes):
+    """
+    Returns the compiled :class:`RoutingTable <RoutingTable>` of ``routes``.
+
+    A :class:`LiveRoutes <LiveRoutes>` holder yields its current table. A plain
+    routes dictionary is compiled once and reused for as long as the same
+    dictionary object is passed in.
+
+    :params routes (LiveRoutes, RoutingTable or dict): routes to resolve.
+
+    :rtype RoutingTable: the compiled table.
+    """
+    global _COMPILED
+    if isinstance(routes, LiveRoutes):
+        return routes.table
+    if isinstance(routes, RoutingTable):
+        return routes
+    source, table = _COMPILED
+    if source is routes:
+        return table
+    with _COMPILED_LOCK:
+        if _COMPILED[0] is not routes:
+            _COMPILED = (routes, compile_routes(routes))
+        return _COMPILED[1]
+
+
+def _request_path(request):
+    """Returns the path of a raw request, without its query string."""
+    parts = request.split('\r\n', 1)[0].split(' ')
+    if len(parts) < 2:
+        return '/'
+    return parts[1].split('?', 1)[0]
+
+def _route_for(table, hostname, request):
+    """Returns the host or location route serving a request."""
+    if request is None:
+        return table.lookup(hostname)
+    return table.resolve(hostname, _request_path(request))
+
+def _apply_set_headers(request, route, hostname, addr):
+    """
+    Rewrites the request headers listed in the route's ``proxy_set_header``
+    directives. ``$host``, ``$remote_addr`` and ``$proxy_add_x_forwarded_for``
+    are substituted; an empty value removes the header.
+    """
+    if not route.set_headers:
+        return request
+    head, sep, body = request.partition('\r\n\r\n')
+    lines = head.split('\r\n')
+    remote_addr = addr[0] if addr else ''
+    forwarded_for = remote_addr
+    for line in lines[1:]:
+        if line.lower().startswith('x-forwarded-for:'):
+            forwarded_for = "{}, {}".format(line.split(':', 1)[1].strip(), remote_addr)
+
+    for name, value in route.set_headers:
+        value = (value.replace('$proxy_add_x_forwarded_for', forwarded_for)
+                      .replace('$remote_addr', remote_addr)
+                      .replace('$host', hostname))
+        prefix = name.lower() + ':'
+        lines = [lines[0]] + [line for line in lines[1:] if not line.lower().startswith(prefix)]
+        if value:
+            lines.append("{}: {}".format(name, value))
+    return '\r\n'.join(lines) + sep + body
+
+def proxy_request(hostname, routes, request, addr=None, route=None):
+    """
+    Forwards a request to an upstream of the host, with deadlines, bounded
+    retries on other upstreams and circuit breaking.
+
+    A failed attempt is retried on another upstream (up to ``proxy_next_upstream_tries``
+    upstreams) when the connection could not be established, or when the
+    method is idempotent. All attempts share the host's total deadline.
+
+    :params hostname (str): value of the Host header of the request.
+    :params routes (RoutingTable or dict): compiled routing table.
+    :params request (str): raw HTTP request.
+    :params addr (tuple): client address (IP, port).
+    :params route (HostRoute): route already matched for the request.
+
+    :rtype bytes: the upstream response, a 404 when no location of a host
+                  without its own ``proxy_pass`` matches, or a 502/503/504
+                  error response.
+    """
+    table = _as_table(routes)
+    if route is None:
+        route = _route_for(table, hostname, request)
+    if not route.group.upstreams:
+        # A host with only locations, and none of them matches the path
+        print("[Proxy] No location of {} matches {}, answering 404".format(hostname, _request_path(request)))
+        return _error_response(404, "Not Found")
+    upstream_request = _close_upstream(_apply_set_headers(request, route, hostname, addr))
+    method = request.split(' ', 1)[0].upper()
+    connect_timeout, read_timeout, total_timeout = route.timeouts
+    deadline = time.monotonic() + total_timeout
+
+    tried = []
+    last_error = None
+    circuit_open = False
+    for attempt in range(route.tries):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            last_error = UpstreamError("total deadline exceeded", timed_out=True)
+            break
+        upstream = route.select(request, addr, tried)
+        if upstream is None:
+            break
+        tried.append(upstream)
+
+        if not upstream.breaker.allow():
+            print("[Proxy] Circuit open for upstream {}".format(upstream.address))
+            if last_error is None:
+                circuit_open = True
+            continue
+
+        upstream.acquire()
+        try:
+            response = _exchange(upstream.host, upstream.port, upstream_request,
+                                 (connect_timeout, read_timeout, remaining), upstream.path)
+            upstream.report_success()
+            return response
+        except UpstreamError as e:
+            print("[Proxy] Upstream {} error: {}".format(upstream.address, e))
+            upstream.report_failure()
+            last_error = e
+            if not (e.connect_failed or method in IDEMPOTENT_METHODS):
                 break
-            response += chunk
-        return response
-    except socket.error as e:
-      print("Socket error: {}".format(e))
-      return (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
+        finally:
+            upstream.release()
 
+    if last_error is not None and last_error.timed_out:
+        return _error_response(504, "Gateway Timeout")
+    if last_error is None and circuit_open:
+        return _error_response(503, "Service Unavailable")
+    return _error_response(502, "Bad Gateway")
 
-def resolve_routing_policy(hostname, routes):
+def _is_ok_response(response):
+    """Tells whether a raw response carries a 200 status."""
+    return response.startswith(b'HTTP/1.1 200') or response.startswith(b'HTTP/1.0 200')
+
+def coalesced_request(hostname, routes, request, addr=None, route=None):
     """
-    Handles an routing policy to return the matching proxy_pass.
-    It determines the target backend to forward the request to.
+    Forwards a request, collapsing it with identical concurrent requests when
+    its path is listed in the host's ``proxy_coalesce`` directive.
 
-    :params host (str): IP address of the request target server.
-    :params port (int): port number of the request target server.
-    :params routes (dict): dictionary mapping hostnames and location.
+    Only ``GET`` and ``HEAD`` requests are coalesced, keyed by host, method and
+    path. A 200 response may additionally be reused for ``proxy_coalesce_ttl``
+    seconds after the upstream call lands.
+
+    :params hostname (str): value of the Host header of the request.
+    :params routes (RoutingTable or dict): compiled routing table.
+    :params request (str): raw HTTP request.
+    :params addr (tuple): client address (IP, port).
+    :params route (HostRoute): route already matched for the request.
+
+    :rtype bytes: the upstream response, possibly shared with other clients.
+    """
+    table = _as_table(routes)
+    if route is None:
+        route = _route_for(table, hostname, request)
+    if not route.coalesce:
+        return proxy_request(hostname, table, request, addr, route)
+    parts = request.split('\r\n', 1)[0].split(' ')
+    if len(parts) < 2 or parts[0].upper() not in ('GET', 'HEAD') or parts[1] not in route.coalesce:
+        return proxy_request(hostname, table, request, addr, route)
+
+    key = (hostname.lower(), parts[0].upper(), parts[1])
+    return COALESCER.do(key, lambda: proxy_request(hostname, table, request, addr, route),
+                        ttl=route.coalesce_ttl, keep=_is_ok_response)
+
+def _reject(conn, response):
+    """Sends an error response to a refused client and closes the connection."""
+    try:
+        conn.sendall(response)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+def _client_keep_alive(request):
+    """Tells whether the client of a raw request accepts a persistent connection."""
+    lines = request.split('\r\n\r\n', 1)[0].split('\r\n')
+    connection = ''
+    for line in lines[1:]:
+        if line.lower().startswith('connection:'):
+            connection = line.split(':', 1)[1].strip().lower()
+    if 'close' in connection:
+        return False
+    return lines[0].rstrip().endswith('HTTP/1.1') or 'keep-alive' in connection
+
+def _close_upstream(request):
     """
+    Makes the upstream close after its response, which :func:`_exchange`
+    reads to EOF. The client's ``Connection`` and ``Keep-Alive`` headers are
+    hop-by-hop and are not forwarded.
+    """
+    head, sep, body = request.partition('\r\n\r\n')
+    lines = [line for line in head.split('\r\n')
+             if not line.lower().startswith(('connection:', 'keep-alive:'))]
+    lines.append('Connection: close')
+    return '\r\n'.join(lines) + sep + body
 
-    print("[Proxy] Resolving routing policy for hostname: {}".format(hostname))
-    proxy_map, policy = routes.get(hostname,('127.0.0.1:9000','round-robin'))
-    print("[Proxy] Resolved proxy_map: {}".format(proxy_map))
-    print("[Proxy] Resolved policy: {}".format(policy))
-
-    proxy_host = ''
-    proxy_port = '9000'
-    if isinstance(proxy_map, list):
-        if len(proxy_map) == 0:
-            print("[Proxy] Empty resolved routing of hostname {}".format(hostname))
-            print("[Proxy] Empty proxy_map result")
-            # TODO: implement the error handling for non mapped host
-            #       the policy is design by team, but it can be 
-            #       basic default host in your self-defined system
-            # Error handling: No backend server configured for this hostname
-            # Use default fallback host (127.0.0.1:9000) as a safe default
-            # In production, this could raise an exception or log to monitoring system
-            print("[Proxy] WARNING: No backend mapped for hostname '{}', using default fallback".format(hostname))
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-        elif len(proxy_map) == 1:
-            proxy_host, proxy_port = proxy_map[0].split(":", 2)
-        else:
-            # Apply policy for multiple backends (default to round-robin)
-            selected_index = 0
-            if policy and policy.lower() == 'round-robin':
-                # Maintain an index per hostname safely across threads
-                with _RR_STATE_LOCK:
-                    state = _RR_STATE.get(hostname)
-                    if state is None:
-                        state = {"index": 0, "lock": threading.Lock()}
-                        _RR_STATE[hostname] = state
-                # Use per-hostname lock to rotate
-                with state["lock"]:
-                    selected_index = state["index"] % len(proxy_map)
-                    state["index"] = (state["index"] + 1) % len(proxy_map)
-            else:
-                # Fallback: just pick first
-                selected_index = 0
+def _client_response(response, method, keep_alive, keepalive_timeout):
+    """
+    Rewrites the ``Connection`` header of a response sent to the client.
 
-            try:
-                proxy_host, proxy_port = proxy_map[selected_index].split(":", 2)
-            except Exception:
-                # Fallback safe default if entry malformed
-                proxy_host = '127.0.0.1'
-                proxy_port = '9000'
+    The connection only stays open when the end of the response can be told
+    without closing it: a ``Content-Length`` matching the body, a chunked
+    body, or a response without body.
+
+    :params response (bytes): raw response from the upstream or the cache.
+    :params method (str): request method.
+    :params keep_alive (bool): whether the connection may stay open.
+    :params keepalive_timeout (float): idle timeout announced to the client.
+
+    :rtype tuple: ``(response, keep_alive)``.
+    """
+    head, sep, body = response.partition(b'\r\n\r\n')
+    if not sep:
+        return response, False
+    lines = head.split(b'\r\n')
+    status = lines[0].split(b' ')
+    code = int(status[1]) if len(status) > 1 and status[1].isdigit() else 0
+    length = None
+    chunked = False
+    kept = [lines[0]]
+    for line in lines[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name in (b'connection', b'keep-alive'):
+            continue
+        if name == b'content-length' and value.strip().isdigit():
+            length = int(value.strip())
+        elif name == b'transfer-encoding':
+            chunked = b'chunked' in value.lower()
+        kept.append(line)
+
+    if keep_alive:
+        no_body = method == 'HEAD' or 100 <= code < 200 or code in (204, 304)
+        keep_alive = no_body or chunked or length == len(body)
+    if keep_alive:
+        kept.append(b'Connection: keep-alive')
+        kept.append('Keep-Alive: timeout={}'.format(int(keepalive_timeout)).encode())
     else:
-        print("[Proxy] resolve route of hostname {} is a singulair to".format(hostname))
-        proxy_host, proxy_port = proxy_map.split(":", 2)
+        kept.append(b'Connection: close')
+    return b'\r\n'.join(kept) + sep + body, keep_alive
 
-    return proxy_host, proxy_port
+def _handle_request(conn, addr, routes, deadlines, idle_timeout, keep_alive):
+    """
+    Reads, forwards and answers one request of a client connection.
+
+    :params idle_timeout (float): head deadline of a kept-alive connection,
+                                  ``None`` for its first request.
+    :params keep_alive (bool): whether the connection may stay open afterwards.
 
-def handle_client(ip, port, conn, addr, routes):
+    :rtype bool: ``True`` when the connection stays open for another request.
+    """
+    try:
+        request = read_request(conn, deadlines, idle_timeout=idle_timeout).decode()
+    except DeadlineExceeded as e:
+        print("[Proxy] Dropping slow client {}: {}".format(addr, e))
+        _reject(conn, _error_response(408, "Request Timeout"))
+        return False
+    except RequestTooLarge as e:
+        print("[Proxy] Rejecting request from {}: {}".format(addr, e))
+        reason = "Payload Too Large" if e.status == 413 else "Request Header Fields Too Large"
+        _reject(conn, _error_response(e.status, reason))
+        return False
+    if not request:
+        # Client closed (or stayed idle past keepalive_timeout)
+        return False
+
+    # Extract hostname
+    hostname = ''
+    for line in request.splitlines():
+        if line.lower().startswith('host:'):
+            hostname = line.split(':', 1)[1].strip()
+
+    # Enforce the host's rate and connection limits before any upstream work
+    table = _as_table(routes)
+    limits = table.lookup(hostname).limits
+    client_ip = addr[0] if addr else ''
+    if limits is not None:
+        rejected = limits.admit(client_ip)
+        if rejected is not None:
+            limit, retry_after = rejected
+            print("[Proxy] {} over {} on {}, answering 429".format(client_ip, limit, hostname))
+            _reject(conn, _error_response(429, "Too Many Requests", {'Retry-After': retry_after}))
+            return False
+
+    try:
+        route = _route_for(table, hostname, request)
+        if route.deny:
+            print("[Proxy] {} denied on {}, answering 403".format(_request_path(request), hostname))
+            send_response(conn, _error_response(403, "Forbidden"), deadlines)
+            return False
+
+        # Serve from the shared cache when the host enables it
+        cache_enabled = route.cache
+        response = RESPONSE_CACHE.lookup(hostname, request) if cache_enabled else None
+        if response is None:
+            response = coalesced_request(hostname, table, request, addr, route)
+            if cache_enabled:
+                RESPONSE_CACHE.store(hostname, request, response)
+        method = request.split(' ', 1)[0].upper()
+        response, keep_alive = _client_response(response, method, keep_alive and _client_keep_alive(request),
+                                                deadlines.keepalive_timeout)
+        send_response(conn, response, deadlines)
+        return keep_alive
+    except DeadlineExceeded as e:
+        print("[Proxy] Dropping slow client {}: {}".format(addr, e))
+        return False
+    finally:
+        if limits is not None:
+            limits.release(client_ip)
+
+def handle_client(ip, port, conn, addr, routes, deadlines=None, lifecycle=None):
     """
     Handles an individual client connection by parsing the request,
     determining the target backend, and forwarding the request.
@@ -155,47 +499,168 @@ def handle_client(ip, port, conn, addr, routes):
 
     The handler sends the backend response back to the client or
     returns 404 if the hostname is unreachable or is not recognized.
+    A client over one of the host's ``limit_*`` directives gets a
+    ``429 Too Many Requests`` with ``Retry-After``; a client sending its
+    request too slowly gets a ``408`` and is dropped.
+
+    The connection is kept alive for up to ``deadlines.keepalive_requests``
+    requests, each awaited for ``deadlines.keepalive_timeout`` seconds, while
+    the proxy is not shutting down.
 
     :params ip (str): IP address of the proxy server.
     :params port (int): port number of the proxy server.
-    :params conn (socket.socket): client connection socket.
+    :params conn (socket.socket): client connection socket (plain or TLS).
     :params addr (tuple): client address (IP, port).
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (LiveRoutes, RoutingTable or dict): routing table; a
+                   :class:`LiveRoutes <LiveRoutes>` is read once per request.
+    :params deadlines (ClientDeadlines): slow-client read/write limits.
+    :params lifecycle (Lifecycle): stops keep-alive once the proxy drains.
+    """
+    deadlines = deadlines or DEFAULT_DEADLINES
+    served = 0
+    try:
+        while True:
+            keep_alive = (deadlines.keepalive_timeout > 0
+                          and served + 1 < deadlines.keepalive_requests
+                          and (lifecycle is None or lifecycle.accepting()))
+            idle_timeout = deadlines.keepalive_timeout if served else None
+            if not _handle_request(conn, addr, routes, deadlines, idle_timeout, keep_alive):
+                break
+            served += 1
+    finally:
+        conn.close()
+
+def start_health_checker(routes):
     """
+    Starts (or updates) the active health checker so that it probes exactly
+    the upstreams of the hosts configuring ``health_check``.
 
-    request = conn.recv(1024).decode()
+    :params routes (LiveRoutes, RoutingTable or dict): routes to check.
 
-    # Extract hostname
-    for line in request.splitlines():
-        if line.lower().startswith('host:'):
-            hostname = line.split(':', 1)[1].strip()
+    :rtype HealthChecker: the running checker, or ``None`` if nothing is checked.
+    """
+    global _HEALTH_CHECKER
+    table = _as_table(routes)
+    targets = {}
+    for route in [route for host in table.hosts.values() for route in host.routes()]:
+        if not route.health_check:
+            continue
+        interval = route.health_interval or DEFAULT_INTERVAL
+        for upstream in route.group.upstreams:
+            targets[upstream.address] = (upstream.backend, route.health_check, interval)
+
+    checker = _HEALTH_CHECKER
+    if checker is None:
+        if not targets:
+            return None
+        checker = _HEALTH_CHECKER = HealthChecker()
+
+    # Upstreams no longer probed must not stay marked down
+    for address, target in list(checker.targets.items()):
+        if address not in targets:
+            target[0].healthy = True
+    checker.retain(set(targets))
+    for upstream, path, interval in targets.values():
+        checker.watch(upstream, path, interval)
+    if not checker.is_alive() and targets:
+        checker.start()
+    return checker
+
+def _configure_cache(table):
+    """Sizes the shared cache to the largest ``proxy_cache_size`` of the table."""
+    cache_sizes = [route.params.get('cache_size')
+                   for host in table.hosts.values() for route in host.routes()]
+    cache_sizes = [size for size in cache_sizes if size]
+    if cache_sizes:
+        RESPONSE_CACHE.max_bytes = max(cache_sizes)
+
+def _drain_upstream(live, upstream, timeout=DRAIN_TIMEOUT):
+    """
+    Waits for the in-flight requests of a removed upstream, then forgets it
+    unless a later reload added its address back.
 
-    print("[Proxy] {} at Host: {}".format(addr, hostname))
+    :params live (LiveRoutes): holder of the current table.
+    :params upstream (Backend): backend removed from the configuration.
+    :params timeout (float): maximum seconds to wait.
+    """
+    deadline = time.monotonic() + timeout
+    while upstream.in_flight > 0 and time.monotonic() < deadline:
+        time.sleep(0.1)
+    with _RELOAD_LOCK:
+        if upstream.address in table_upstreams(live.table):
+            print("[Proxy] Removed upstream {} is configured again, keeping it".format(upstream.address))
+            return
+        forget_upstream(upstream.address)
+    print("[Proxy] Drained removed upstream {} ({} request(s) left)".format(upstream.address, upstream.in_flight))
+
+def reload_routes(live, routes):
+    """
+    Compiles new routes and swaps them in without interrupting traffic.
 
-    # Resolve the matching destination in routes and need conver port
-    # to integer value
-    resolved_host, resolved_port = resolve_routing_policy(hostname, routes)
-    try:
-        resolved_port = int(resolved_port)
-    except ValueError:
-        print("Not a valid integer")
+    Requests already running keep the table they started with. Backends
+    present in both configurations are the same shared objects, so their
+    in-flight counters and health carry over, as does the ejection and
+    circuit breaker state of the upstreams whose settings did not change. Removed
+    upstreams stop receiving new requests and are drained in the background,
+    then forgotten unless a later reload added them back.
 
-    if resolved_host:
-        print("[Proxy] Host name {} is forwarded to {}:{}".format(hostname,resolved_host, resolved_port))
-        response = forward_request(resolved_host, resolved_port, request)        
-    else:
-        response = (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
-    conn.sendall(response)
-    conn.close()
-
-def run_proxy(ip, port, routes):
+    :params live (LiveRoutes): holder used by the running proxy.
+    :params routes (dict): hostname -> ``(proxy_map, policy[, params])``.
+
+    :rtype RoutingTable: the newly installed table.
+    """
+    with _RELOAD_LOCK:
+        table = compile_routes(routes)
+        if _TLS is not None:
+            # Certificates are loaded first: a bad one leaves the old setup running
+            try:
+                _TLS.update(table)
+            except (OSError, ValueError) as e:
+                print("[Proxy] Reload rejected, cannot load certificates: {}".format(e))
+                return live.table
+        previous = live.swap(table)
+
+    old_upstreams = table_upstreams(previous)
+    new_upstreams = table_upstreams(table)
+    added = [a for a in new_upstreams if a not in old_upstreams]
+    removed = [u for a, u in old_upstreams.items() if a not in new_upstreams]
+
+    _configure_cache(table)
+    start_health_checker(table)
+    for upstream in removed:
+        threading.Thread(target=_drain_upstream, args=(live, upstream),
+                         name="Drain-{}".format(upstream.address), daemon=True).start()
+
+    print("[Proxy] Routes reloaded (generation {}): {} host(s), +{} / -{} upstream(s)".format(
+        live.generation, len(table), len(added), len(removed)))
+    return table
+
+def _serve(ip, port, conn, addr, routes, deadlines, lifecycle, tls=None):
+    """Handles one client and reports its end to the drain counter."""
+    try:
+        if tls is not None:
+            conn = tls.handshake(conn, addr, (deadlines or DEFAULT_DEADLINES).header_timeout)
+        if conn is not None:
+            handle_client(ip, port, conn, addr, routes, deadlines, lifecycle)
+    except Exception as e:
+        print("[Proxy] Error handling {}: {}".format(addr, e))
+    finally:
+        lifecycle.in_flight.exit()
+
+def _accept_loop(listener, ip, port, routes, deadlines, lifecycle, tls=None):
+    """Accepts the clients of one listener until the lifecycle stops."""
+    while True:
+        accepted = accept(listener, lifecycle)
+        if accepted is None:
+            break
+        conn, addr = accepted
+        lifecycle.in_flight.enter()
+        client_thread = threading.Thread(target=_serve,
+                                         args=(ip, port, conn, addr, routes, deadlines, lifecycle, tls))
+        client_thread.daemon = True
+        client_thread.start()
+
+def run_proxy(ip, port, routes, deadlines=None, lifecycle=None, reuse_port=False, tls=None):
     """
     Starts the proxy server and listens for incoming connections. 
 
@@ -206,41 +671,72 @@ def run_proxy(ip, port, routes):
 
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
-    :params routes (dict): dictionary mapping hostnames and location.
+    :params routes (LiveRoutes or dict): routes; pass a :class:`LiveRoutes <LiveRoutes>`
+                   to be able to reload them with ``reload_routes``.
+    :params deadlines (ClientDeadlines): header/body/write deadlines and
+                      minimum transfer rate imposed on clients.
+    :params lifecycle (Lifecycle): stop/restart control, created when omitted.
+                      ``SIGTERM`` or Ctrl+C drains the requests in flight,
+                      ``SIGUSR2`` hands the listeners to a new process first.
+    :params reuse_port (bool): bind with ``SO_REUSEPORT``.
+    :params tls (TLSTerminator): also listen for HTTPS on ``tls.port``.
 
     """
+    global _TLS
 
-    proxy = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    lifecycle = lifecycle or Lifecycle("Proxy")
+    listeners = []
+
+    # Compile the routes once into a swappable holder; handlers only look
+    # hosts up in its current table
+    if not isinstance(routes, LiveRoutes):
+        routes = LiveRoutes(_as_table(routes))
+    print("[Proxy] Compiled routes for {} host(s)".format(len(routes.table)))
+    start_health_checker(routes)
+    _configure_cache(routes.table)
 
     try:
-        proxy.bind((ip, port))
-        proxy.listen(50)
+        proxy, inherited = create_listener(socket.AF_INET, (ip, port), 50, reuse_port)
+        listeners.append(proxy)
         print("[Proxy] Listening on IP {} port {}".format(ip,port))
-        while True:
-            conn, addr = proxy.accept()
-            print("[Proxy] Accepted connection from {}".format(addr))
-            #
-            #  TODO: implement the step of the client incomping connection
-            #        using multi-thread programming with the
-            #        provided handle_client routine
-            #
-            print("[Proxy] Accepted connection from {}".format(addr))
-            client_thread = threading.Thread(target=handle_client, args=(ip, port, conn, addr, routes))
-            client_thread.daemon = True
-            client_thread.start()
+        if tls is not None:
+            tls.update(routes.table)
+            _TLS = tls
+            tls_listener, inherited = create_listener(socket.AF_INET, (ip, tls.port), 50, reuse_port)
+            listeners.append(tls_listener)
+            print("[Proxy] Listening for TLS on IP {} port {}".format(ip, tls.port))
+            threading.Thread(target=_accept_loop, name="TLSAccept", daemon=True,
+                             args=(tls_listener, ip, port, routes, deadlines, lifecycle, tls)).start()
+        lifecycle.install_signal_handlers(*listeners)
+        lifecycle.notify_ready()
+        _accept_loop(proxy, ip, port, routes, deadlines, lifecycle)
     except socket.error as e:
         print("Socket error: {}".format(e))
+    except ValueError as e:
+        print("[Proxy] TLS error: {}".format(e))
+    except KeyboardInterrupt:
+        print("\n[Proxy] Shutting down.")
     finally:
-        proxy.close()
+        # Stop accepting, then let the requests in flight finish
+        lifecycle.stop()
+        for listener in listeners:
+            listener.close()
+        lifecycle.drain()
+        print("[Proxy] Cache: {}".format(RESPONSE_CACHE.stats()))
         print("[Proxy] Proxy server shutdown.")
     
-def create_proxy(ip, port, routes):
+def create_proxy(ip, port, routes, deadlines=None, lifecycle=None, reuse_port=False, tls=None):
     """
     Entry point for launching the proxy server.
 
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
     :params routes (dict): dictionary mapping hostnames and location.
+    :params deadlines (ClientDeadlines): slow-client limits, the
+                      ``daemon.deadline`` defaults when omitted.
+    :params lifecycle (Lifecycle): graceful stop and restart control.
+    :params reuse_port (bool): bind with ``SO_REUSEPORT``.
+    :params tls (TLSTerminator): optional HTTPS listener with its certificates.
     """
 
-    run_proxy(ip, port, routes)
+    run_proxy(ip, port, routes, deadlines, lifecycle, reuse_port, tls)
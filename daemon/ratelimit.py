@@ -0,0 +1,267 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.ratelimit
+~~~~~~~~~~~~~~~~~
+
+This module provides the request rate and connection limits of the proxy.
+
+- :class:`TokenBucket <TokenBucket>` refills lazily from the elapsed time, so
+  taking a token is O(1) and needs no timer thread;
+- :class:`KeyedBuckets <KeyedBuckets>` keeps one bucket per client IP and
+  forgets idle (full) buckets in a sweep run every few thousand calls, which
+  keeps the bookkeeping amortized O(1) per request;
+- :class:`ConnectionLimiter <ConnectionLimiter>` counts concurrent requests
+  per client IP and per host;
+- :class:`HostLimits <HostLimits>` combines them for one virtual host, as
+  configured by the ``limit_req_per_ip``, ``limit_req_per_host``,
+  ``limit_conn_per_ip`` and ``limit_conn_per_host`` directives.
+
+A request over any limit is answered ``429 Too Many Requests`` by the proxy.
+
+Usage Example:
+--------------
+>>> limits = HostLimits(req_per_ip=(10.0, 20), conn_per_ip=4)
+>>> rejected = limits.admit('10.0.0.7')
+>>> if rejected is None:
+...     try:
+...         forward()
+...     finally:
+...         limits.release('10.0.0.7')
+"""
+
+import math
+import threading
+import time
+
+#: Calls between two sweeps of idle per-client buckets.
+SWEEP_EVERY = 4096
+
+
+def parse_rate(value):
+    """
+    Parses a request rate such as ``10r/s``, ``600r/m`` or ``5``.
+
+    :param value (str): rate, per second when no unit is given.
+
+    :rtype float: requests per second.
+    :raises ValueError: on a malformed or non-positive rate.
+    """
+    text = value.strip().lower()
+    period = 1.0
+    if text.endswith('r/s'):
+        text = text[:-3]
+    elif text.endswith('r/m'):
+        text, period = text[:-3], 60.0
+    rate = float(text) / period
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    return rate
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at ``rate`` tokens per second up to ``burst``.
+
+    Not thread-safe by itself; callers hold their own lock.
+
+    :attrs rate (float): tokens added per second.
+    :attrs burst (float): bucket capacity.
+    :attrs tokens (float): tokens available at ``stamp``.
+    :attrs stamp (float): monotonic time of the last update.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.stamp = time.monotonic() if now is None else now
+
+    def take(self, now):
+        """
+        Takes one token.
+
+        :param now (float): current monotonic time.
+
+        :rtype float: 0 when a token was taken, otherwise the seconds until
+                      the next token is available.
+        """
+        tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if tokens >= 1.0:
+            self.tokens = tokens - 1.0
+            return 0.0
+        self.tokens = tokens
+        return (1.0 - tokens) / self.rate
+
+    def idle(self, now):
+        """Tells whether the bucket has refilled completely (and can be dropped)."""
+        return self.tokens + (now - self.stamp) * self.rate >= self.burst
+
+
+class KeyedBuckets:
+    """
+    One :class:`TokenBucket <TokenBucket>` per key (client IP).
+
+    :attrs rate (float): tokens per second of each bucket.
+    :attrs burst (float): capacity of each bucket.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """
+        Takes one token from the bucket of ``key``.
+
+        :param key (hashable): client identity.
+        :param now (float): current monotonic time.
+
+        :rtype float: 0 when allowed, otherwise the seconds to wait.
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            wait = bucket.take(now)
+            self._calls += 1
+            if self._calls >= SWEEP_EVERY:
+                self._calls = 0
+                for idle_key in [k for k, b in self._buckets.items() if b.idle(now)]:
+                    del self._buckets[idle_key]
+            return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ConnectionLimiter:
+    """
+    Caps concurrent requests per key (client IP) and in total (host).
+
+    :attrs per_key (int): cap per key, ``None`` for unlimited.
+    :attrs total (int): overall cap, ``None`` for unlimited.
+    """
+
+    def __init__(self, per_key=None, total=None):
+        self.per_key = per_key
+        self.total = total
+        self._counts = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """
+        Registers a request of ``key``.
+
+        :rtype str: ``None`` when admitted, else the name of the exceeded cap.
+        """
+        with self._lock:
+            if self.total is not None and self._active >= self.total:
+                return 'limit_conn_per_host'
+            count = self._counts.get(key, 0)
+            if self.per_key is not None and count >= self.per_key:
+                return 'limit_conn_per_ip'
+            self._counts[key] = count + 1
+            self._active += 1
+            return None
+
+    def release(self, key):
+        """Unregisters a request previously admitted by :meth:`acquire`."""
+        with self._lock:
+            count = self._counts.get(key, 0) - 1
+            if count > 0:
+                self._counts[key] = count
+            else:
+                self._counts.pop(key, None)
+            self._active = max(0, self._active - 1)
+
+    @property
+    def active(self):
+        return self._active
+
+
+class HostLimits:
+    """
+    Request rate and concurrency limits of one virtual host.
+
+    :attrs per_ip (KeyedBuckets): per-client rate limit, or ``None``.
+    :attrs per_host (TokenBucket): rate limit of the whole host, or ``None``.
+    :attrs connections (ConnectionLimiter): concurrency caps, or ``None``.
+    :attrs rejected (int): requests refused so far.
+    """
+
+    def __init__(self, req_per_ip=None, req_per_host=None, conn_per_ip=None, conn_per_host=None):
+        self.per_ip = KeyedBuckets(*req_per_ip) if req_per_ip else None
+        self.per_host = TokenBucket(*req_per_host) if req_per_host else None
+        self.connections = None
+        if conn_per_ip or conn_per_host:
+            self.connections = ConnectionLimiter(conn_per_ip, conn_per_host)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def admit(self, ip):
+        """
+        Checks a request of client ``ip`` against every limit.
+
+        A request admitted here holds a connection slot until :meth:`release`.
+
+        :param ip (str): client IP address.
+
+        :rtype tuple: ``None`` when admitted, else ``(limit name, retry_after)``
+                      with ``retry_after`` in whole seconds.
+        """
+        now = time.monotonic()
+        rejected = None
+        if self.per_ip is not None:
+            wait = self.per_ip.take(ip, now)
+            if wait:
+                rejected = ('limit_req_per_ip', wait)
+        if rejected is None and self.per_host is not None:
+            with self._lock:
+                wait = self.per_host.take(now)
+            if wait:
+                rejected = ('limit_req_per_host', wait)
+        if rejected is None and self.connections is not None:
+            name = self.connections.acquire(ip)
+            if name is not None:
+                rejected = (name, 1.0)
+        if rejected is None:
+            return None
+        self.rejected += 1
+        return rejected[0], max(1, int(math.ceil(rejected[1])))
+
+    def release(self, ip):
+        """Frees the connection slot of an admitted request."""
+        if self.connections is not None:
+            self.connections.release(ip)
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Builds the limits of a host from its route params.
+
+        :rtype HostLimits: the limits, ``None`` when the host sets none.
+        """
+        keys = ('limit_req_per_ip', 'limit_req_per_host', 'limit_conn_per_ip', 'limit_conn_per_host')
+        if not any(params.get(key) for key in keys):
+            return None
+        return cls(*[params.get(key) for key in keys])
@@ -0,0 +1,110 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.reload
+~~~~~~~~~~~~~~~~~
+
+This module provides the reload triggers of the proxy configuration.
+
+A :class:`ConfigReloader <ConfigReloader>` re-parses the configuration file
+and hands the new routes to an ``apply`` callback (``daemon.proxy.reload_routes``)
+when the process receives ``SIGHUP`` or, optionally, when a polling watcher
+notices that the file modification time changed. A configuration that fails
+to parse is reported and the running routes are kept.
+
+Usage Example:
+--------------
+>>> reloader = ConfigReloader("config/proxy.conf", parse_virtual_hosts,
+...                           lambda routes: reload_routes(live, routes))
+>>> reloader.install_signal_handler()
+>>> reloader.watch(interval=2)
+"""
+
+import os
+import signal
+import threading
+
+
+class ConfigReloader:
+    """
+    Reloads a configuration file on demand, on ``SIGHUP`` or on change.
+
+    :attrs path (str): configuration file.
+    :attrs loader (callable): ``loader(path)`` returning the routes.
+    :attrs apply (callable): ``apply(routes)`` installing the routes.
+    :attrs reloads (int): successful reloads.
+    """
+
+    def __init__(self, path, loader, apply):
+        self.path = path
+        self.loader = loader
+        self.apply = apply
+        self.reloads = 0
+        self._mtime = self._stat()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self):
+        """
+        Parses the configuration and applies it.
+
+        :rtype bool: ``True`` if the new configuration was applied.
+        """
+        with self._lock:
+            self._mtime = self._stat()
+            try:
+                routes = self.loader(self.path)
+            except Exception as e:
+                print("[Reload] Keeping current routes, {} is invalid: {}".format(self.path, e))
+                return False
+            self.apply(routes)
+            self.reloads += 1
+            print("[Reload] Applied {} ({} host(s), reload #{})".format(self.path, len(routes), self.reloads))
+            return True
+
+    def install_signal_handler(self):
+        """
+        Reloads on ``SIGHUP``. Must be called from the main thread; does
+        nothing on platforms without ``SIGHUP``.
+        """
+        if not hasattr(signal, 'SIGHUP'):
+            return
+        # Reload off the signal handler so the accept loop is not held up
+        signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(
+            target=self.reload, name="ConfigReload", daemon=True).start())
+        print("[Reload] Send SIGHUP to pid {} to reload {}".format(os.getpid(), self.path))
+
+    def watch(self, interval=2.0):
+        """
+        Starts a daemon thread reloading whenever the file modification time changes.
+
+        :param interval (float): polling period in seconds.
+        """
+        def loop():
+            while not self._stop_event.wait(interval):
+                mtime = self._stat()
+                if mtime is not None and mtime != self._mtime:
+                    self.reload()
+
+        threading.Thread(target=loop, name="ConfigWatcher", daemon=True).start()
+        print("[Reload] Watching {} every {}s".format(self.path, interval))
+
+    def stop(self):
+        """Stops the file watcher."""
+        self._stop_event.set()
@@ -17,6 +17,8 @@ daemon.request
 This module provides a Request object to manage and persist 
 request settings (cookies, auth, proxies).
 """
+from urllib.parse import parse_qsl
+
 from .dictionary import CaseInsensitiveDict
 
 class Request():
@@ -57,6 +59,8 @@ class Request():
         self.headers = CaseInsensitiveDict()
         #: HTTP path
         self.path = None        
+        #: query string parameters of the URL (name -> last value)
+        self.query = {}
         # The cookies set used to create Cookie header
         self.cookies = CaseInsensitiveDict()
         #: request body to send to the server.
@@ -96,6 +100,7 @@ class Request():
             self.headers = CaseInsensitiveDict()
             self.cookies = CaseInsensitiveDict()
             self.body = None
+            self.query = {}
 
             lines = msg.split('\r\n')
             
@@ -106,8 +111,10 @@ class Request():
             request_line = lines[0].split()
             if len(request_line) >= 2:
                 self.method = request_line[0]
-                self.path = request_line[1]
-                self.url = self.path
+                self.url = request_line[1]
+                # Routes match the path alone; the query string is parsed apart
+                self.path, _, query = self.url.partition('?')
+                self.query = dict(parse_qsl(query, keep_blank_values=True))
             
             print("[Request] Parsing request: {} {}".format(self.method, self.path))
             
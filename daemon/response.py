@@ -262,12 +262,14 @@ class Response():
             
         return len(content), content
 
-    def build_response_header(self, request):
+    def build_response_header(self, request, stream=False):
         """
         Constructs the HTTP response headers based on the class:`Request <Request>
         and internal attributes.
 
         :params request (class:`Request <Request>`): incoming request object.
+        :params stream (bool): the body is streamed until the connection
+                               closes, so no ``Content-Length`` is sent.
 
         :rtypes bytes: encoded HTTP response header.
         """
@@ -288,6 +290,8 @@ class Response():
             "Connection": "close",
             "Server": "WeApRous-HTTP-Server/1.0"
         }
+        if stream:
+            del headers["Content-Length"]
 
         # Merge custom headers from the response (Location, Set-Cookie, etc.)
         for key, value in self.headers.items():
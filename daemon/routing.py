@@ -0,0 +1,374 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.routing
+~~~~~~~~~~~~~~~~~
+
+This module compiles the proxy ``routes`` (as produced by
+``start_proxy.parse_virtual_hosts``) into a :class:`RoutingTable <RoutingTable>`
+once at startup, so that the request path only performs a dictionary lookup
+and an upstream selection:
+
+- every ``host:port`` string is parsed once into a shared :class:`Backend <Backend>`,
+  each host reaching it through an :class:`Upstream <Upstream>` with its
+  own weight and failure settings;
+- every host gets a :class:`HostRoute <HostRoute>` holding its
+  :class:`UpstreamGroup <UpstreamGroup>` and its pre-resolved options
+  (deadlines, retries, cache and coalescing settings);
+- every ``location`` block of a host becomes a nested
+  :class:`HostRoute <HostRoute>`; the locations of a host are compiled into
+  a :class:`PrefixTrie <PrefixTrie>` so that the longest matching path
+  prefix is found in one walk of the request path.
+
+A :class:`LiveRoutes <LiveRoutes>` holder lets the configuration be reloaded
+while the proxy runs: a new table is compiled aside and swapped in with a
+single reference assignment, each request keeping the table it started with.
+
+Usage Example:
+--------------
+>>> table = compile_routes(parse_virtual_hosts("config/proxy.conf"))
+>>> route = table.resolve("app2.local", "/static/app.js")
+>>> upstream = route.select(raw_request, addr)
+"""
+
+from .balancer import (UpstreamGroup, DEFAULT_VNODES, DEFAULT_MAX_FAILS, DEFAULT_FAIL_TIMEOUT,
+                       extract_hash_key, get_upstream)
+from .breaker import DEFAULT_THRESHOLD, DEFAULT_RESET_TIMEOUT
+from .ratelimit import HostLimits
+
+#: Default connect, read (per receive) and total deadlines, in seconds.
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_TOTAL_TIMEOUT = 60.0
+
+#: Default number of upstreams tried for one request.
+DEFAULT_TRIES = 2
+
+#: Route used for hostnames missing from the configuration.
+DEFAULT_ROUTE = ('127.0.0.1:9000', 'round-robin')
+
+
+def route_params(route):
+    """Returns the per-host options of a route entry (empty when absent)."""
+    if route and len(route) > 2:
+        return route[2]
+    return {}
+
+
+def build_group(route):
+    """
+    Builds the :class:`UpstreamGroup <UpstreamGroup>` of a route entry, its
+    upstreams carrying the host's weights, ejection and circuit breaker
+    settings (the backends behind them are shared).
+
+    :param route (tuple): ``(proxy_map, policy[, params])``.
+
+    :rtype UpstreamGroup: group of upstreams for the route.
+    """
+    proxy_map, policy = route[0], route[1]
+    params = route_params(route)
+    weights = params.get('weights', {})
+
+    if not isinstance(proxy_map, list):
+        proxy_map = [proxy_map]
+    upstreams = [get_upstream(address, weights.get(address, 1),
+                              params.get('max_fails', DEFAULT_MAX_FAILS),
+                              params.get('fail_timeout', DEFAULT_FAIL_TIMEOUT),
+                              params.get('breaker_threshold', DEFAULT_THRESHOLD),
+                              params.get('breaker_reset_timeout', DEFAULT_RESET_TIMEOUT))
+                 for address in proxy_map]
+    return UpstreamGroup(upstreams, policy,
+                         hash_key=params.get('hash_key'),
+                         vnodes=params.get('hash_vnodes', DEFAULT_VNODES))
+
+
+class _TrieNode:
+    """A node of :class:`PrefixTrie <PrefixTrie>`."""
+
+    __slots__ = ('children', 'value', 'terminal')
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+        self.terminal = False
+
+
+class PrefixTrie:
+    """
+    Radix trie answering longest-prefix queries.
+
+    Edges carry whole string labels and are indexed by their first character,
+    so a lookup costs one dictionary access and one ``startswith`` per edge
+    walked, whatever the number of prefixes stored.
+
+    Usage Example:
+    --------------
+    >>> trie = PrefixTrie([('/static/', 'static'), ('/get-', 'replicas')])
+    >>> trie.longest_match('/get-list')
+    'replicas'
+    """
+
+    def __init__(self, items=()):
+        self.root = _TrieNode()
+        self.size = 0
+        for prefix, value in items:
+            self.insert(prefix, value)
+
+    def insert(self, prefix, value):
+        """
+        Stores a value under a prefix, replacing any previous value.
+
+        :param prefix (str): key prefix.
+        :param value (object): value returned for keys starting with ``prefix``.
+        """
+        node = self.root
+        i = 0
+        while i < len(prefix):
+            edge = node.children.get(prefix[i])
+            if edge is None:
+                leaf = _TrieNode()
+                node.children[prefix[i]] = (prefix[i:], leaf)
+                node = leaf
+                break
+            label, child = edge
+            common = 0
+            limit = min(len(label), len(prefix) - i)
+            while common < limit and label[common] == prefix[i + common]:
+                common += 1
+            if common < len(label):
+                # Split the edge at the end of the common part
+                middle = _TrieNode()
+                middle.children[label[common]] = (label[common:], child)
+                node.children[prefix[i]] = (label[:common], middle)
+                child = middle
+            node = child
+            i += common
+        if not node.terminal:
+            self.size += 1
+        node.value = value
+        node.terminal = True
+
+    def longest_match(self, key, default=None):
+        """
+        Finds the value of the longest stored prefix of ``key``.
+
+        :param key (str): looked up string (a request path).
+        :param default (object): returned when no prefix matches.
+
+        :rtype object: the matching value or ``default``.
+        """
+        node = self.root
+        best = node.value if node.terminal else default
+        i = 0
+        length = len(key)
+        while i < length:
+            edge = node.children.get(key[i])
+            if edge is None:
+                break
+            label, node = edge
+            if not key.startswith(label, i):
+                break
+            i += len(label)
+            if node.terminal:
+                best = node.value
+        return best
+
+    def __len__(self):
+        return self.size
+
+
+class HostRoute:
+    """
+    The compiled routing entry of one virtual host.
+
+    :attrs hostname (str): virtual host name.
+    :attrs group (UpstreamGroup): upstreams and balancing policy.
+    :attrs params (dict): raw per-host options.
+    :attrs timeouts (tuple): ``(connect, read, total)`` deadlines in seconds.
+    :attrs tries (int): upstreams tried per request.
+    :attrs cache (bool): whether the shared response cache is enabled.
+    :attrs coalesce (frozenset): paths whose GETs are coalesced.
+    :attrs coalesce_ttl (float): micro-TTL of coalesced responses.
+    :attrs set_headers (tuple): ``(name, value)`` request headers rewritten
+                                before forwarding.
+    :attrs prefix (str): path prefix of a location route, ``''`` for a host.
+    :attrs locations (tuple): ``(prefix, HostRoute)`` of the host's locations,
+                              longest prefix first.
+    :attrs trie (PrefixTrie): the locations indexed by prefix, ``None`` when
+                              the host has none.
+    :attrs limits (HostLimits): rate and connection limits of a host route,
+                                ``None`` when unlimited (and for locations).
+    :attrs deny (bool): ``deny all``: requests are answered 403, never forwarded.
+    """
+
+    __slots__ = ('hostname', 'group', 'params', 'timeouts', 'tries',
+                 'cache', 'coalesce', 'coalesce_ttl', 'health_check', 'health_interval',
+                 'set_headers', 'prefix', 'locations', 'trie', 'limits', 'deny')
+
+    def __init__(self, hostname, route, prefix=''):
+        params = route_params(route)
+        self.hostname = hostname
+        self.prefix = prefix
+        self.group = build_group(route)
+        self.params = params
+        self.timeouts = (params.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+                         params.get('read_timeout', DEFAULT_READ_TIMEOUT),
+                         params.get('total_timeout', DEFAULT_TOTAL_TIMEOUT))
+        self.tries = max(1, params.get('tries', DEFAULT_TRIES))
+        self.cache = params.get('cache', False)
+        self.coalesce = params.get('coalesce') or frozenset()
+        self.coalesce_ttl = params.get('coalesce_ttl', 0.0)
+        self.health_check = params.get('health_check')
+        self.health_interval = params.get('health_interval')
+        self.set_headers = tuple(params.get('set_headers', ()))
+        self.deny = params.get('deny', False)
+        locations = [(location_prefix, HostRoute(hostname, location_route, location_prefix))
+                     for location_prefix, location_route in params.get('locations', ())]
+        locations.sort(key=lambda location: len(location[0]), reverse=True)
+        self.locations = tuple(locations)
+        self.trie = PrefixTrie(locations) if locations else None
+        self.limits = None if prefix else HostLimits.from_params(params)
+
+    def match(self, path):
+        """
+        Finds the route serving a request path.
+
+        :param path (str): request path.
+
+        :rtype HostRoute: the location with the longest matching prefix,
+                          this route when no location matches.
+        """
+        if self.trie is None:
+            return self
+        return self.trie.longest_match(path, self)
+
+    def routes(self):
+        """Lists this route and its location routes."""
+        return [self] + [location for _, location in self.locations]
+
+    def select(self, request=None, addr=None, exclude=None):
+        """
+        Picks the upstream of a request.
+
+        :param request (str): raw request, read by the ``hash`` policy key.
+        :param addr (tuple): client address (IP, port).
+        :param exclude (list): upstreams already tried for this request.
+
+        :rtype Upstream: the selected upstream, ``None`` if all are excluded.
+        """
+        group = self.group
+        key = extract_hash_key(group.hash_key, request, addr) if group.policy == 'hash' else None
+        return group.select(key, exclude)
+
+    def __repr__(self):
+        return "<HostRoute {}{} {} {}>".format(self.hostname, self.prefix, self.group.policy,
+                                            [u.address for u in self.group.upstreams])
+
+
+class RoutingTable:
+    """
+    Immutable mapping of hostnames to :class:`HostRoute <HostRoute>`.
+
+    :attrs hosts (dict): hostname -> HostRoute.
+    :attrs default (HostRoute): route of unknown hostnames.
+    """
+
+    def __init__(self, hosts, default):
+        self.hosts = hosts
+        self.default = default
+
+    def lookup(self, hostname):
+        """
+        Finds the route of a hostname.
+
+        :param hostname (str): value of the Host header.
+
+        :rtype HostRoute: the host's route or the default route.
+        """
+        return self.hosts.get(hostname, self.default)
+
+    def resolve(self, hostname, path):
+        """
+        Finds the route of a request.
+
+        :param hostname (str): value of the Host header.
+        :param path (str): request path.
+
+        :rtype HostRoute: the matching location or host route.
+        """
+        return self.hosts.get(hostname, self.default).match(path)
+
+    def __contains__(self, hostname):
+        return hostname in self.hosts
+
+    def __len__(self):
+        return len(self.hosts)
+
+
+def compile_routes(routes):
+    """
+    Compiles a ``routes`` dictionary into a :class:`RoutingTable <RoutingTable>`.
+
+    :param routes (dict): hostname -> ``(proxy_map, policy[, params])``.
+
+    :rtype RoutingTable: the compiled table.
+    """
+    hosts = {}
+    for hostname, route in routes.items():
+        hosts[hostname] = HostRoute(hostname, route)
+    return RoutingTable(hosts, HostRoute('', DEFAULT_ROUTE))
+
+
+def table_upstreams(table):
+    """
+    Lists the backends referenced by a table.
+
+    :param table (RoutingTable): compiled table.
+
+    :rtype dict: address -> Backend, including the default route.
+    """
+    backends = {}
+    for host in list(table.hosts.values()) + [table.default]:
+        for route in host.routes():
+            for upstream in route.group.upstreams:
+                backends[upstream.address] = upstream.backend
+    return backends
+
+
+class LiveRoutes:
+    """
+    Holder of the routing table currently in use by the proxy.
+
+    Readers take ``live.table`` once per request; :meth:`swap` replaces it
+    atomically (a single reference assignment).
+
+    :attrs table (RoutingTable): table used for new requests.
+    :attrs generation (int): incremented at every swap.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.generation = 1
+
+    def swap(self, table):
+        """
+        Installs a new table.
+
+        :param table (RoutingTable): the new table.
+
+        :rtype RoutingTable: the previous table.
+        """
+        previous = self.table
+        self.table = table
+        self.generation += 1
+        return previous
@@ -0,0 +1,280 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.timerwheel
+~~~~~~~~~~~~~~~~~
+
+This module provides a hashed timing wheel: one background thread serving
+any number of timers with O(1) scheduling and cancellation.
+
+The wheel is a ring of ``slots`` buckets advanced every ``tick`` seconds. A
+timer due in ``n`` ticks is dropped in bucket ``(cursor + n) % slots`` with
+the number of full turns it must wait; each tick only looks at the bucket
+under the cursor. Timers fire up to one tick late, which is plenty for I/O
+deadlines measured in seconds.
+
+A timer due in more than one turn is looked at on every turn until then,
+which gets costly with many long timers. :class:`HierarchicalTimerWheel
+<HierarchicalTimerWheel>` stacks wheels of growing resolution instead (like
+a clock's seconds, minutes and hours hands): a timer sits in the coarsest
+level matching its delay and moves down one level each time that level's
+bucket comes due, so it is touched at most once per level whatever its
+delay, i.e. O(1) amortized per timer.
+
+Usage Example:
+--------------
+>>> wheel = TimerWheel(tick=0.1)
+>>> timer = wheel.schedule(10.0, lambda: conn.shutdown(socket.SHUT_RDWR))
+>>> ...
+>>> timer.cancel()
+"""
+
+import math
+import threading
+import time
+
+#: Default resolution of the wheel, in seconds.
+DEFAULT_TICK = 0.1
+
+#: Default number of buckets (one turn = ``DEFAULT_SLOTS * DEFAULT_TICK`` seconds).
+DEFAULT_SLOTS = 512
+
+#: Default shape of a hierarchical wheel: ``DEFAULT_LEVEL_SLOTS`` buckets per
+#: level, ``DEFAULT_LEVELS`` levels (256 ** 3 ticks of 0.1 s, about 19 days).
+#: Wide levels keep the buckets moved down at once small.
+DEFAULT_LEVEL_SLOTS = 256
+DEFAULT_LEVELS = 3
+
+
+class Timer:
+    """
+    A scheduled callback.
+
+    :attrs callback (callable): function called without arguments on expiry.
+    :attrs rounds (int): full wheel turns left before expiry.
+    :attrs slot (int): bucket holding the timer.
+    """
+
+    __slots__ = ('wheel', 'callback', 'rounds', 'slot', 'active')
+
+    def __init__(self, wheel, callback, rounds, slot):
+        self.wheel = wheel
+        self.callback = callback
+        self.rounds = rounds
+        self.slot = slot
+        self.active = True
+
+    def cancel(self):
+        """Cancels the timer; does nothing if it already fired."""
+        self.wheel.cancel(self)
+
+
+class TimerWheel(threading.Thread):
+    """
+    Hashed timing wheel running its callbacks on its own daemon thread.
+
+    The thread starts with the first :meth:`schedule`.
+
+    :attrs tick (float): resolution in seconds.
+    :attrs fired (int): timers expired so far.
+    """
+
+    def __init__(self, tick=DEFAULT_TICK, slots=DEFAULT_SLOTS):
+        threading.Thread.__init__(self, name="TimerWheel", daemon=True)
+        self.tick = float(tick)
+        self.fired = 0
+        self._slots = [set() for _ in range(slots)]
+        self._cursor = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def schedule(self, delay, callback):
+        """
+        Calls ``callback`` in about ``delay`` seconds.
+
+        :param delay (float): seconds until expiry.
+        :param callback (callable): function called on the wheel thread;
+                                    it must be quick and must not raise.
+
+        :rtype Timer: handle used to cancel the timer.
+        """
+        ticks = max(1, int(math.ceil(delay / self.tick)))
+        with self._lock:
+            timer = self._add(ticks, callback)
+            self._count += 1
+            if not self.is_alive() and not self._stop_event.is_set():
+                try:
+                    self.start()
+                except RuntimeError:
+                    # Already started by a concurrent caller
+                    pass
+        return timer
+
+    def cancel(self, timer):
+        """
+        Cancels a timer.
+
+        :param timer (Timer): handle returned by :meth:`schedule`.
+        """
+        with self._lock:
+            if timer.active:
+                timer.active = False
+                self._remove(timer)
+                self._count -= 1
+
+    def _add(self, ticks, callback):
+        """Files a new timer due in ``ticks`` ticks; called with the lock held."""
+        size = len(self._slots)
+        slot = (self._cursor + ticks) % size
+        timer = Timer(self, callback, (ticks - 1) // size, slot)
+        self._slots[slot].add(timer)
+        return timer
+
+    def _remove(self, timer):
+        """Unfiles a cancelled timer; called with the lock held."""
+        self._slots[timer.slot].discard(timer)
+
+    def stop(self):
+        """Stops the wheel thread; pending timers never fire."""
+        self._stop_event.set()
+
+    def _advance(self):
+        """Moves the cursor one bucket and returns the callbacks due."""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            bucket = self._slots[self._cursor]
+            if not bucket:
+                return []
+            due = []
+            for timer in list(bucket):
+                if timer.rounds:
+                    timer.rounds -= 1
+                    continue
+                bucket.discard(timer)
+                timer.active = False
+                due.append(timer.callback)
+            self._count -= len(due)
+            return due
+
+    def run(self):
+        next_tick = time.monotonic() + self.tick
+        while not self._stop_event.is_set():
+            delay = next_tick - time.monotonic()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+            # Catch up on the ticks missed while callbacks ran
+            while next_tick <= time.monotonic():
+                next_tick += self.tick
+                for callback in self._advance():
+                    try:
+                        callback()
+                    except Exception as e:
+                        print("[TimerWheel] Timer callback failed: {}".format(e))
+                    self.fired += 1
+
+    def __len__(self):
+        return self._count
+
+
+class _LevelTimer(Timer):
+    """
+    A timer of a :class:`HierarchicalTimerWheel <HierarchicalTimerWheel>`.
+
+    :attrs expires (int): tick at which the timer fires.
+    :attrs level (int): level holding the timer.
+    """
+
+    __slots__ = ('expires', 'level')
+
+    def __init__(self, wheel, callback, expires):
+        Timer.__init__(self, wheel, callback, 0, 0)
+        self.expires = expires
+        self.level = 0
+
+
+class HierarchicalTimerWheel(TimerWheel):
+    """
+    Hierarchical timing wheel, for many long timers (e.g. leases).
+
+    Level ``n`` has ``slots`` buckets of ``slots ** n`` ticks each. A timer
+    goes to the lowest level whose span covers its delay; when the cursor
+    reaches a bucket of level ``n > 0`` its timers are filed again, into
+    lower levels. Timers beyond the top level's span wait there and are
+    filed again on each of its turns.
+
+    :attrs tick (float): resolution in seconds.
+    :attrs fired (int): timers expired so far.
+    :attrs cascaded (int): timers moved down a level so far.
+    """
+
+    def __init__(self, tick=DEFAULT_TICK, slots=DEFAULT_LEVEL_SLOTS, levels=DEFAULT_LEVELS):
+        TimerWheel.__init__(self, tick, slots)
+        self.name = "HierarchicalTimerWheel"
+        self.cascaded = 0
+        self._size = slots
+        self._levels = [[set() for _ in range(slots)] for _ in range(max(1, levels))]
+        # Ticks elapsed since the start; _cursor is unused
+        self._now = 0
+
+    def _file(self, timer):
+        """Puts a timer in the bucket matching its remaining delay."""
+        delay = timer.expires - self._now
+        level, span = 0, self._size
+        while delay >= span and level < len(self._levels) - 1:
+            level += 1
+            span *= self._size
+        timer.level = level
+        timer.slot = (timer.expires // (span // self._size)) % self._size
+        self._levels[level][timer.slot].add(timer)
+
+    def _add(self, ticks, callback):
+        timer = _LevelTimer(self, callback, self._now + ticks)
+        self._file(timer)
+        return timer
+
+    def _remove(self, timer):
+        self._levels[timer.level][timer.slot].discard(timer)
+
+    def _advance(self):
+        """Moves one tick forward and returns the callbacks due."""
+        with self._lock:
+            self._now += 1
+            # Refill the lower levels first, coarsest first, whenever the
+            # finer level below wraps around
+            span = 1
+            wraps = []
+            for level in range(1, len(self._levels)):
+                span *= self._size
+                if self._now % span:
+                    break
+                wraps.append((level, (self._now // span) % self._size))
+            for level, slot in reversed(wraps):
+                bucket = self._levels[level][slot]
+                if bucket:
+                    self._levels[level][slot] = set()
+                    for timer in bucket:
+                        self._file(timer)
+                    self.cascaded += len(bucket)
+
+            slot = self._now % self._size
+            bucket = self._levels[0][slot]
+            if not bucket:
+                return []
+            self._levels[0][slot] = set()
+            due = []
+            for timer in bucket:
+                timer.active = False
+                due.append(timer.callback)
+            self._count -= len(due)
+            return due
@@ -0,0 +1,185 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.tls
+~~~~~~~~~~~~~~~~~
+
+This module provides TLS termination for the proxy with the stdlib ``ssl``
+module, so clients can connect over HTTPS without a separate terminator.
+
+- **SNI**: each host may set its own ``ssl_certificate`` and
+  ``ssl_certificate_key``; the certificate is picked from the server name
+  sent by the client, the default one is used otherwise (no SNI, IP address
+  or unknown name).
+- **Session resumption**: returning clients skip the full handshake, through
+  TLS 1.3 session tickets or the TLS 1.2 session cache. Both live in the
+  default context, which OpenSSL keeps as the session context even when SNI
+  switches to a per-host certificate, so resumption works for every host.
+- Contexts are cached by certificate file and modification time: a config
+  reload keeps them (and the sessions they issued) unless a file changed.
+
+The handshake runs in the client thread (not in the accept loop) and is
+bounded by the client header timeout.
+
+Usage Example:
+--------------
+>>> tls = TLSTerminator(443, "certs/default.pem", "certs/default.key")
+>>> tls.update(routing_table)
+>>> conn = tls.handshake(conn, addr, timeout=10)
+"""
+
+import os
+import ssl
+import threading
+
+#: Default port of the TLS listener.
+DEFAULT_TLS_PORT = 8443
+
+#: Handshakes between two summary lines in the log.
+LOG_EVERY = 1000
+
+
+class TLSTerminator:
+    """
+    Server-side TLS contexts of the proxy, one per certificate.
+
+    :attrs port (int): port of the TLS listener.
+    :attrs certfile (str): default certificate (PEM), may be ``None`` when
+                           a host of the configuration provides one.
+    :attrs keyfile (str): private key of the default certificate.
+    :attrs full (int): full handshakes completed.
+    :attrs resumed (int): abbreviated (resumed) handshakes completed.
+    :attrs failed (int): handshakes that failed or timed out.
+    """
+
+    def __init__(self, port=DEFAULT_TLS_PORT, certfile=None, keyfile=None):
+        self.port = port
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.full = 0
+        self.resumed = 0
+        self.failed = 0
+        self._default = None
+        self._hosts = {}
+        self._contexts = {}
+        self._lock = threading.Lock()
+
+    def _context(self, certfile, keyfile):
+        """Returns the context of a certificate, reusing it while its files are unchanged."""
+        key = (certfile, keyfile, os.stat(certfile).st_mtime, os.stat(keyfile or certfile).st_mtime)
+        context = self._contexts.get(key)
+        if context is None:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(certfile, keyfile)
+            context.set_alpn_protocols(['http/1.1'])
+        return key, context
+
+    def update(self, table):
+        """
+        Loads the certificates of a routing table.
+
+        :param table (RoutingTable): compiled routes; host-level params may
+                                     carry ``ssl_certificate`` and
+                                     ``ssl_certificate_key``.
+
+        :raises ValueError: when no default certificate is available.
+        :raises OSError, ssl.SSLError: when a certificate cannot be loaded.
+        """
+        contexts = {}
+        hosts = {}
+        default = None
+        if self.certfile:
+            key, default = self._context(self.certfile, self.keyfile)
+            contexts[key] = default
+        for hostname, host in sorted(table.hosts.items()):
+            certfile = host.params.get('ssl_certificate')
+            if not certfile:
+                continue
+            key, context = self._context(certfile, host.params.get('ssl_certificate_key'))
+            contexts[key] = context
+            # SNI carries the bare name, without the port of the Host header
+            hosts[hostname.rsplit(':', 1)[0].lower()] = context
+            if default is None:
+                default = context
+        if default is None:
+            raise ValueError("TLS needs a default certificate or a host with ssl_certificate")
+
+        if default is not self._default:
+            default.sni_callback = self._select
+        with self._lock:
+            self._contexts = contexts
+            self._hosts = hosts
+            self._default = default
+        print("[TLS] {} certificate(s), {} SNI host(s)".format(len(contexts), len(hosts)))
+
+    def _select(self, conn, server_name, context):
+        """SNI callback switching the connection to the certificate of its host."""
+        if server_name:
+            selected = self._hosts.get(server_name.lower())
+            if selected is not None and selected is not context:
+                conn.context = selected
+        return None
+
+    def handshake(self, conn, addr, timeout):
+        """
+        Performs the server handshake on an accepted connection.
+
+        :param conn (socket.socket): plaintext client connection.
+        :param addr (tuple): client address, for the log.
+        :param timeout (float): seconds allowed for the handshake.
+
+        :rtype ssl.SSLSocket: the encrypted connection, ``None`` on failure
+                              (the connection is then closed).
+        """
+        with self._lock:
+            context = self._default
+        tls_conn = None
+        try:
+            tls_conn = context.wrap_socket(conn, server_side=True, do_handshake_on_connect=False)
+            tls_conn.settimeout(timeout)
+            tls_conn.do_handshake()
+            tls_conn.settimeout(None)
+        except (OSError, ValueError) as e:
+            # ssl.SSLError and socket.timeout are OSErrors
+            with self._lock:
+                self.failed += 1
+            print("[TLS] Handshake with {} failed: {}".format(addr, e))
+            # wrap_socket detaches conn, its descriptor now belongs to tls_conn
+            (tls_conn or conn).close()
+            return None
+
+        with self._lock:
+            if tls_conn.session_reused:
+                self.resumed += 1
+            else:
+                self.full += 1
+            if (self.full + self.resumed) % LOG_EVERY == 0:
+                print("[TLS] Handshakes: {}".format(self._stats()))
+        return tls_conn
+
+    def _stats(self):
+        return {
+            'full': self.full,
+            'resumed': self.resumed,
+            'failed': self.failed,
+            'session_cache': self._default.session_stats()['number'] if self._default else 0,
+        }
+
+    def stats(self):
+        """
+        Returns the handshake counters.
+
+        :rtype dict: full, resumed and failed handshakes, cached sessions.
+        """
+        with self._lock:
+            return self._stats()
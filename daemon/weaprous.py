@@ -17,7 +17,13 @@ deamon.weaproute
 This module provides a WeApRous object to deploy RESTful url web app with routing
 """
 
-from .backend import create_backend
+import inspect
+
+from .admission import AdmissionController, DEFAULT_TARGET, DEFAULT_INTERVAL, DEFAULT_MAX_LONG_LIVED
+from .backend import create_backend, DEFAULT_BACKLOG
+from .lifecycle import Lifecycle, DEFAULT_DRAIN_TIMEOUT
+from .deadline import (ClientDeadlines, DEFAULT_HEADER_TIMEOUT, DEFAULT_BODY_TIMEOUT,
+                       DEFAULT_WRITE_TIMEOUT, DEFAULT_MIN_RATE)
 
 class WeApRous:
     """The fully mutable :class:`WeApRous <WeApRous>` object, which is a lightweight,
@@ -52,24 +58,82 @@ class WeApRous:
         self.routes = {}
         self.ip = None
         self.port = None
+        self.unix_path = None
+        self.backlog = DEFAULT_BACKLOG
+        self.admission = None
+        self.deadlines = None
+        self.lifecycle = None
+        self.reuse_port = False
         return
 
-    def prepare_address(self, ip, port):
+    def prepare_address(self, ip, port, unix_path=None):
         """
         Configure the IP address and port for the backend server.
 
         :param ip (str): The IP address to bind the server.
         :param port (str): The port number to listen on.
+        :param unix_path (str): Optional Unix domain socket to listen on
+                                instead of the TCP address.
         """
         self.ip = ip
         self.port = port
+        self.unix_path = unix_path
+
+    def prepare_admission(self, max_in_flight, max_queue=None, target=DEFAULT_TARGET,
+                          interval=DEFAULT_INTERVAL, backlog=DEFAULT_BACKLOG,
+                          max_long_lived=DEFAULT_MAX_LONG_LIVED):
+        """
+        Bound the requests handled concurrently and shed the excess with 503.
+
+        :param max_in_flight (int): worker threads serving requests.
+        :param max_queue (int): connections allowed to wait for a worker.
+        :param target (float): tolerated queue wait under a standing queue (s).
+        :param interval (float): standing-queue window and normal tolerated wait (s).
+        :param backlog (int): length of the kernel accept queue.
+        :param max_long_lived (int): requests of ``long_lived`` routes held
+                                     open outside the worker pool.
+        """
+        self.admission = AdmissionController(max_in_flight, max_queue, target, interval,
+                                             max_long_lived=max_long_lived)
+        self.backlog = backlog
 
-    def route(self, path, methods=['GET']):
+    def prepare_deadlines(self, header_timeout=DEFAULT_HEADER_TIMEOUT, body_timeout=DEFAULT_BODY_TIMEOUT,
+                          write_timeout=DEFAULT_WRITE_TIMEOUT, min_rate=DEFAULT_MIN_RATE):
+        """
+        Configure the deadlines protecting the server against slow clients.
+
+        :param header_timeout (float): seconds to receive the request head.
+        :param body_timeout (float): base seconds to receive the body.
+        :param write_timeout (float): base seconds to send the response.
+        :param min_rate (int): minimum transfer rate in bytes per second.
+        """
+        self.deadlines = ClientDeadlines(header_timeout, body_timeout, write_timeout, min_rate)
+
+    def prepare_lifecycle(self, drain_timeout=DEFAULT_DRAIN_TIMEOUT, reuse_port=False):
+        """
+        Configure graceful shutdown and restart.
+
+        :param drain_timeout (float): seconds in-flight requests get to finish
+                                      on ``SIGTERM``, Ctrl+C or ``SIGUSR2``.
+        :param reuse_port (bool): bind with ``SO_REUSEPORT`` so a new instance
+                                  can start on the same port before this one stops.
+        """
+        self.lifecycle = Lifecycle("Backend", drain_timeout)
+        self.reuse_port = reuse_port
+
+    def route(self, path, methods=['GET'], long_lived=False):
         """
         Decorator to register a route handler for a specific path and HTTP methods.
 
-        :param path (str): The URL path to route.
+        The handler is called as ``func(headers, body)``; a handler declaring
+        a ``query`` parameter also gets the parsed query string as a dict.
+
+        :param path (str): The URL path to route (without query string).
         :param methods (list): A list of HTTP methods (e.g., ['GET', 'POST']) to bind.
+        :param long_lived (bool): the handler holds its connection open for
+                                  long (long poll, event stream); under
+                                  admission control it does not take a
+                                  worker of the pool meanwhile.
 
         :rtype: function - A decorator that registers the handler function.
         """
@@ -84,6 +148,8 @@ class WeApRous:
             # Optional attach route metadata to the function
             func._route_path = path
             func._route_methods = methods
+            func._route_query = 'query' in inspect.signature(func).parameters
+            func._long_lived = long_lived
 
             return func
         return decorator
@@ -97,9 +163,11 @@ class WeApRous:
 
         :raise: Error if IP or port has not been configured.
         """
-        if not self.ip or not self.port:
+        if not self.unix_path and (not self.ip or not self.port):
             print("Rous app need to preapre address"
                   "by calling app.prepare_address(ip,port)")
 
-        create_backend(self.ip, self.port, self.routes)
+        create_backend(self.ip, self.port, self.routes, self.unix_path,
+                       self.backlog, self.admission, self.deadlines,
+                       self.lifecycle, self.reuse_port)
         
@@ -71,6 +71,11 @@ import os
 import urllib.parse
 
 from daemon import create_backend
+from daemon.admission import AdmissionController, DEFAULT_TARGET
+from daemon.backend import DEFAULT_BACKLOG
+from daemon.lifecycle import Lifecycle, DEFAULT_DRAIN_TIMEOUT
+from daemon.deadline import (ClientDeadlines, DEFAULT_HEADER_TIMEOUT, DEFAULT_BODY_TIMEOUT,
+                             DEFAULT_WRITE_TIMEOUT, DEFAULT_MIN_RATE)
 
 # Default port number used if none is specified via command-line arguments.
 PORT = 9000 
@@ -215,13 +220,81 @@ if __name__ == "__main__":
         default=PORT,
         help='Port number to bind the server. Default is {}.'.format(PORT)
     )
+    parser.add_argument(
+        '--unix-socket',
+        type=str,
+        default=None,
+        help='Listen on this Unix domain socket instead of TCP (proxy_pass unix:/path.sock).'
+    )
+    parser.add_argument(
+        '--backlog',
+        type=int,
+        default=DEFAULT_BACKLOG,
+        help='Length of the kernel accept queue. Default is {}.'.format(DEFAULT_BACKLOG)
+    )
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=0,
+        help='Serve at most N requests at once and shed the excess with 503. Default is unbounded.'
+    )
+    parser.add_argument(
+        '--queue-target-ms',
+        type=float,
+        default=DEFAULT_TARGET * 1000,
+        help='Queue wait tolerated under sustained overload, in ms. Default is {}.'.format(DEFAULT_TARGET * 1000)
+    )
+    parser.add_argument(
+        '--client-header-timeout',
+        type=float,
+        default=DEFAULT_HEADER_TIMEOUT,
+        help='Seconds allowed to receive the request headers. Default is {}.'.format(DEFAULT_HEADER_TIMEOUT)
+    )
+    parser.add_argument(
+        '--client-body-timeout',
+        type=float,
+        default=DEFAULT_BODY_TIMEOUT,
+        help='Base seconds allowed to receive the request body. Default is {}.'.format(DEFAULT_BODY_TIMEOUT)
+    )
+    parser.add_argument(
+        '--send-timeout',
+        type=float,
+        default=DEFAULT_WRITE_TIMEOUT,
+        help='Base seconds allowed to send the response. Default is {}.'.format(DEFAULT_WRITE_TIMEOUT)
+    )
+    parser.add_argument(
+        '--client-min-rate',
+        type=int,
+        default=DEFAULT_MIN_RATE,
+        help='Minimum client transfer rate in bytes/s. Default is {}.'.format(DEFAULT_MIN_RATE)
+    )
+    parser.add_argument(
+        '--drain-timeout',
+        type=float,
+        default=DEFAULT_DRAIN_TIMEOUT,
+        help='Seconds in-flight requests get to finish on shutdown or restart. Default is {}.'.format(DEFAULT_DRAIN_TIMEOUT)
+    )
+    parser.add_argument(
+        '--reuse-port',
+        action='store_true',
+        help='Bind with SO_REUSEPORT so a new instance can start before this one stops.'
+    )
  
     args = parser.parse_args()
     ip = args.server_ip
     port = args.server_port
 
+    admission = None
+    if args.max_in_flight > 0:
+        admission = AdmissionController(args.max_in_flight, target=args.queue_target_ms / 1000.0)
+
+    deadlines = ClientDeadlines(args.client_header_timeout, args.client_body_timeout,
+                                args.send_timeout, args.client_min_rate)
+
     print("[Backend] Routes configured: {}".format(list(routes.keys())))
     try:
-        create_backend(ip, port, routes=routes)
+        create_backend(ip, port, routes=routes, unix_path=args.unix_socket,
+                       backlog=args.backlog, admission=admission, deadlines=deadlines,
+                       lifecycle=Lifecycle("Backend", args.drain_timeout), reuse_port=args.reuse_port)
     except KeyboardInterrupt:
         print("\n[Backend] Shutdown requested (Ctrl+C). Goodbye!")
\ No newline at end of file
@@ -27,7 +27,7 @@ Requirements:
 - socket: provide socket networking interface.
 - threading: enables concurrent client handling via threads.
 - argparse: parses command-line arguments for server configuration.
-- re: used for regular expression matching in configuration parsing
+- daemon.config: parses and validates the configuration file.
 - response: response utilities.
 - httpadapter: the class for handling HTTP requests.
 - urlparse: parses URLs to extract host and port information.
@@ -38,11 +38,21 @@ Requirements:
 import socket
 import threading
 import argparse
-import re
 from urllib.parse import urlparse
 from collections import defaultdict
 
 from daemon import create_proxy
+from daemon.config import load_config
+from daemon.lifecycle import Lifecycle, DEFAULT_DRAIN_TIMEOUT
+from daemon.deadline import (ClientDeadlines, DEFAULT_HEADER_TIMEOUT, DEFAULT_BODY_TIMEOUT,
+                             DEFAULT_WRITE_TIMEOUT, DEFAULT_MIN_RATE,
+                             DEFAULT_KEEPALIVE_TIMEOUT, DEFAULT_KEEPALIVE_REQUESTS)
+from daemon.tls import TLSTerminator
+from daemon.proxy import reload_routes
+from daemon.reload import ConfigReloader
+from daemon.routing import LiveRoutes, compile_routes
+
+PROXY_CONFIG = "config/proxy.conf"
 
 PROXY_PORT = 8080
 
@@ -51,50 +61,18 @@ def parse_virtual_hosts(config_file):
     """
     Parses virtual host blocks from a config file.
 
+    The file is parsed and validated by :func:`daemon.config.load_config`,
+    which raises :class:`ConfigError <ConfigError>` (with file and line) on
+    unknown directives, misplaced directives or invalid values.
+
     :config_file (str): Path to the NGINX config file.
-    :rtype list of dict: Each dict contains 'listen'and 'server_name'.
+    :rtype dict: hostname -> (proxy_map, dist_policy, params), where params
+                 holds per-host options such as the ``weights`` of each
+                 ``proxy_pass http://ip:port weight=N;`` entry and the
+                 ``locations`` of the host.
     """
 
-    with open(config_file, 'r') as f:
-        config_text = f.read()
-
-    # Match each host block
-    host_blocks = re.findall(r'host\s+"([^"]+)"\s*\{(.*?)\}', config_text, re.DOTALL)
-
-    dist_policy_map = ""
-
-    routes = {}
-    for host, block in host_blocks:
-        proxy_map = {}
-
-        # Find all proxy_pass entries
-        proxy_passes = re.findall(r'proxy_pass\s+http://([^\s;]+);', block)
-        map = proxy_map.get(host,[])
-        map = map + proxy_passes
-        proxy_map[host] = map
-
-        # Find dist_policy if present
-        policy_match = re.search(r'dist_policy\s+(\w+)', block)
-        if policy_match:
-            dist_policy_map = policy_match.group(1)
-        else: #default policy is round_robin
-            dist_policy_map = 'round-robin'
-            
-        #
-        # @bksysnet: Build the mapping and policy
-        # TODO: this policy varies among scenarios 
-        #       the default policy is provided with one proxy_pass
-        #       In the multi alternatives of proxy_pass then
-        #       the policy is applied to identify the highes matching
-        #       proxy_pass
-        #
-        if len(proxy_map.get(host,[])) == 1:
-            routes[host] = (proxy_map.get(host,[])[0], dist_policy_map)
-        # esle if:
-        #         TODO:  apply further policy matching here
-        #
-        else:
-            routes[host] = (proxy_map.get(host,[]), dist_policy_map)
+    routes = load_config(config_file).to_routes()
 
     for key, value in routes.items():
         print(key, value)
@@ -111,19 +89,61 @@ if __name__ == "__main__":
 
     :arg --server-ip (str): IP address to bind the server (default: 127.0.0.1).
     :arg --server-port (int): Port number to bind the server (default: 9000).
+    :arg --watch-config (float): poll the config file every N seconds and
+                                 reload it on change (default: 0, SIGHUP only).
+    :arg --client-header-timeout, --client-body-timeout, --send-timeout (float):
+         slow-client deadlines in seconds.
+    :arg --client-min-rate (int): minimum client transfer rate in bytes/s.
+    :arg --drain-timeout (float): seconds in-flight requests get to finish on
+                                  SIGTERM/Ctrl+C, or after a SIGUSR2 restart.
+    :arg --reuse-port: bind with SO_REUSEPORT to overlap with a new instance.
+    :arg --keepalive-timeout (float): seconds an idle client connection is kept
+                                      open (0 closes after each response).
+    :arg --keepalive-requests (int): requests served on one client connection.
+    :arg --tls-port (int): also accept HTTPS on this port (default: 0, off).
+    :arg --tls-cert, --tls-key (str): default certificate and key; hosts may
+                                      set their own with ``ssl_certificate``.
     """
 
     parser = argparse.ArgumentParser(prog='Proxy', description='', epilog='Proxy daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PROXY_PORT)
+    parser.add_argument('--watch-config', type=float, default=0)
+    parser.add_argument('--client-header-timeout', type=float, default=DEFAULT_HEADER_TIMEOUT)
+    parser.add_argument('--client-body-timeout', type=float, default=DEFAULT_BODY_TIMEOUT)
+    parser.add_argument('--send-timeout', type=float, default=DEFAULT_WRITE_TIMEOUT)
+    parser.add_argument('--client-min-rate', type=int, default=DEFAULT_MIN_RATE)
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT)
+    parser.add_argument('--reuse-port', action='store_true')
+    parser.add_argument('--keepalive-timeout', type=float, default=DEFAULT_KEEPALIVE_TIMEOUT)
+    parser.add_argument('--keepalive-requests', type=int, default=DEFAULT_KEEPALIVE_REQUESTS)
+    parser.add_argument('--tls-port', type=int, default=0)
+    parser.add_argument('--tls-cert')
+    parser.add_argument('--tls-key')
  
     args = parser.parse_args()
     ip = args.server_ip
     port = args.server_port
 
-    routes = parse_virtual_hosts("config/proxy.conf")
+    deadlines = ClientDeadlines(args.client_header_timeout, args.client_body_timeout,
+                                args.send_timeout, args.client_min_rate,
+                                keepalive_timeout=args.keepalive_timeout,
+                                keepalive_requests=args.keepalive_requests)
+    tls = TLSTerminator(args.tls_port, args.tls_cert, args.tls_key) if args.tls_port else None
+
+    routes = parse_virtual_hosts(PROXY_CONFIG)
+    live = LiveRoutes(compile_routes(routes))
+
+    # Reload on SIGHUP (and on file change with --watch-config) without
+    # restarting the proxy or dropping in-flight connections
+    reloader = ConfigReloader(PROXY_CONFIG, parse_virtual_hosts,
+                              lambda new_routes: reload_routes(live, new_routes))
+    reloader.install_signal_handler()
+    if args.watch_config > 0:
+        reloader.watch(args.watch_config)
+
     print("[Proxy] Starting Proxy Server on {}:{}".format(ip, port))
     try:
-        create_proxy(ip, port, routes)
+        create_proxy(ip, port, live, deadlines, Lifecycle("Proxy", args.drain_timeout), args.reuse_port, tls)
     except KeyboardInterrupt:
         print("\n[Proxy] Shutdown requested (Ctrl+C). Proxy stopped.")
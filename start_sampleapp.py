@@ -24,32 +24,76 @@ HTTP requests. The application includes a login endpoint and a greeting endpoint
 and can be configured via command-line arguments.
 """
 
+import hmac
 import json
+import time
+import base64
 import socket
 import argparse
-
-import threading
+import functools
 
 from daemon.weaprous import WeApRous
+from daemon.admission import DEFAULT_MAX_LONG_LIVED
+from tracker import (TrackerStore, PresenceLeases, Persistence, ReplicationSource, ReplicaFollower,
+                     DEFAULT_CHANNEL, DEFAULT_LEASE_TTL)
+from tracker.persistence import encode_snapshot
+from tracker.replication import TOKEN_HEADER
 
 PORT = 8000  # Default port
 
-db_lock = threading.Lock()
-
-# List to save login info
-USERS = {}
-
-
-# List to save online peers
-ONLINE_PEERS = {}
+# /watch: thời gian chờ mặc định và tối đa của một long-poll (giây), dưới
+# read timeout mặc định của proxy (30s) để không bị proxy cắt ngang
+WATCH_TIMEOUT = 25
+WATCH_MAX_TIMEOUT = 60
+# /watch-stream: gửi comment giữ kết nối mỗi WATCH_HEARTBEAT giây (phát hiện
+# client đã đi), và đóng stream sau WATCH_STREAM_LIFETIME giây; client SSE tự
+# kết nối lại với Last-Event-ID nên không mất thay đổi nào
+WATCH_HEARTBEAT = 15
+WATCH_STREAM_LIFETIME = 300
+
+# Phân trang danh sách peer (?limit=&cursor=&prefix=&fields=): kích thước
+# trang mặc định và tối đa, và các trường của một peer có thể chọn
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+PEER_FIELDS = ('ip', 'port')
+
+# Users, online peers and chat channels, each under its own lock
+# (channels sharded by name) so polling does not block logins
+STORE = TrackerStore()
+
+# Peer chỉ online khi còn lease: /submit-info cấp lease, /heartbeat gia hạn;
+# client crash không gửi heartbeat sẽ tự bị xóa khỏi danh sách online
+LEASES = PresenceLeases(STORE, DEFAULT_LEASE_TTL)
+
+# Replication: leader (có --data-dir) phát WAL cho các follower; follower
+# (--follow) giữ bản sao để phục vụ đọc, còn request ghi thì chuyển cho leader
+REPLICATION = None
+FOLLOWER = None
+REPLICATION_TOKEN = None
+SNAPSHOT_CHUNK = 1 << 20
+
+# /batch: số thao tác tối đa mỗi batch, và các API không chạy trong batch
+# (giữ kết nối lâu hoặc trả về stream)
+BATCH_MAX_OPS = 64
+BATCH_EXCLUDED = ('/batch', '/watch', '/watch-stream')
 
+app = WeApRous()
 
-# List to save chat channel
-CHANNELS = {
-    'general': set()
-}
 
-app = WeApRous()
+def leader_only(path):
+    """
+    Request ghi chỉ chạy trên leader: trên follower thì chuyển tiếp tới
+    leader, và chờ bản sao cập nhật để client đọc lại thấy ngay.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(headers, body):
+            if FOLLOWER is not None:
+                return FOLLOWER.forward(path, body)
+            return func(headers, body)
+        wrapper._leader_only = True
+        return wrapper
+    return decorator
 
 # @app.route('/login', methods=['POST'])
 # def login(headers="guest", body="anonymous"):
@@ -79,8 +123,75 @@ app = WeApRous()
 
 
 
+def _encode_cursor(username):
+    """Cursor của trang kế tiếp: username cuối cùng của trang, dạng base64 url-safe."""
+    return base64.urlsafe_b64encode(username.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """Ngược lại của _encode_cursor; ValueError nếu cursor không hợp lệ."""
+    return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+
+
+def _listing_params(params):
+    """
+    Đọc limit, cursor, prefix, fields (query string hoặc body JSON).
+    Trả về (page, fields): page là None nếu không phân trang, hoặc
+    (after, limit, prefix); fields là None (đầy đủ) hoặc tuple các trường.
+    ValueError nếu tham số không hợp lệ.
+    """
+    page = None
+    if any(params.get(key) not in (None, '') for key in ('limit', 'cursor', 'prefix')):
+        limit = int(params.get('limit') or PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        after = _decode_cursor(params['cursor']) if params.get('cursor') else None
+        page = (after, limit, str(params.get('prefix') or ''))
+
+    fields = params.get('fields')
+    if fields is not None:
+        if isinstance(fields, str):
+            fields = [field for field in fields.split(',') if field]
+        for field in fields:
+            if field != 'username' and field not in PEER_FIELDS:
+                raise ValueError(f"Unknown field '{field}'")
+        fields = tuple(fields)
+    return page, fields
+
+
+def _project(peers, fields):
+    """
+    Chỉ giữ các trường được yêu cầu của mỗi peer; chỉ có 'username' thì
+    trả về danh sách tên (response nhỏ nhất).
+    """
+    if fields is None:
+        return peers
+    kept = [field for field in PEER_FIELDS if field in fields]
+    if not kept:
+        return list(peers)
+    return {username: {field: address[field] for field in kept} for username, address in peers.items()}
+
+
+def _peer_page(channel, page, fields):
+    """Một trang peer online của kênh, cursor trỏ tới trang kế tiếp (None nếu hết)."""
+    after, limit, prefix = page
+    result = STORE.online_page(channel, after, limit, prefix)
+    if result is None:
+        return {'status': 404, 'message': 'Channel not found'}
+
+    peers = result['peers']
+    next_cursor = _encode_cursor(next(reversed(peers))) if result['more'] and peers else None
+    print(f"[Tracker] Returning page of '{channel}': {len(peers)} peers, more: {result['more']}.")
+    return {'status': 200, 'channel': channel, 'version': result['version'],
+            'peers': _project(peers, fields), 'next_cursor': next_cursor}
+
+
+
+
+
 ### API 1: /register/
 @app.route('/register', methods=['POST'])
+@leader_only('/register')
 def register_peers(headers, body):
     try: 
         # parse body to take info
@@ -91,18 +202,13 @@ def register_peers(headers, body):
         if not username or not password:
             return {'status': 400, 'message': 'Username and password are required'}
         
-        # use db_lock
-        with db_lock:
-            # Check user existence
-            if username in USERS:
-                print(f"[Tracker] Register failed: User '{username}' already exists.")
-                return {'status': 400, 'message': 'Username already exists'}
-            
+        # Check user existence and add the new user atomically
+        if not STORE.register(username, password):
+            print(f"[Tracker] Register failed: User '{username}' already exists.")
+            return {'status': 400, 'message': 'Username already exists'}
 
-            # If not exists, add new user
-            USERS[username] = password
-            print(f"[Tracker] New user registered: '{username}'")
-            return {'status': 200, 'message': 'User registered successfully'} # 201 = Created
+        print(f"[Tracker] New user registered: '{username}'")
+        return {'status': 200, 'message': 'User registered successfully'} # 201 = Created
 
     except Exception as e:
         return {'status': 400, 'message': str(e)}
@@ -119,13 +225,12 @@ def login(headers, body):
         username = data.get('username')
         password = data.get('password')
 
-        with db_lock:
-            if username in USERS and USERS[username] == password:
-                print(f"[Tracker] User '{username}' logged in.")
-                return {'status': 200, 'message': 'Login successful'}
-            
-            else: 
-                return {'status': 401, 'message': 'Invalid credentials'}
+        if STORE.check_password(username, password):
+            print(f"[Tracker] User '{username}' logged in.")
+            return {'status': 200, 'message': 'Login successful'}
+
+        else:
+            return {'status': 401, 'message': 'Invalid credentials'}
             
     except Exception as e:
         return {'status': 400, 'message': str(e)}
@@ -136,6 +241,7 @@ def login(headers, body):
 
 ### API 3: /submit-info/
 @app.route('/submit-info', methods=['POST'])
+@leader_only('/submit-info')
 def submit_info(headers, body):
     try: 
         data = json.loads(body)
@@ -146,12 +252,11 @@ def submit_info(headers, body):
         if not username or not ip or not port:
             return {'status': 400, 'message': 'Missing data'}
         
-        with db_lock:
-            ONLINE_PEERS[username] = {'ip': ip, 'port': port}
-            CHANNELS.get('general', set()).add(username)
+        ttl = LEASES.grant(username, ip, port)
+        STORE.join(DEFAULT_CHANNEL, username)
 
-        print(f"[Tracker] Updated info for '{username}': {ip}:{port}")
-        return {'status': 200, 'message': 'Info submitted'}
+        print(f"[Tracker] Updated info for '{username}': {ip}:{port} (lease {ttl}s)")
+        return {'status': 200, 'message': 'Info submitted', 'ttl': ttl}
     
     except Exception as e:
         return {'status': 400, 'message': str(e)}
@@ -162,15 +267,39 @@ def submit_info(headers, body):
 
 ### API 4: /get-list/
 @app.route('/get-list', methods=['GET'])
-def get_list(headers, body):
+def get_list(headers, body, query=None):
     # API returns peer lists or channel lists
-    with db_lock:
-        # return peer list in channer 'general'
-        general_users = CHANNELS.get('general', set())
-        peer_list = {user: ONLINE_PEERS[user] for user in general_users if user in ONLINE_PEERS}
-        
-    print(f"[Tracker] Returning peer list for 'general': {len(peer_list)} peers.")
-    return {'status': 200, 'channel': 'general', 'peers': peer_list}
+    # return peer list in channer 'general'
+    # ?since=<version>: chỉ trả về thay đổi (changed/removed) kể từ version đó,
+    # hoặc danh sách đầy đủ (full=True) nếu version quá cũ
+    # ?limit=&cursor=&prefix=: một trang theo thứ tự username (next_cursor
+    # để lấy trang sau); ?fields=ip,port|username: chỉ trả về các trường đó
+    query = query or {}
+    since = query.get('since')
+    try:
+        page, fields = _listing_params(query)
+        if since is not None:
+            since = int(since)
+    except ValueError as e:
+        return {'status': 400, 'message': f"Invalid since or paging: {e}"}
+
+    if page is not None:
+        if since is not None:
+            return {'status': 400, 'message': 'since cannot be combined with paging'}
+        return _peer_page(DEFAULT_CHANNEL, page, fields)
+
+    result = STORE.online_delta(DEFAULT_CHANNEL, since)
+    if 'peers' in result:
+        result['peers'] = _project(result['peers'], fields)
+    else:
+        result['changed'] = _project(result['changed'], fields)
+
+    if result['full']:
+        print(f"[Tracker] Returning peer list for 'general': {len(result['peers'])} peers.")
+    else:
+        print(f"[Tracker] Returning peer delta for 'general' since {since}: "
+              f"{len(result['changed'])} changed, {len(result['removed'])} removed.")
+    return dict({'status': 200, 'channel': 'general'}, **result)
 
 
 
@@ -184,22 +313,9 @@ def get_channels(headers, body):
     và những user ĐANG ONLINE trong mỗi kênh.
     """
     try:
-        with db_lock:
-            # Tạo một dictionary mới để lưu kết quả
-            all_channel_data = {}
-            
-            # Lặp qua từng kênh có trong CSDL (CHANNELS)
-            for channel_name, users_in_channel_set in CHANNELS.items():
-                
-                # Lọc ra những user nào trong kênh này 
-                # mà CŨNG đang có trong ONLINE_PEERS
-                online_users_in_channel = []
-                for username in users_in_channel_set:
-                    if username in ONLINE_PEERS:
-                        online_users_in_channel.append(username)
-                
-                # Gán danh sách user online vào kênh tương ứng
-                all_channel_data[channel_name] = online_users_in_channel
+        # Danh sách user online của mỗi kênh, lấy thẳng từ chỉ mục
+        # (cập nhật khi join/leave/submit-info/logout), không cần lọc lại
+        all_channel_data = STORE.online_by_channel()
         
         print(f"[Tracker] Returning full channel list.")
         return {'status': 200, 'channels': all_channel_data}
@@ -215,16 +331,14 @@ def get_channels(headers, body):
 @app.route('/join-channel', methods=['POST'])
 # API creates a new channel if not exists. 
 # Users are always automatically added into channel 'general'.
+@leader_only('/join-channel')
 def join_channel(headers, body):
     try:
         data = json.loads(body)
         username = data.get('username')
         channel = data.get('channel')
 
-        with db_lock:
-            if channel not in CHANNELS:
-                CHANNELS[channel] = set() # Create new channel if not exists
-            CHANNELS[channel].add(username)
+        STORE.join(channel, username) # Create new channel if not exists
             
         print(f"[Tracker] User '{username}' joined channel '{channel}'.")
         return {'status': 200, 'message': f"Joined {channel}"}
@@ -249,27 +363,29 @@ def get_channel_peers(headers, body):
         if not channel_name or not username:
             return {'status': 400, 'message': 'Channel name required'}
 
-        with db_lock:
-            if channel_name not in CHANNELS:
-                return {'status': 404, 'message': 'Channel not found'}
-            
-            # Lấy set các user trong kênh
-            users_in_channel = CHANNELS.get(channel_name, set())
+        # limit/cursor/prefix/fields trong body: như /get-list
+        try:
+            page, fields = _listing_params(data)
+        except ValueError as e:
+            return {'status': 400, 'message': f"Invalid paging: {e}"}
 
-            # Kiểm tra xem người đang hỏi (username) có trong kênh không
-            if username not in users_in_channel:
-                print(f"[Tracker] Access denied: '{username}' tried to access channel '{channel_name}' without joining.")
-                return {'status': 403, 'message': 'Forbidden. You are not a member of this channel.'}
-            
-            # Lọc ra những user nào trong số đó đang ONLINE
-            peer_list = {
-                user: ONLINE_PEERS[user] 
-                for user in users_in_channel 
-                if user in ONLINE_PEERS
-            }
+        # Kiểm tra xem kênh có tồn tại và người đang hỏi (username) có trong kênh không
+        is_member = STORE.is_member(channel_name, username)
+        if is_member is None:
+            return {'status': 404, 'message': 'Channel not found'}
+
+        if not is_member:
+            print(f"[Tracker] Access denied: '{username}' tried to access channel '{channel_name}' without joining.")
+            return {'status': 403, 'message': 'Forbidden. You are not a member of this channel.'}
+
+        if page is not None:
+            return _peer_page(channel_name, page, fields)
+
+        # Những user đang ONLINE trong kênh (chỉ mục channel -> online members)
+        peer_list = STORE.online_members(channel_name) or {}
         
         print(f"[Tracker] Returning peer list for channel '{channel_name}': {len(peer_list)} peers.")
-        return {'status': 200, 'channel': channel_name, 'peers': peer_list}
+        return {'status': 200, 'channel': channel_name, 'peers': _project(peer_list, fields)}
         
     except Exception as e:
         print(f"[Tracker] Error getting channel peers: {e}")
@@ -281,6 +397,7 @@ def get_channel_peers(headers, body):
 
 ### API 8: /leave-channel/
 @app.route('/leave-channel', methods=['POST'])
+@leader_only('/leave-channel')
 def leave_channel(headers, body):
     """Xóa peer khỏi một kênh cụ thể"""
     try:
@@ -291,20 +408,14 @@ def leave_channel(headers, body):
         if not username or not channel:
             return {'status': 400, 'message': 'Username and channel are required'}
         
-        with db_lock:
-            # Kiểm tra xem kênh có tồn tại và user có trong đó không
-            if channel in CHANNELS and username in CHANNELS[channel]:
-                CHANNELS[channel].remove(username)
-                print(f"[Tracker] User '{username}' left channel '{channel}'.")
-                
-                # Delete channel if empty
-                if not CHANNELS[channel]:
-                    del CHANNELS[channel]
-                
-                return {'status': 200, 'message': f"Successfully left {channel}"}
-            
-            else:
-                return {'status': 404, 'message': 'Channel or user not found in that channel'}
+        # Kiểm tra xem kênh có tồn tại và user có trong đó không
+        # (an emptied channel is deleted, except 'general')
+        if STORE.leave(channel, username):
+            print(f"[Tracker] User '{username}' left channel '{channel}'.")
+            return {'status': 200, 'message': f"Successfully left {channel}"}
+
+        else:
+            return {'status': 404, 'message': 'Channel or user not found in that channel'}
     
     except Exception as e:
         return {'status': 400, 'message': str(e)}
@@ -315,6 +426,7 @@ def leave_channel(headers, body):
 
 ### API 9: /logout/
 @app.route('/logout', methods=['POST'])
+@leader_only('/logout')
 def logout(headers, body):
     """Xóa peer khỏi danh sách online khi logout"""
     try:
@@ -324,18 +436,14 @@ def logout(headers, body):
         if not username:
             return {'status': 400, 'message': 'Username is required'}
         
-        with db_lock:
-            # Xóa khỏi danh sách online peers
-            if username in ONLINE_PEERS:
-                del ONLINE_PEERS[username]
-                print(f"[Tracker] User '{username}' removed from online peers.")
-            
-            # Xóa khỏi tất cả channels
-            for channel_name, users in CHANNELS.items():
-                if username in users:
-                    users.remove(username)
-                    print(f"[Tracker] User '{username}' removed from channel '{channel_name}'.")
-            
+        # Xóa khỏi danh sách online peers (và hủy lease)
+        if LEASES.revoke(username):
+            print(f"[Tracker] User '{username}' removed from online peers.")
+
+        # Xóa khỏi tất cả channels
+        for channel_name in STORE.leave_all(username):
+            print(f"[Tracker] User '{username}' removed from channel '{channel_name}'.")
+
         print(f"[Tracker] User '{username}' logged out.")
         return {'status': 200, 'message': 'Logout successful'}
     
@@ -346,23 +454,378 @@ def logout(headers, body):
 
 
 
+### API 10: /watch/
+def _watch_params(query, default_timeout, max_timeout):
+    """
+    Đọc channel, since, timeout từ query string và kiểm tra quyền xem kênh.
+    Trả về (channel, since, timeout, None) hoặc (..., error_dict).
+    """
+    channel = query.get('channel') or DEFAULT_CHANNEL
+    try:
+        since = int(query['since']) if query.get('since') else None
+        timeout = min(float(query.get('timeout', default_timeout)), max_timeout)
+    except ValueError:
+        return channel, None, None, {'status': 400, 'message': 'Invalid since or timeout'}
+
+    # Kênh khác 'general' chỉ thành viên mới được xem (như /get-channel-peers)
+    if channel != DEFAULT_CHANNEL:
+        is_member = STORE.is_member(channel, query.get('username'))
+        if is_member is None:
+            return channel, since, timeout, {'status': 404, 'message': 'Channel not found'}
+        if not is_member:
+            return channel, since, timeout, {'status': 403, 'message': 'Forbidden. You are not a member of this channel.'}
+    return channel, since, timeout, None
+
+
+@app.route('/watch', methods=['GET'], long_lived=True)
+def watch(headers, body, query=None):
+    """
+    Long-poll: /watch?channel=<c>&since=<version>[&timeout=<s>][&username=<u>]
+    Chờ đến khi danh sách peer online của kênh thay đổi sau version 'since'
+    rồi trả về phần thay đổi (cùng định dạng với /get-list?since=); hết
+    timeout thì trả về delta rỗng. Không có since: trả ngay danh sách đầy đủ.
+    """
+    channel, since, timeout, error = _watch_params(query or {}, WATCH_TIMEOUT, WATCH_MAX_TIMEOUT)
+    if error:
+        return error
+
+    if since is None:
+        result = STORE.online_delta(channel)
+    else:
+        result = STORE.wait_delta(channel, since, timeout)
+    if result is None:
+        return {'status': 404, 'message': 'Channel not found'}
+
+    return dict({'status': 200, 'channel': channel}, **result)
+
+
+
+
+
+### API 11: /watch-stream/
+def _sse_event(event, result):
+    """Một sự kiện SSE; id là version để client nối lại bằng Last-Event-ID."""
+    return f"id: {result['version']}\nevent: {event}\ndata: {json.dumps(result)}\n\n"
+
+
+def _watch_stream(channel, since, lifetime):
+    """Sinh các sự kiện SSE: snapshot/delta, rồi một delta cho mỗi thay đổi."""
+    end = time.monotonic() + lifetime
+    result = STORE.online_delta(channel, since)
+    while result is not None:
+        if result['full'] or result['changed'] or result['removed']:
+            yield _sse_event('snapshot' if result['full'] else 'delta', result)
+        elif since is not None:
+            yield ": ping\n\n"
+        since = result['version']
+
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return
+        result = STORE.wait_delta(channel, since, min(WATCH_HEARTBEAT, remaining))
+    yield "event: gone\ndata: {}\n\n"
+
+
+@app.route('/watch-stream', methods=['GET'], long_lived=True)
+def watch_stream(headers, body, query=None):
+    """
+    Server-sent events: /watch-stream?channel=<c>[&since=<version>][&username=<u>]
+    Giữ kết nối mở và đẩy mỗi thay đổi của danh sách peer online trong kênh
+    (event 'snapshot' rồi các event 'delta', cùng định dạng với /watch).
+    """
+    query = dict(query or {})
+    # EventSource gửi lại id của sự kiện cuối cùng khi kết nối lại
+    if headers.get('last-event-id') and not query.get('since'):
+        query['since'] = headers.get('last-event-id')
+
+    channel, since, lifetime, error = _watch_params(query, WATCH_STREAM_LIFETIME, WATCH_STREAM_LIFETIME)
+    if error:
+        return error
+
+    print(f"[Tracker] Streaming changes of '{channel}' since {since}.")
+    return {
+        'status': 200,
+        'headers': {'Content-Type': 'text/event-stream; charset=utf-8'},
+        'stream': _watch_stream(channel, since, lifetime),
+    }
+
+
+
+
+
+### API 12: /heartbeat/
+@app.route('/heartbeat', methods=['POST'])
+@leader_only('/heartbeat')
+def heartbeat(headers, body):
+    """
+    Gia hạn lease của peer thêm 'ttl' giây. 404 nếu peer không còn lease
+    (đã hết hạn hoặc logout): client cần gửi lại /submit-info.
+    """
+    try:
+        data = json.loads(body)
+        username = data.get('username')
+
+        if not username:
+            return {'status': 400, 'message': 'Username is required'}
+
+        if LEASES.renew(username):
+            return {'status': 200, 'ttl': LEASES.ttl}
+
+        return {'status': 404, 'message': 'No lease, submit info again'}
+
+    except Exception as e:
+        return {'status': 400, 'message': str(e)}
+
+
+
+
+
+### API 13: /replication/
+def _replication_denied(headers):
+    """
+    Lỗi 403/503 nếu request replication không được phục vụ, None nếu được.
+    Snapshot chứa mật khẩu của mọi user: không có --replication-token thì
+    replication bị tắt hẳn.
+    """
+    if REPLICATION is None:
+        return {'status': 503, 'message': 'Not a replication leader (needs --data-dir)'}
+    if not REPLICATION_TOKEN:
+        return {'status': 403, 'message': 'Replication disabled (start the leader with --replication-token)'}
+    if not hmac.compare_digest(headers.get(TOKEN_HEADER.lower()) or '', REPLICATION_TOKEN):
+        return {'status': 403, 'message': 'Invalid replication token'}
+    return None
+
+
+def _chunks(data, size):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+@app.route('/replication/snapshot', methods=['GET'])
+def replication_snapshot(headers, body):
+    """Toàn bộ trạng thái cho follower; X-Replication-LSN: LSN stream tiếp tục."""
+    error = _replication_denied(headers)
+    if error:
+        return error
+
+    lsn, state = REPLICATION.snapshot()
+    data = encode_snapshot(state)
+    print(f"[Tracker] Sending snapshot at LSN {lsn} ({len(data)} bytes) to a follower.")
+    return {
+        'status': 200,
+        'headers': {'Content-Type': 'application/octet-stream', 'X-Replication-LSN': str(lsn)},
+        'stream': _chunks(data, SNAPSHOT_CHUNK),
+    }
+
+
+@app.route('/replication/stream', methods=['GET'], long_lived=True)
+def replication_stream(headers, body, query=None):
+    """
+    /replication/stream?from=<LSN>: các bản ghi WAL từ LSN, đẩy ngay khi
+    được commit. 410 nếu LSN đã ra khỏi backlog: follower cần snapshot mới.
+    """
+    error = _replication_denied(headers)
+    if error:
+        return error
+
+    try:
+        lsn = int((query or {}).get('from', ''))
+    except ValueError:
+        return {'status': 400, 'message': 'Invalid from'}
+    if not REPLICATION.available(lsn):
+        return {'status': 410, 'message': 'LSN no longer available, load a snapshot'}
+
+    print(f"[Tracker] Streaming WAL to a follower from LSN {lsn}.")
+    return {
+        'status': 200,
+        'headers': {'Content-Type': 'application/octet-stream'},
+        # Dừng khi server tắt, để không giữ quá trình drain
+        'stream': REPLICATION.stream(lsn, app.lifecycle.accepting),
+    }
+
+
+@app.route('/replication/position', methods=['GET'])
+def replication_position(headers, body):
+    """Vai trò của tracker và LSN của nó (follower: kèm độ trễ so với leader)."""
+    if REPLICATION is not None:
+        return {'status': 200, 'role': 'leader', 'lsn': REPLICATION.position()}
+    if FOLLOWER is not None:
+        return dict({'status': 200, 'role': 'follower'}, **FOLLOWER.stats())
+    return {'status': 200, 'role': 'standalone'}
+
+
+
+
+
+### API 14: /batch/
+def _batch_hook(op):
+    """Tìm hook của một thao tác trong batch; trả về (path, hook) hoặc lỗi ValueError."""
+    if not isinstance(op, dict) or not isinstance(op.get('path'), str):
+        raise ValueError("each op needs a 'path'")
+    path = op['path']
+    for field in ('body', 'query'):
+        if not isinstance(op.get(field) or {}, dict):
+            raise ValueError(f"'{field}' of '{path}' must be an object")
+    if path in BATCH_EXCLUDED or path.startswith('/replication/') or path not in app.routes:
+        raise ValueError(f"'{path}' cannot be batched")
+    methods = app.routes[path]
+    method = op.get('method', '').upper() or next(iter(methods))
+    if method not in methods:
+        raise ValueError(f"'{path}' does not accept {method}")
+    return path, methods[method]
+
+
+def _join_run(ops, hooks, start):
+    """Các /join-channel liên tiếp của cùng một user, bắt đầu từ 'start'."""
+    body = ops[start].get('body') or {}
+    username = body.get('username')
+    end = start
+    while (end < len(ops) and hooks[end][0] == '/join-channel'
+           and (ops[end].get('body') or {}).get('username') == username
+           and (ops[end].get('body') or {}).get('channel')):
+        end += 1
+    return username, [ops[i]['body']['channel'] for i in range(start, end)]
+
+
+@app.route('/batch', methods=['POST'])
+def batch(headers, body):
+    """
+    Nhiều thao tác trong một round trip:
+    {"ops": [{"path": "/login", "body": {...}}, {"path": "/get-list", "query": {...}}, ...],
+     "stop_on_error": true}
+    Các thao tác chạy theo thứ tự, kết quả của mỗi thao tác giống như khi
+    gọi riêng. stop_on_error (mặc định): dừng ở thao tác đầu tiên không
+    trả về 200. Các /join-channel liên tiếp của cùng user được gộp lại:
+    mỗi shard chỉ bị khóa một lần và WAL chỉ flush một lần.
+    """
+    try:
+        data = json.loads(body)
+        ops = data.get('ops')
+        stop_on_error = data.get('stop_on_error', True)
+        if not isinstance(ops, list) or not ops:
+            return {'status': 400, 'message': 'ops must be a non-empty list'}
+        if len(ops) > BATCH_MAX_OPS:
+            return {'status': 400, 'message': f"At most {BATCH_MAX_OPS} ops per batch"}
+        hooks = [_batch_hook(op) for op in ops]
+    except Exception as e:
+        return {'status': 400, 'message': str(e)}
+
+    # Follower: batch có thao tác ghi thì cả batch chạy trên leader
+    if FOLLOWER is not None and any(getattr(hook, '_leader_only', False) for _, hook in hooks):
+        return FOLLOWER.forward('/batch', body)
+
+    results = []
+    i = 0
+    while i < len(ops):
+        path, hook = hooks[i]
+        if path == '/join-channel':
+            username, channels = _join_run(ops, hooks, i)
+            if username and len(channels) > 1:
+                STORE.join_many(channels, username)
+                print(f"[Tracker] User '{username}' joined channels {channels}.")
+                results.extend({'status': 200, 'message': f"Joined {channel}"} for channel in channels)
+                i += len(channels)
+                continue
+
+        op_body = json.dumps(ops[i].get('body') or {})
+        if getattr(hook, '_route_query', False):
+            result = hook(headers, op_body, query=ops[i].get('query') or {})
+        else:
+            result = hook(headers, op_body)
+        results.append(result)
+        if stop_on_error and result.get('status') != 200:
+            break
+        i += 1
+
+    print(f"[Tracker] Batch of {len(ops)} ops: {len(results)} run.")
+    return {'status': 200, 'results': results}
+
+
+
+
+
 if __name__ == "__main__":
     # Parse command-line arguments to configure server IP and port
     parser = argparse.ArgumentParser(prog='Backend', description='', epilog='Beckend daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PORT)
+    parser.add_argument('--unix-socket', default=None)
+    parser.add_argument('--backlog', type=int, default=50)
+    parser.add_argument('--max-in-flight', type=int, default=0)
+    parser.add_argument('--queue-target-ms', type=float, default=50)
+    parser.add_argument('--max-long-lived', type=int, default=DEFAULT_MAX_LONG_LIVED,
+                        help='with --max-in-flight: /watch, /watch-stream and replication '
+                             'streams held open outside the worker pool (503 beyond)')
+    parser.add_argument('--client-header-timeout', type=float, default=10)
+    parser.add_argument('--client-body-timeout', type=float, default=30)
+    parser.add_argument('--send-timeout', type=float, default=30)
+    parser.add_argument('--client-min-rate', type=int, default=512)
+    parser.add_argument('--drain-timeout', type=float, default=30)
+    parser.add_argument('--reuse-port', action='store_true')
+    parser.add_argument('--lease-ttl', type=float, default=DEFAULT_LEASE_TTL)
+    parser.add_argument('--data-dir', default=None,
+                        help='keep the tracker state (WAL + snapshots) in this directory')
+    parser.add_argument('--no-fsync', action='store_true',
+                        help='do not fsync the WAL (survives a crash, not a power loss)')
+    parser.add_argument('--snapshot-every', type=int, default=500000,
+                        help='WAL records between two snapshots')
+    parser.add_argument('--follow', default=None, metavar='HOST:PORT',
+                        help='run as a read replica of the leader tracker at HOST:PORT')
+    parser.add_argument('--replication-token', default=None,
+                        help='shared secret of the leader and its followers; '
+                             'replication is disabled without it')
  
     args = parser.parse_args()
+    if args.follow and args.data_dir:
+        parser.error('--follow keeps no local data, drop --data-dir')
+    if args.follow and not args.replication_token:
+        parser.error('--follow needs the leader\'s --replication-token')
     ip = args.server_ip
     port = args.server_port
 
     # Prepare and launch the RESTful application
 
-    print(f"[Tracker Server] Starting on {ip}:{port}...")
-    app.prepare_address(ip, port)
+    where = "unix:{}".format(args.unix_socket) if args.unix_socket else "{}:{}".format(ip, port)
+    print(f"[Tracker Server] Starting on {where}...")
+    app.prepare_address(ip, port, args.unix_socket)
+    if args.max_in_flight > 0:
+        app.prepare_admission(args.max_in_flight, target=args.queue_target_ms / 1000.0,
+                              max_long_lived=args.max_long_lived,
+                              backlog=args.backlog)
+    else:
+        app.backlog = args.backlog
+    app.prepare_deadlines(args.client_header_timeout, args.client_body_timeout,
+                          args.send_timeout, args.client_min_rate)
+    app.prepare_lifecycle(args.drain_timeout, args.reuse_port)
+    LEASES.ttl = args.lease_ttl
+    REPLICATION_TOKEN = args.replication_token
+
+    # Khôi phục dữ liệu (snapshot + WAL) trước khi nhận request; peer đang
+    # online lúc tắt được cấp lease mới, còn sống thì heartbeat sẽ gia hạn
+    persistence = None
+    if args.data_dir:
+        persistence = Persistence(STORE, args.data_dir, not args.no_fsync, args.snapshot_every)
+        # Restart (SIGUSR2): tiến trình cũ vẫn giữ data dir; báo nó "sẵn sàng"
+        # để nó ngừng nhận, drain rồi close, sau đó mới khôi phục. Kết nối
+        # mới chờ trong backlog của socket kế thừa thay vì bị từ chối
+        persistence.recover(waiting=app.lifecycle.notify_ready)
+        REPLICATION = ReplicationSource(STORE, persistence.wal)
+        for username, address in STORE.peers().items():
+            LEASES.grant(username, address['ip'], address['port'])
+
+    # Follower: tải snapshot của leader trước khi nhận request, rồi bám theo
+    # stream WAL; lease do leader quản lý (hết hạn thì follower nhận 'unpeer')
+    if args.follow:
+        leader_host, _, leader_port = args.follow.rpartition(':')
+        FOLLOWER = ReplicaFollower(STORE, leader_host, int(leader_port), args.replication_token)
+        FOLLOWER.start()
+
     try:
         app.run()
     except KeyboardInterrupt:
         print("\n[SampleApp] Shutdown requested (Ctrl+C). Exiting...")
+    finally:
+        if persistence is not None:
+            persistence.close()
 
         
\ No newline at end of file
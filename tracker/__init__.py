@@ -0,0 +1,20 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+from .changelog import ChangeLog
+from .persistence import Persistence
+from .presence import PresenceLeases, DEFAULT_LEASE_TTL
+from .replication import ReplicationSource, ReplicaFollower
+from .rwlock import RWLock
+from .sortedset import SortedSet
+from .store import TrackerStore, DEFAULT_CHANNEL
+from .wal import WriteAheadLog
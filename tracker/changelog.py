@@ -0,0 +1,93 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.changelog
+~~~~~~~~~~~~~~~~~
+
+This module provides the bounded change log behind delta synchronization
+of peer lists.
+
+Every change of a channel's online peers (a peer joins, leaves, or changes
+address) is stamped with a version taken from a counter shared by the whole
+store, so versions only grow, even across a channel deleted and created
+again. A client remembers the version of its last answer and asks for the
+changes since then; only the last ``size`` changes are kept, and a client
+too far behind (or holding a version of a previous run of the tracker) gets
+a full snapshot instead.
+
+Usage Example:
+--------------
+>>> log = ChangeLog(size=1024)
+>>> log.record(12, 'alice', {'ip': '10.0.0.7', 'port': 5001})
+>>> log.record(13, 'bob', None)
+>>> log.since(11)
+({'alice': {'ip': '10.0.0.7', 'port': 5001}}, ['bob'])
+"""
+
+import collections
+
+#: Default number of changes kept per channel.
+DEFAULT_LOG_SIZE = 1024
+
+
+class ChangeLog:
+    """
+    Last changes of one channel's online peers. Not thread-safe by itself;
+    the store calls it under the channel's shard lock.
+
+    :attrs version (int): version of the latest change (or of the creation).
+    :attrs floor (int): oldest version a delta can start from.
+    """
+
+    __slots__ = ('version', 'floor', '_entries')
+
+    def __init__(self, version, size=DEFAULT_LOG_SIZE):
+        self.version = version
+        self.floor = version
+        self._entries = collections.deque(maxlen=size)
+
+    def record(self, version, username, address):
+        """
+        Appends a change.
+
+        :param version (int): version of the change, above :attr:`version`.
+        :param username (str): peer concerned.
+        :param address (dict): new address, ``None`` when the peer left.
+        """
+        if len(self._entries) == self._entries.maxlen:
+            # The oldest change falls off: deltas must start after it
+            self.floor = self._entries[0][0]
+        self._entries.append((version, username, address))
+        self.version = version
+
+    def since(self, version):
+        """
+        Returns the net changes after ``version``, one per peer.
+
+        :param version (int): version the client is at.
+
+        :rtype tuple: ``(changed, removed)``, a dict username -> address and a
+                      list of usernames; ``None`` when ``version`` is out of
+                      the log and the client needs a full snapshot.
+        """
+        if version < self.floor or version > self.version:
+            return None
+        latest = {}
+        # Newest first, stopping at the client's version
+        for entry_version, username, address in reversed(self._entries):
+            if entry_version <= version:
+                break
+            latest.setdefault(username, address)
+        changed = dict((user, address) for user, address in latest.items() if address is not None)
+        removed = [user for user, address in latest.items() if address is None]
+        return changed, removed
@@ -0,0 +1,274 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.persistence
+~~~~~~~~~~~~~~~~~
+
+This module keeps the tracker state across restarts with a write-ahead
+log (:mod:`tracker.wal`) and periodic snapshots in one data directory.
+
+- A **snapshot** ``snapshot-<LSN>.snap`` holds the whole state (users,
+  online peers, channel members) as one pickled payload of builtin values,
+  behind a magic string, its length and CRC32. It covers every log record
+  before ``LSN``: the log is rotated first, then the store is dumped, then
+  the file is written aside, fsynced and renamed, and only then are the
+  older snapshots and log segments deleted.
+- **Recovery** loads the newest valid snapshot and replays the log from its
+  ``LSN`` (records already in the snapshot replay harmlessly), then opens a
+  new log segment after the last good record.
+- The directory belongs to one process at a time: :meth:`Persistence.recover`
+  takes an exclusive ``flock`` on its ``LOCK`` file, kept until
+  :meth:`Persistence.close`. On a ``SIGUSR2`` restart the new process waits
+  for it while the old one drains, so the two never log the same LSNs or
+  delete each other's segments.
+- Snapshots are taken in a background thread once ``snapshot_every``
+  records were logged since the last one, and on :meth:`Persistence.close`,
+  so the log replayed at startup stays short.
+
+Usage Example:
+--------------
+>>> persistence = Persistence(store, "data/tracker")
+>>> persistence.recover()
+>>> ...
+>>> persistence.close()
+"""
+
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:     # Windows: the directory is not locked
+    fcntl = None
+
+from .wal import WriteAheadLog, loads, read_records, fsync_directory
+
+#: Default number of log records between two snapshots.
+DEFAULT_SNAPSHOT_EVERY = 500000
+
+#: Seconds between two checks of the snapshot thread.
+SNAPSHOT_CHECK_INTERVAL = 5.0
+
+#: File of the data directory locked by the process using it.
+LOCK_FILE = 'LOCK'
+
+_MAGIC = b'WRTSNAP1'
+_HEADER = struct.Struct('<QI')
+_SNAPSHOT = re.compile(r'^snapshot-(\d{20})\.snap$')
+
+
+def _snapshots(directory):
+    """Lists the snapshots of a directory, newest first: ``(LSN, path)`` pairs."""
+    found = []
+    for name in os.listdir(directory):
+        match = _SNAPSHOT.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found, reverse=True)
+
+
+def encode_snapshot(state):
+    """
+    Serializes a state: magic string, payload length and CRC32, payload.
+
+    :param state (dict): builtin values, as :meth:`TrackerStore.dump` returns.
+
+    :rtype bytes: the encoded snapshot.
+    """
+    payload = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+    return _MAGIC + _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_snapshot(data):
+    """
+    Reverses :func:`encode_snapshot`.
+
+    :rtype dict: the state, ``None`` when ``data`` is not a valid snapshot.
+    """
+    offset = len(_MAGIC) + _HEADER.size
+    if len(data) < offset or not data.startswith(_MAGIC):
+        return None
+    length, crc = _HEADER.unpack_from(data, len(_MAGIC))
+    payload = data[offset:offset + length]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        return None
+    return loads(payload)
+
+
+def write_snapshot(directory, lsn, state):
+    """
+    Writes a snapshot atomically.
+
+    :param directory (str): data directory.
+    :param lsn (int): first log record not covered by ``state``.
+    :param state (dict): builtin values, as :meth:`TrackerStore.dump` returns.
+
+    :rtype int: size of the snapshot in bytes.
+    """
+    data = encode_snapshot(state)
+    path = os.path.join(directory, 'snapshot-{:020d}.snap'.format(lsn))
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_directory(directory)
+    return len(data)
+
+
+def read_snapshot(path):
+    """
+    Reads a snapshot back.
+
+    :rtype dict: the state, ``None`` when the file is not a valid snapshot.
+    """
+    with open(path, 'rb') as f:
+        return decode_snapshot(f.read())
+
+
+class Persistence:
+    """
+    Durability of a :class:`TrackerStore <TrackerStore>`.
+
+    :attrs store (TrackerStore): store made durable.
+    :attrs directory (str): data directory (snapshots and log segments).
+    :attrs fsync (bool): fsync the log at each group commit.
+    :attrs snapshot_every (int): log records between two snapshots.
+    :attrs wal (WriteAheadLog): the log, once :meth:`recover` ran.
+    """
+
+    def __init__(self, store, directory, fsync=True, snapshot_every=DEFAULT_SNAPSHOT_EVERY):
+        self.store = store
+        self.directory = directory
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        self.wal = None
+        self._snapshot_lsn = 1
+        self._snapshot_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock_fd = None
+
+    def _lock(self, waiting=None):
+        """Takes the directory lock, waiting for the process holding it."""
+        if fcntl is None:
+            return
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("[Persistence] {} is used by another process, waiting for it to close".format(
+                    self.directory))
+                if waiting is not None:
+                    waiting()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
+
+    def recover(self, waiting=None):
+        """
+        Locks the data directory, restores the store from the newest
+        snapshot and the log, then starts logging its mutations.
+
+        :param waiting (callable): called before waiting for another process
+                                   holding the directory (e.g. to tell the
+                                   process restarting us to drain and close).
+
+        :rtype dict: recovery statistics.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock(waiting)
+        started = time.monotonic()
+        lsn = 1
+        for snapshot_lsn, path in _snapshots(self.directory):
+            state = read_snapshot(path)
+            if state is None:
+                print("[Persistence] Skipping invalid snapshot {}".format(path))
+                continue
+            self.store.load(state)
+            lsn = snapshot_lsn
+            break
+        loaded = time.monotonic()
+
+        next_lsn = lsn
+        for next_lsn, record in read_records(self.directory, lsn):
+            self.store.apply(record)
+            next_lsn += 1
+        replayed = next_lsn - lsn
+
+        self._snapshot_lsn = lsn
+        self.wal = WriteAheadLog(self.directory, next_lsn, self.fsync)
+        self.store.wal = self.wal
+        self._thread = threading.Thread(target=self._run, name="Snapshotter", daemon=True)
+        self._thread.start()
+
+        stats = {
+            'snapshot_lsn': lsn,
+            'replayed': replayed,
+            'snapshot_seconds': round(loaded - started, 3),
+            'replay_seconds': round(time.monotonic() - loaded, 3),
+        }
+        print("[Persistence] Recovered from {}: {}".format(self.directory, stats))
+        return stats
+
+    def snapshot(self):
+        """
+        Writes a snapshot of the store and drops what it makes redundant.
+
+        :rtype int: LSN the snapshot covers up to (excluded).
+        """
+        with self._snapshot_lock:
+            started = time.monotonic()
+            lsn = self.wal.rotate()
+            size = write_snapshot(self.directory, lsn, self.store.dump())
+            for old_lsn, path in _snapshots(self.directory):
+                if old_lsn < lsn:
+                    os.unlink(path)
+            self.wal.truncate_before(lsn)
+            self._snapshot_lsn = lsn
+            print("[Persistence] Snapshot at LSN {} ({} bytes) in {:.3f}s".format(
+                lsn, size, time.monotonic() - started))
+            return lsn
+
+    def _run(self):
+        while not self._stop_event.wait(SNAPSHOT_CHECK_INTERVAL):
+            if self.wal.next_lsn - self._snapshot_lsn >= self.snapshot_every:
+                try:
+                    self.snapshot()
+                except OSError as e:
+                    print("[Persistence] Snapshot failed: {}".format(e))
+
+    def close(self):
+        """Takes a final snapshot (for a fast restart), closes the log and
+        releases the directory."""
+        if self.wal is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        try:
+            if self.wal.next_lsn > self._snapshot_lsn:
+                self.snapshot()
+            self.wal.close()
+        finally:
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
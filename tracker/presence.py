@@ -0,0 +1,200 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.presence
+~~~~~~~~~~~~~~~~~
+
+This module provides presence leases: a peer is online only as long as it
+keeps renewing its lease, so a crashed client drops out of the peer lists
+after ``ttl`` seconds instead of staying online until it logs out.
+
+- ``submit-info`` grants (or re-grants) a lease and marks the peer online;
+- a heartbeat renews it, which only moves its expiry time forward;
+- the lease's timer lives in a :class:`HierarchicalTimerWheel
+  <HierarchicalTimerWheel>`; when it fires on a renewed lease it is simply
+  scheduled again for the time left, otherwise the peer is marked offline
+  in the store (updating the membership index, change logs and watchers).
+
+A heartbeat therefore costs one dictionary lookup and never touches the
+wheel, and each lease costs O(1) amortized wheel work per ``ttl``.
+
+Leases are spread over shards (by hash of the username), each with its own
+lock held while the store is updated, so a lease expiring cannot undo a
+``submit-info`` of the same peer racing with it. The write-ahead log is
+flushed after the lock is released: a heartbeat never waits behind an
+fsync, and the leases expiring in one wheel tick share a single flush.
+
+Usage Example:
+--------------
+>>> leases = PresenceLeases(store, ttl=30)
+>>> leases.grant('alice', '10.0.0.7', 5001)
+>>> leases.renew('alice')
+True
+>>> leases.revoke('alice')
+True
+"""
+
+import threading
+import time
+
+from daemon.timerwheel import HierarchicalTimerWheel
+
+#: Default seconds a peer stays online without a heartbeat.
+DEFAULT_LEASE_TTL = 30.0
+
+#: Default number of lease shards.
+DEFAULT_LEASE_SHARDS = 16
+
+#: Expirations between two summary lines in the log.
+LOG_EVERY = 1000
+
+
+class _Lease:
+    """
+    Presence lease of one peer.
+
+    :attrs expires (float): ``time.monotonic()`` deadline.
+    :attrs timer (Timer): wheel timer, due at or before ``expires``.
+    """
+
+    __slots__ = ('expires', 'timer')
+
+    def __init__(self, expires):
+        self.expires = expires
+        self.timer = None
+
+
+class _LeaseShard:
+    """Leases of the usernames hashing to one shard, with their lock."""
+
+    __slots__ = ('leases', 'lock')
+
+    def __init__(self):
+        self.leases = {}
+        self.lock = threading.Lock()
+
+
+class PresenceLeases:
+    """
+    Online presence of the peers of a :class:`TrackerStore <TrackerStore>`.
+
+    :attrs store (TrackerStore): store whose online peers are leased.
+    :attrs ttl (float): lease duration in seconds.
+    :attrs expired (int): leases expired so far.
+    """
+
+    def __init__(self, store, ttl=DEFAULT_LEASE_TTL, wheel=None, shards=DEFAULT_LEASE_SHARDS):
+        self.store = store
+        self.ttl = float(ttl)
+        self.expired = 0
+        self._wheel = wheel or HierarchicalTimerWheel()
+        self._shards = [_LeaseShard() for _ in range(max(1, int(shards)))]
+        # Flush of the expirations of the current tick; wheel thread only
+        self._flush_timer = None
+
+    def _shard(self, username):
+        return self._shards[hash(username) % len(self._shards)]
+
+    def _schedule(self, username, lease, delay):
+        lease.timer = self._wheel.schedule(delay, lambda: self._expire(username, lease))
+
+    def grant(self, username, ip, port):
+        """
+        Marks a user online at ``ip:port`` for :attr:`ttl` seconds.
+
+        :rtype float: the lease duration.
+        """
+        shard = self._shard(username)
+        with shard.lock:
+            lease = shard.leases.get(username)
+            if lease is None:
+                lease = shard.leases[username] = _Lease(time.monotonic() + self.ttl)
+                self._schedule(username, lease, self.ttl)
+            else:
+                lease.expires = time.monotonic() + self.ttl
+            self.store.set_peer(username, ip, port, flush=False)
+        self.store.flush()
+        return self.ttl
+
+    def renew(self, username):
+        """
+        Extends the lease of an online user by :attr:`ttl` seconds.
+
+        :rtype bool: ``False`` when the user holds no lease (never submitted
+                     its address, logged out or expired).
+        """
+        shard = self._shard(username)
+        with shard.lock:
+            lease = shard.leases.get(username)
+            if lease is None:
+                return False
+            lease.expires = time.monotonic() + self.ttl
+            return True
+
+    def revoke(self, username):
+        """
+        Ends the lease of a user and marks it offline.
+
+        :rtype bool: ``False`` when the user was not online.
+        """
+        shard = self._shard(username)
+        with shard.lock:
+            lease = shard.leases.pop(username, None)
+            if lease is not None:
+                lease.timer.cancel()
+            removed = self.store.remove_peer(username, flush=False)
+        if removed:
+            self.store.flush()
+        return removed
+
+    def _expire(self, username, lease):
+        """Timer callback (wheel thread): expires the lease unless renewed since."""
+        shard = self._shard(username)
+        try:
+            with shard.lock:
+                if shard.leases.get(username) is not lease:
+                    return
+                left = lease.expires - time.monotonic()
+                if left > 0:
+                    self._schedule(username, lease, left)
+                    return
+                del shard.leases[username]
+                self.store.remove_peer(username, flush=False)
+                self.expired += 1
+            if self._flush_timer is None:
+                self._flush_timer = self._wheel.schedule(0, self._flush_expired)
+            if self.expired % LOG_EVERY == 1:
+                print("[Presence] Leases: {}".format(self.stats()))
+        except Exception as e:
+            print("[Presence] Expiring '{}' failed: {}".format(username, e))
+
+    def _flush_expired(self):
+        """Timer callback (wheel thread): one log flush for the leases
+        expired during the previous tick."""
+        self._flush_timer = None
+        try:
+            self.store.flush()
+        except Exception as e:
+            print("[Presence] Flushing expirations failed: {}".format(e))
+
+    def stats(self):
+        """
+        Returns lease counters.
+
+        :rtype dict: active and expired leases, pending wheel timers.
+        """
+        return {
+            'active': sum(len(shard.leases) for shard in self._shards),
+            'expired': self.expired,
+            'timers': len(self._wheel),
+        }
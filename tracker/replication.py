@@ -0,0 +1,382 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.replication
+~~~~~~~~~~~~~~~~~
+
+This module replicates the tracker state from one leader to followers, so
+the read endpoints (``/get-list``, ``/get-channels``, ``/watch``...) can be
+served by every backend of the pool.
+
+- The **leader** is the tracker logging its mutations (``--data-dir``).
+  :class:`ReplicationSource` keeps the last ``backlog`` durable log records
+  in memory, published by the log's group commits, and serves them over
+  HTTP: ``GET /replication/stream?from=<LSN>`` streams the records from
+  ``LSN`` on as WAL frames (an empty frame is a heartbeat) and answers
+  ``410`` when ``LSN`` left the backlog; ``GET /replication/snapshot``
+  sends the whole state and, in ``X-Replication-LSN``, where the stream
+  continues after it. Both require the shared token in
+  :data:`TOKEN_HEADER`.
+- A **follower** (:class:`ReplicaFollower`) loads a snapshot, then applies
+  the streamed records in LSN order. A broken stream is reopened from the
+  follower's position; a ``410`` makes it load a new snapshot. Its store
+  updates change logs and watchers exactly as the leader's does.
+- Writes reaching a follower are forwarded to the leader; the follower then
+  waits until it applied everything the leader had published, so a client
+  reading after its write sees it (read-your-writes).
+
+Replication is asynchronous: a record is sent once it is durable on the
+leader, so followers lag by about one group commit.
+
+Usage Example:
+--------------
+>>> source = ReplicationSource(store, persistence.wal)      # leader
+>>> follower = ReplicaFollower(store, '127.0.0.1', 8000)    # follower
+>>> follower.start()
+"""
+
+import collections
+import itertools
+import json
+import socket
+import threading
+import time
+
+from .persistence import decode_snapshot
+from .wal import read_frames
+
+#: Default number of recent records the leader keeps for followers catching up.
+DEFAULT_BACKLOG = 100000
+
+#: Seconds between two heartbeats on an idle stream.
+HEARTBEAT_INTERVAL = 5.0
+
+#: Seconds without data (heartbeats included) before a follower reconnects.
+STREAM_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+#: Seconds a follower waits before reconnecting to the leader.
+RETRY_DELAY = 1.0
+
+#: Seconds a forwarded write waits for the follower to catch up.
+DEFAULT_READ_YOUR_WRITES = 2.0
+
+#: Header carrying the shared replication token; the leader refuses
+#: replication requests without it (the snapshot holds every password).
+TOKEN_HEADER = 'X-Replication-Token'
+
+# An empty WAL frame: length 0, and the CRC32 of no bytes is 0
+_HEARTBEAT = b'\x00' * 8
+
+
+class ReplicationSource:
+    """
+    Leader side: recent durable log records, for the followers.
+
+    :attrs store (TrackerStore): the replicated store.
+    :attrs wal (WriteAheadLog): its log; its ``on_commit`` feeds the backlog.
+    :attrs backlog (int): records kept in memory.
+    """
+
+    def __init__(self, store, wal, backlog=DEFAULT_BACKLOG):
+        self.store = store
+        self.wal = wal
+        self.backlog = backlog
+        self._frames = collections.deque(maxlen=backlog)
+        self._next = wal.next_lsn
+        self._cond = threading.Condition(threading.Lock())
+        wal.on_commit = self._publish
+
+    def _publish(self, first, frames):
+        """Log commit callback: appends a durable group to the backlog."""
+        with self._cond:
+            if first != self._next:
+                # Records committed before the source was attached
+                self._frames.clear()
+                self._next = first
+            self._frames.extend(frames)
+            self._next += len(frames)
+            self._cond.notify_all()
+
+    def position(self):
+        """
+        Returns the LSN the next published record gets.
+
+        :rtype int: every record before it is durable and in the store.
+        """
+        with self._cond:
+            return self._next
+
+    def available(self, lsn):
+        """
+        Tells whether a follower can stream from ``lsn``.
+
+        :rtype bool: ``False`` when ``lsn`` left the backlog (or is in the
+                     future): the follower needs a snapshot.
+        """
+        with self._cond:
+            return self._next - len(self._frames) <= lsn <= self._next
+
+    def stream(self, lsn, running=None, heartbeat=HEARTBEAT_INTERVAL):
+        """
+        Yields the frames of the records from ``lsn`` on, as they are
+        published, or a heartbeat frame after ``heartbeat`` idle seconds.
+        Ends when the reader falls out of the backlog, or when ``running()``
+        turns false (so a shutting down leader does not wait for it).
+
+        :rtype generator: ``bytes`` chunks of whole frames.
+        """
+        while running is None or running():
+            with self._cond:
+                if self._next == lsn:
+                    self._cond.wait(heartbeat)
+                if lsn < self._next - len(self._frames):
+                    print("[Replication] Follower at LSN {} fell behind the backlog".format(lsn))
+                    return
+                count = self._next - lsn
+                # Newest first: a follower keeping up only walks its tail
+                frames = list(itertools.islice(reversed(self._frames), count))
+            if not frames:
+                yield _HEARTBEAT
+                continue
+            frames.reverse()
+            lsn += count
+            yield b''.join(frames)
+
+    def snapshot(self):
+        """
+        Dumps the store for a follower (re)starting.
+
+        :rtype tuple: ``(LSN, state)``; every record before ``LSN`` is in the
+                      state, later ones may be too (replaying them is harmless).
+        """
+        lsn = self.position()
+        return lsn, self.store.dump()
+
+
+def _request(host, port, method, path, body=b'', headers=None, timeout=STREAM_TIMEOUT):
+    """
+    Sends an HTTP/1.1 request and reads the response head.
+
+    :rtype tuple: ``(socket, status, headers, data)`` where ``headers`` has
+                  lower-case names and ``data`` is the start of the body.
+    """
+    sock = socket.create_connection((host, port), timeout=timeout)
+    try:
+        lines = ["{} {} HTTP/1.1".format(method, path),
+                 "Host: {}:{}".format(host, port),
+                 "Content-Length: {}".format(len(body)),
+                 "Connection: close"]
+        for name, value in (headers or {}).items():
+            lines.append("{}: {}".format(name, value))
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+
+        data = b''
+        while b'\r\n\r\n' not in data:
+            chunk = sock.recv(65536)
+            if not chunk:
+                raise OSError("connection closed before the response head")
+            data += chunk
+        head, data = data.split(b'\r\n\r\n', 1)
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        fields = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            fields[name.strip().lower()] = value.strip()
+        return sock, status, fields, data
+    except BaseException:
+        sock.close()
+        raise
+
+
+def _read_body(sock, headers, data):
+    """Reads the rest of a body, by ``Content-Length`` or until EOF."""
+    length = headers.get('content-length')
+    chunks = [data]
+    size = len(data)
+    while length is None or size < int(length):
+        chunk = sock.recv(1 << 20)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks)
+
+
+class ReplicaFollower:
+    """
+    Follower side: keeps a store in sync with the leader's.
+
+    :attrs store (TrackerStore): the local copy.
+    :attrs host (str): leader address.
+    :attrs port (int): leader port.
+    :attrs token (str): shared replication token the leader requires.
+    :attrs read_your_writes (float): seconds a forwarded write waits for
+                                     the follower to apply it.
+    :attrs lsn (int): LSN of the next record to apply.
+    :attrs applied (int): records applied so far.
+    :attrs resyncs (int): snapshots loaded so far.
+    """
+
+    def __init__(self, store, host, port, token=None, read_your_writes=DEFAULT_READ_YOUR_WRITES):
+        self.store = store
+        self.host = host
+        self.port = int(port)
+        self.token = token
+        self.read_your_writes = read_your_writes
+        self.lsn = None
+        self.applied = 0
+        self.resyncs = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _headers(self):
+        return {TOKEN_HEADER: self.token} if self.token else {}
+
+    def start(self):
+        """Loads a first snapshot (retrying until the leader answers), then
+        follows the leader's stream in a background thread."""
+        while True:
+            try:
+                self._resync()
+                break
+            except (OSError, ValueError) as e:
+                print("[Replica] Leader {}:{} unavailable: {}".format(self.host, self.port, e))
+                time.sleep(RETRY_DELAY)
+        self._thread = threading.Thread(target=self._run, name="ReplicaFollower", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops following (the stream is dropped at its next heartbeat)."""
+        self._stop_event.set()
+
+    def _resync(self):
+        """Replaces the store's content with a snapshot of the leader."""
+        started = time.monotonic()
+        sock, status, headers, data = _request(self.host, self.port, 'GET', '/replication/snapshot',
+                                               headers=self._headers())
+        try:
+            if status != 200:
+                raise OSError("snapshot refused with status {}".format(status))
+            lsn = int(headers['x-replication-lsn'])
+            state = decode_snapshot(_read_body(sock, headers, data))
+        finally:
+            sock.close()
+        if state is None:
+            raise ValueError("invalid snapshot")
+
+        if self.lsn is None:
+            self.store.load(state)
+        else:
+            # Reads go on meanwhile: swap the whole state in at once
+            self.store.replace(state)
+        with self._cond:
+            self.lsn = lsn
+            self.resyncs += 1
+            self._cond.notify_all()
+        print("[Replica] Loaded snapshot at LSN {} from {}:{} in {:.3f}s".format(
+            lsn, self.host, self.port, time.monotonic() - started))
+
+    def _follow(self):
+        """Applies the leader's stream until it breaks."""
+        sock, status, headers, data = _request(self.host, self.port, 'GET',
+                                               '/replication/stream?from={}'.format(self.lsn),
+                                               headers=self._headers())
+        try:
+            if status == 410:
+                self._resync()
+                return
+            if status != 200:
+                raise OSError("stream refused with status {}".format(status))
+            print("[Replica] Following {}:{} from LSN {}".format(self.host, self.port, self.lsn))
+            buffer = bytearray(data)
+            while not self._stop_event.is_set():
+                records, used = read_frames(bytes(buffer))
+                del buffer[:used]
+                records = [record for record in records if record is not None]
+                for record in records:
+                    self.store.apply(record)
+                if records:
+                    with self._cond:
+                        self.lsn += len(records)
+                        self.applied += len(records)
+                        self._cond.notify_all()
+                chunk = sock.recv(1 << 20)
+                if not chunk:
+                    raise OSError("leader closed the stream")
+                buffer += chunk
+        finally:
+            sock.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._follow()
+            except Exception as e:
+                print("[Replica] Stream from {}:{} broke: {}".format(self.host, self.port, e))
+                self._stop_event.wait(RETRY_DELAY)
+
+    def wait(self, lsn, timeout):
+        """
+        Waits until the records before ``lsn`` are applied.
+
+        :rtype bool: ``False`` on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.lsn >= lsn, timeout)
+
+    def forward(self, path, body):
+        """
+        Sends a write to the leader, then waits to have applied it.
+
+        :param path (str): the write endpoint.
+        :param body (str): its JSON body.
+
+        :rtype dict: the leader's answer, or a 503 error.
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        try:
+            sock, status, headers, data = _request(self.host, self.port, 'POST', path, body or b'',
+                                                   {'Content-Type': 'application/json'})
+            try:
+                result = json.loads(_read_body(sock, headers, data))
+            finally:
+                sock.close()
+            sock, status, headers, data = _request(self.host, self.port, 'GET', '/replication/position',
+                                                   headers=self._headers())
+            try:
+                position = json.loads(_read_body(sock, headers, data))['lsn']
+            finally:
+                sock.close()
+        except (OSError, ValueError, KeyError) as e:
+            return {'status': 503, 'message': 'Leader unavailable: {}'.format(e)}
+
+        if not self.wait(position, self.read_your_writes):
+            print("[Replica] Forwarded {} not applied after {}s".format(path, self.read_your_writes))
+        return result
+
+    def stats(self):
+        """
+        Returns the follower counters.
+
+        :rtype dict: leader, next LSN, records applied, snapshots loaded.
+        """
+        with self._cond:
+            return {
+                'leader': '{}:{}'.format(self.host, self.port),
+                'lsn': self.lsn,
+                'applied': self.applied,
+                'resyncs': self.resyncs,
+            }
@@ -0,0 +1,100 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.rwlock
+~~~~~~~~~~~~~~~~~
+
+This module provides a readers-writer lock: any number of readers hold it
+together, a writer holds it alone.
+
+Writers are preferred: once a writer waits, new readers queue behind it, so
+constant polling (readers) cannot starve registrations and logins (writers).
+
+Usage Example:
+--------------
+>>> lock = RWLock()
+>>> with lock.reading():
+...     snapshot = dict(peers)
+>>> with lock.writing():
+...     peers[username] = address
+"""
+
+import threading
+
+
+class _Guard:
+    """Reusable context manager calling an acquire/release pair."""
+
+    __slots__ = ('_acquire', '_release')
+
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._release()
+
+
+class RWLock:
+    """
+    Writer-preferring readers-writer lock (not reentrant).
+
+    :attrs readers (int): readers holding the lock.
+    """
+
+    def __init__(self):
+        self.readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._reading = _Guard(self.acquire_read, self.release_read)
+        self._writing = _Guard(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self.readers -= 1
+            if not self.readers and self._waiting_writers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self.readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def reading(self):
+        """Returns a context manager holding the lock shared."""
+        return self._reading
+
+    def writing(self):
+        """Returns a context manager holding the lock exclusively."""
+        return self._writing
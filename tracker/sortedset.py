@@ -0,0 +1,114 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.sortedset
+~~~~~~~~~~~~~~~~~
+
+This module provides :class:`SortedSet`, the index of the online members of
+a channel: a set for membership tests plus a sorted list of the same keys,
+so a page of a listing is found by binary search and costs O(log n + page
+size) instead of sorting or scanning the whole channel.
+
+Keeping the list sorted costs one ``bisect`` and one ``list.insert`` (or
+``del``) per change: O(n) in theory, but a single ``memmove`` of pointers,
+a few microseconds even for 100,000 members.
+
+Pagination is by key (keyset): the cursor is the last key returned, so a
+page stays correct while members come and go between two requests; a key
+added before the cursor is simply not seen by that walk.
+
+Usage Example:
+--------------
+>>> online = SortedSet(['carol', 'alice', 'bob'])
+>>> online.page(limit=2)
+(['alice', 'bob'], True)
+>>> online.page(after='bob', limit=2)
+(['carol'], False)
+>>> online.page(prefix='b')
+(['bob'], False)
+"""
+
+import bisect
+
+
+class SortedSet:
+    """
+    Set of strings iterated in sorted order.
+
+    :attrs keys (list): the members, sorted; read-only for callers.
+    """
+
+    __slots__ = ('keys', '_members')
+
+    def __init__(self, members=()):
+        self._members = set(members)
+        self.keys = sorted(self._members)
+
+    def __contains__(self, key):
+        return key in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def add(self, key):
+        if key not in self._members:
+            self._members.add(key)
+            bisect.insort(self.keys, key)
+
+    def discard(self, key):
+        if key in self._members:
+            self._members.discard(key)
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def update(self, keys):
+        self._members.update(keys)
+        self.keys = sorted(self._members)
+
+    def clear(self):
+        self._members.clear()
+        self.keys = []
+
+    def page(self, after=None, limit=None, prefix=''):
+        """
+        Returns the members after a cursor, in order.
+
+        :param after (str): cursor, the last key of the previous page
+                            (``None`` for the first page).
+        :param limit (int): page size, ``None`` for everything left.
+        :param prefix (str): only keys starting with it.
+
+        :rtype tuple: ``(keys, more)``, ``more`` telling whether matching
+                      keys follow the page.
+        """
+        keys = self.keys
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(keys, after)
+        stop = len(keys)
+        if prefix:
+            # Keys sharing a prefix are contiguous: truncated to the prefix
+            # length, the sorted keys are still sorted
+            start = max(start, bisect.bisect_left(keys, prefix))
+            size = len(prefix)
+            low, stop = start, len(keys)
+            while low < stop:
+                middle = (low + stop) // 2
+                if keys[middle][:size] <= prefix:
+                    low = middle + 1
+                else:
+                    stop = middle
+        end = stop if limit is None else min(stop, start + limit)
+        return keys[start:end], end < stop
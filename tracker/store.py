@@ -0,0 +1,573 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.store
+~~~~~~~~~~~~~~~~~
+
+This module provides the in-memory state of the tracker: registered users,
+online peers and chat channels.
+
+Each structure has its own :class:`RWLock <RWLock>` instead of one global
+lock, and channels are spread over ``shards`` independently locked shards
+(by hash of the channel name):
+
+- readers (peer lists, channel scans) never block each other;
+- a login only touches the users lock, a ``submit-info`` the peers lock and
+  the shard of ``general``, so neither waits for a scan of the channels;
+- joins and leaves of different channels rarely share a shard.
+
+Membership is indexed both ways and kept up to date on every join, leave,
+``submit-info`` and logout, so no request scans all channels:
+
+- user -> channels, so a peer going online or offline only visits its own
+  channels (logout is O(channels of the user));
+- channel -> members and channel -> online members, so channel listings
+  cost O(size of the result); the online members are kept sorted, so a
+  page of a listing (:meth:`TrackerStore.online_page`) costs O(page size).
+
+Each channel also keeps a :class:`ChangeLog <ChangeLog>` of its online
+members, so a client polling a peer list can fetch only what changed since
+the version of its previous answer (:meth:`TrackerStore.online_delta`), or
+block until something changes (:meth:`TrackerStore.wait_delta`).
+
+A user is in the online members of a channel exactly when it is a member
+and an online peer. Whatever changes one of the two re-evaluates that rule
+under the channel's shard lock, reading the other side there; a shard lock
+may therefore be held while taking the peers lock, never the reverse.
+Results spanning several shards are built shard by shard and may mix
+states a few microseconds apart, which is fine for presence data.
+
+With a :class:`WriteAheadLog <WriteAheadLog>` attached (``store.wal``),
+every mutation is appended to it under the lock that orders it (so the log
+replays in the same order per user and per channel) and the method returns
+once the log is on disk. :meth:`TrackerStore.dump` and
+:meth:`TrackerStore.load` move the whole state to and from a snapshot, and
+:meth:`TrackerStore.apply` replays a logged mutation.
+
+Usage Example:
+--------------
+>>> store = TrackerStore()
+>>> store.register('alice', 'secret')
+>>> store.set_peer('alice', '10.0.0.7', 5001)
+>>> store.join('general', 'alice')
+>>> store.online_members('general')
+{'alice': {'ip': '10.0.0.7', 'port': 5001}}
+"""
+
+import contextlib
+import itertools
+import threading
+import time
+
+from .changelog import ChangeLog, DEFAULT_LOG_SIZE
+from .rwlock import RWLock
+from .sortedset import SortedSet
+
+#: Channel every peer joins when it submits its address; never deleted.
+DEFAULT_CHANNEL = 'general'
+
+#: Default number of channel shards.
+DEFAULT_SHARDS = 16
+
+
+class _ChannelShard:
+    """
+    Channels whose name hashes to one shard, with their lock.
+
+    :attrs members (dict): channel -> set of members.
+    :attrs online (dict): channel -> :class:`SortedSet <SortedSet>` of the
+                          members currently online.
+    :attrs logs (dict): channel -> :class:`ChangeLog <ChangeLog>` of ``online``.
+    :attrs changed (threading.Condition): notified after each change of
+                                          ``logs``, for watchers.
+    """
+
+    __slots__ = ('members', 'online', 'logs', 'lock', 'changed')
+
+    def __init__(self):
+        self.members = {}
+        self.online = {}
+        self.logs = {}
+        self.lock = RWLock()
+        self.changed = threading.Condition(threading.Lock())
+
+
+class TrackerStore:
+    """
+    Users, online peers and channel memberships of the tracker.
+
+    :attrs shards (int): number of channel shards.
+    :attrs log_size (int): changes kept per channel for delta sync.
+    :attrs wal (WriteAheadLog): log of the mutations, ``None`` in memory only.
+    """
+
+    def __init__(self, shards=DEFAULT_SHARDS, log_size=DEFAULT_LOG_SIZE, versions=None):
+        self.shards = max(1, int(shards))
+        self.log_size = log_size
+        self.wal = None
+        # Versions of all channels come from one counter, so they only grow;
+        # starting from the clock keeps them above those of a previous run
+        # (a store built to replace another one continues the other's counter)
+        self._versions = versions or itertools.count(int(time.time() * 1000000))
+        self._users = {}
+        self._users_lock = RWLock()
+        self._peers = {}
+        self._peers_lock = RWLock()
+        self._user_channels = {}
+        self._index_lock = RWLock()
+        self._shards = [_ChannelShard() for _ in range(self.shards)]
+        self._create(self._shard(DEFAULT_CHANNEL), DEFAULT_CHANNEL)
+
+    def _shard(self, channel):
+        return self._shards[hash(channel) % self.shards]
+
+    def _create(self, shard, channel):
+        members = shard.members.get(channel)
+        if members is None:
+            members = shard.members[channel] = set()
+            shard.online[channel] = SortedSet()
+            shard.logs[channel] = ChangeLog(next(self._versions), self.log_size)
+        return members
+
+    def _log(self, *record):
+        """Appends a mutation to the write-ahead log, if any; called under
+        the lock ordering it."""
+        if self.wal is not None:
+            self.wal.append(record)
+
+    def _commit(self):
+        """Waits until the logged mutations are durable; called without locks."""
+        if self.wal is not None:
+            self.wal.flush()
+
+    def _record(self, shard, channel, username, address):
+        """Logs a change of online members and wakes the channel's watchers up."""
+        shard.logs[channel].record(next(self._versions), username, address)
+        with shard.changed:
+            shard.changed.notify_all()
+
+    def _sync(self, shard, channel, username, moved=False):
+        """
+        Re-evaluates whether ``username`` is an online member of ``channel``
+        and logs the change, if any. Called with the shard lock held for writing.
+
+        :param moved (bool): the user changed address while online.
+        """
+        online = shard.online.get(channel)
+        if online is None:
+            return
+        with self._peers_lock.reading():
+            address = self._peers.get(username)
+        was_online = username in online
+        if address is not None and username in shard.members[channel]:
+            online.add(username)
+            if not was_online or moved:
+                self._record(shard, channel, username, address)
+        elif was_online:
+            online.discard(username)
+            self._record(shard, channel, username, None)
+
+    def _sync_channels(self, username, moved=False):
+        """Re-evaluates the online state of a user in each of its channels."""
+        with self._index_lock.reading():
+            channels = list(self._user_channels.get(username, ()))
+        for channel in channels:
+            shard = self._shard(channel)
+            with shard.lock.writing():
+                self._sync(shard, channel, username, moved)
+
+    # --- Users ---------------------------------------------------------------
+
+    def register(self, username, password):
+        """
+        Registers a user.
+
+        :rtype bool: ``False`` when the username is already taken.
+        """
+        with self._users_lock.writing():
+            if username in self._users:
+                return False
+            self._users[username] = password
+            self._log('register', username, password)
+        self._commit()
+        return True
+
+    def check_password(self, username, password):
+        """Tells whether ``password`` is the one ``username`` registered with."""
+        with self._users_lock.reading():
+            return username in self._users and self._users[username] == password
+
+    # --- Online peers --------------------------------------------------------
+
+    def set_peer(self, username, ip, port, flush=True):
+        """
+        Marks a user online at ``ip:port``.
+
+        :param flush (bool): wait until the change is durable; when false,
+                             the caller does with :meth:`flush` (e.g. after
+                             releasing its own locks, once for a batch).
+        """
+        address = {'ip': ip, 'port': port}
+        with self._peers_lock.writing():
+            previous = self._peers.get(username)
+            self._peers[username] = address
+            if previous != address:
+                self._log('peer', username, ip, port)
+        if previous != address:
+            self._sync_channels(username, moved=previous is not None)
+            if flush:
+                self._commit()
+
+    def remove_peer(self, username, flush=True):
+        """
+        Marks a user offline.
+
+        :param flush (bool): as for :meth:`set_peer`.
+
+        :rtype bool: ``False`` when the user was not online.
+        """
+        with self._peers_lock.writing():
+            removed = self._peers.pop(username, None) is not None
+            if removed:
+                self._log('unpeer', username)
+        if removed:
+            self._sync_channels(username)
+            if flush:
+                self._commit()
+        return removed
+
+    def flush(self):
+        """Waits until the mutations made with ``flush=False`` are durable."""
+        self._commit()
+
+    def peers(self, usernames=None):
+        """
+        Returns the addresses of online peers.
+
+        :param usernames (iterable): restricts the result to these users.
+
+        :rtype dict: username -> ``{'ip': ..., 'port': ...}``.
+        """
+        with self._peers_lock.reading():
+            if usernames is None:
+                return dict(self._peers)
+            peers = self._peers
+            return {user: peers[user] for user in usernames if user in peers}
+
+    # --- Channels ------------------------------------------------------------
+
+    def join(self, channel, username):
+        """Adds a user to a channel, creating the channel if needed."""
+        self.join_many([channel], username)
+
+    def join_many(self, channels, username):
+        """
+        Adds a user to several channels (created if needed) with one
+        acquisition of each shard lock involved and one log flush.
+        """
+        by_shard = {}
+        for channel in channels:
+            by_shard.setdefault(self._shard(channel), []).append(channel)
+        joined = False
+        for shard, names in by_shard.items():
+            with shard.lock.writing():
+                # Index under the shard lock, so a concurrent leave of the same
+                # user cannot interleave; before the sync, so a concurrent
+                # set_peer either sees the channels or has already changed the
+                # peers that the sync below reads
+                self._index_add(username, names)
+                for channel in names:
+                    members = self._create(shard, channel)
+                    if username not in members:
+                        members.add(username)
+                        self._log('join', channel, username)
+                        joined = True
+                    self._sync(shard, channel, username)
+        if joined:
+            self._commit()
+
+    def _index_add(self, username, channels):
+        """Adds channels to the index of a user; called with their shard lock held."""
+        with self._index_lock.writing():
+            self._user_channels.setdefault(username, set()).update(channels)
+
+    def _index_discard(self, username, channel):
+        """Drops a channel from the index of a user; called with its shard lock held."""
+        with self._index_lock.writing():
+            channels = self._user_channels.get(username)
+            if channels is not None:
+                channels.discard(channel)
+                if not channels:
+                    del self._user_channels[username]
+
+    def _remove_member(self, shard, channel, username, delete_empty):
+        """Removes a member with the shard lock held."""
+        members = shard.members.get(channel)
+        if members is None or username not in members:
+            return False
+        members.discard(username)
+        self._log('leave', channel, username, delete_empty)
+        if username in shard.online[channel]:
+            shard.online[channel].discard(username)
+            self._record(shard, channel, username, None)
+        if delete_empty and not members and channel != DEFAULT_CHANNEL:
+            del shard.members[channel]
+            del shard.online[channel]
+            del shard.logs[channel]
+            with shard.changed:
+                shard.changed.notify_all()
+        return True
+
+    def leave(self, channel, username, delete_empty=True):
+        """
+        Removes a user from a channel; an emptied channel other than
+        :data:`DEFAULT_CHANNEL` is deleted unless ``delete_empty`` is false.
+
+        :rtype bool: ``False`` when the user was not in the channel.
+        """
+        shard = self._shard(channel)
+        with shard.lock.writing():
+            left = self._remove_member(shard, channel, username, delete_empty)
+            if left:
+                self._index_discard(username, channel)
+        if left:
+            self._commit()
+        return left
+
+    def leave_all(self, username):
+        """
+        Removes a user from each of its channels, in O(channels of the user).
+        The channels themselves are kept, even when emptied.
+
+        :rtype list: the channels the user was in.
+        """
+        with self._index_lock.reading():
+            channels = list(self._user_channels.get(username, ()))
+        left = []
+        for channel in channels:
+            shard = self._shard(channel)
+            with shard.lock.writing():
+                if self._remove_member(shard, channel, username, False):
+                    self._index_discard(username, channel)
+                    left.append(channel)
+        if left:
+            self._commit()
+        return left
+
+    def is_member(self, channel, username):
+        """
+        Tells whether a user is a member of a channel.
+
+        :rtype bool: ``None`` when the channel does not exist.
+        """
+        shard = self._shard(channel)
+        with shard.lock.reading():
+            members = shard.members.get(channel)
+            return None if members is None else username in members
+
+    def online_by_channel(self):
+        """
+        Returns the online members of every channel.
+
+        :rtype dict: channel -> list of online members.
+        """
+        result = {}
+        for shard in self._shards:
+            with shard.lock.reading():
+                for channel, online in shard.online.items():
+                    result[channel] = list(online)
+        return result
+
+    def online_members(self, channel):
+        """
+        Returns the online members of a channel with their addresses.
+
+        :rtype dict: username -> address, ``None`` if the channel does not exist.
+        """
+        shard = self._shard(channel)
+        with shard.lock.reading():
+            online = shard.online.get(channel)
+            if online is None:
+                return None
+            online = list(online)
+        return self.peers(online)
+
+    def online_page(self, channel, after=None, limit=None, prefix=''):
+        """
+        Returns a page of the online members of a channel, in username order.
+
+        :param channel (str): channel name.
+        :param after (str): last username of the previous page, ``None`` first.
+        :param limit (int): page size, ``None`` for everything left.
+        :param prefix (str): only usernames starting with it.
+
+        :rtype dict: ``{'version', 'peers', 'more'}``, ``peers`` mapping
+                     username -> address in order; ``None`` if the channel
+                     does not exist.
+        """
+        shard = self._shard(channel)
+        with shard.lock.reading():
+            log = shard.logs.get(channel)
+            if log is None:
+                return None
+            version = log.version
+            names, more = shard.online[channel].page(after, limit, prefix)
+        return {'version': version, 'peers': self.peers(names), 'more': more}
+
+    def online_delta(self, channel, since=None):
+        """
+        Returns the online members of a channel as a versioned snapshot, or
+        as the changes since the version a client already has.
+
+        :param channel (str): channel name.
+        :param since (int): version of the client's copy, ``None`` for a snapshot.
+
+        :rtype dict: ``{'version', 'full': True, 'peers'}`` for a snapshot,
+                     ``{'version', 'full': False, 'changed', 'removed'}`` for
+                     a delta; ``None`` if the channel does not exist.
+        """
+        shard = self._shard(channel)
+        with shard.lock.reading():
+            log = shard.logs.get(channel)
+            if log is None:
+                return None
+            version = log.version
+            delta = log.since(since) if since is not None else None
+            if delta is None:
+                online = list(shard.online[channel])
+        if delta is not None:
+            changed, removed = delta
+            return {'version': version, 'full': False, 'changed': changed, 'removed': removed}
+        return {'version': version, 'full': True, 'peers': self.peers(online)}
+
+    def wait_delta(self, channel, since, timeout):
+        """
+        Blocks until the online members of a channel change after ``since``
+        (or the channel is deleted), then answers like :meth:`online_delta`.
+        A ``since`` this store did not issue is answered at once.
+
+        :param channel (str): channel name.
+        :param since (int): version of the client's copy.
+        :param timeout (float): seconds to wait at most; the answer is then
+                                an empty delta.
+
+        :rtype dict: as :meth:`online_delta`, ``None`` if the channel does not exist.
+        """
+        shard = self._shard(channel)
+        deadline = time.monotonic() + timeout
+        with shard.changed:
+            # Checked without the shard lock (never taken inside ``changed``):
+            # a dict lookup and an int read are atomic, and a change made
+            # after the check cannot notify before wait() releases ``changed``
+            # Only a client exactly at the current version waits: one ahead of
+            # the log (a version from another replica or run) gets a snapshot
+            log = shard.logs.get(channel)
+            while log is not None and log is shard.logs.get(channel) and log.version == since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                shard.changed.wait(remaining)
+        return self.online_delta(channel, since)
+
+    # --- Persistence ---------------------------------------------------------
+
+    def dump(self):
+        """
+        Copies the durable state, structure by structure and shard by shard:
+        mutations running meanwhile may or may not be included, so a
+        snapshot of it is completed by replaying the log from before the
+        dump started.
+
+        :rtype dict: ``users`` (username -> password), ``peers`` (username
+                     -> ``(ip, port)``) and ``channels`` (channel -> list
+                     of members).
+        """
+        with self._users_lock.reading():
+            users = dict(self._users)
+        with self._peers_lock.reading():
+            peers = {user: (address['ip'], address['port']) for user, address in self._peers.items()}
+        channels = {}
+        for shard in self._shards:
+            with shard.lock.reading():
+                for channel, members in shard.members.items():
+                    channels[channel] = list(members)
+        return {'users': users, 'peers': peers, 'channels': channels}
+
+    def replace(self, state):
+        """
+        Replaces the whole content with :meth:`dump` output (e.g. a newer
+        snapshot) while the store serves requests: the new content is built
+        aside, then swapped in with every lock held, so a reader sees either
+        the old state or the new one. Channel versions keep growing, so
+        watchers get full snapshots next.
+        """
+        fresh = TrackerStore(self.shards, self.log_size, self._versions)
+        fresh.load(state)
+        with contextlib.ExitStack() as stack:
+            # Shards before the index and peers locks, as everywhere else
+            for shard in self._shards:
+                stack.enter_context(shard.lock.writing())
+            stack.enter_context(self._index_lock.writing())
+            stack.enter_context(self._peers_lock.writing())
+            stack.enter_context(self._users_lock.writing())
+            self._users = fresh._users
+            self._peers = fresh._peers
+            self._user_channels = fresh._user_channels
+            for shard, built in zip(self._shards, fresh._shards):
+                shard.members = built.members
+                shard.online = built.online
+                shard.logs = built.logs
+        for shard in self._shards:
+            with shard.changed:
+                shard.changed.notify_all()
+
+    def load(self, state):
+        """
+        Fills an empty store from :meth:`dump` output, before it serves
+        requests (nothing is locked or logged); see :meth:`replace` after.
+        """
+        self._users.update(state['users'])
+        peers = self._peers
+        for user, (ip, port) in state['peers'].items():
+            peers[user] = {'ip': ip, 'port': port}
+        index = self._user_channels
+        for channel, members in state['channels'].items():
+            shard = self._shard(channel)
+            self._create(shard, channel).update(members)
+            shard.online[channel].update(user for user in members if user in peers)
+            for user in members:
+                channels = index.get(user)
+                if channels is None:
+                    channels = index[user] = set()
+                channels.add(channel)
+
+    def apply(self, record):
+        """
+        Replays a mutation read back from the write-ahead log. Mutations
+        are idempotent, so replaying one already in a snapshot is harmless.
+
+        :param record (tuple): operation name and arguments.
+        """
+        op = record[0]
+        if op == 'register':
+            self.register(record[1], record[2])
+        elif op == 'peer':
+            self.set_peer(record[1], record[2], record[3])
+        elif op == 'unpeer':
+            self.remove_peer(record[1])
+        elif op == 'join':
+            self.join(record[1], record[2])
+        elif op == 'leave':
+            self.leave(record[1], record[2], record[3])
+        else:
+            raise ValueError("unknown log record {!r}".format(op))
@@ -0,0 +1,311 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+tracker.wal
+~~~~~~~~~~~~~~~~~
+
+This module provides the write-ahead log of the tracker: every mutation of
+the store is appended to it before the request that made it is answered.
+
+- **Framing**: a record is ``length``, ``crc32`` (both 32-bit little
+  endian) and a pickled tuple of builtin values. A torn or corrupt record
+  ends its segment on replay; it was never acknowledged.
+- **Group commit**: :meth:`WriteAheadLog.append` only queues the record in
+  memory; one flusher thread writes everything queued and fsyncs it in a
+  single ``write`` + ``fsync``. :meth:`WriteAheadLog.flush` waits for the
+  records appended so far, so concurrent writers share each fsync instead
+  of paying one each.
+- **Segments**: records are numbered from 1 (the LSN) and stored in files
+  ``wal-<first LSN>.log``. :meth:`WriteAheadLog.rotate` starts a new
+  segment, so a snapshot can cover everything before it and the older
+  segments can be deleted.
+
+Usage Example:
+--------------
+>>> wal = WriteAheadLog("data/tracker", next_lsn=1)
+>>> wal.append(('register', 'alice', 'secret'))
+>>> wal.flush()
+>>> for lsn, record in read_records("data/tracker", 1):
+...     print(lsn, record)
+"""
+
+import io
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+
+#: Frame header of a record: payload length and CRC32.
+_HEADER = struct.Struct('<II')
+
+_SEGMENT = re.compile(r'^wal-(\d{20})\.log$')
+
+
+class _BuiltinsOnly(pickle.Unpickler):
+    """Unpickler refusing anything but builtin values, so a log or snapshot
+    file cannot make the tracker import or call arbitrary code."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError("global '{}.{}' is forbidden".format(module, name))
+
+
+def loads(data):
+    """Unpickles builtin values only (tuples, lists, dicts, str, int...)."""
+    return _BuiltinsOnly(io.BytesIO(data)).load()
+
+
+def _segment_name(lsn):
+    return 'wal-{:020d}.log'.format(lsn)
+
+
+def segments(directory):
+    """
+    Lists the log segments of a directory.
+
+    :rtype list: ``(first LSN, path)`` pairs in LSN order.
+    """
+    found = []
+    for name in os.listdir(directory):
+        match = _SEGMENT.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def read_frames(data):
+    """
+    Decodes the complete records at the start of ``data``.
+
+    :param data (bytes): concatenated frames, possibly ending with a partial one.
+
+    :rtype tuple: ``(records, consumed)``, the decoded records and the
+                  number of bytes they took.
+    :raises ValueError: when a complete frame fails its CRC.
+    """
+    records = []
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, offset)
+        end = offset + _HEADER.size + length
+        if end > len(data):
+            break
+        payload = data[offset + _HEADER.size:end]
+        if zlib.crc32(payload) != crc:
+            raise ValueError("corrupt record at offset {}".format(offset))
+        records.append(loads(payload) if length else None)
+        offset = end
+    return records, offset
+
+
+def read_records(directory, start):
+    """
+    Reads back the records of the segments starting at or after ``start``.
+
+    A short or corrupt record ends its segment (the write it belonged to
+    was never acknowledged); reading stops at a gap between segments.
+
+    :param directory (str): log directory.
+    :param start (int): LSN of the first record wanted.
+
+    :rtype generator: ``(lsn, record)`` pairs.
+    """
+    expected = start
+    for first, path in segments(directory):
+        if first < start:
+            continue
+        if first != expected:
+            print("[WAL] Segment {} does not follow LSN {}, ignoring the rest".format(path, expected - 1))
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            yield expected, loads(payload)
+            expected += 1
+            offset += _HEADER.size + length
+        if offset < len(data):
+            print("[WAL] Torn record at offset {} of {}, {} byte(s) dropped".format(
+                offset, path, len(data) - offset))
+
+
+def fsync_directory(directory):
+    """Makes file creations and renames in ``directory`` durable."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Append-only, group-committed log of store mutations.
+
+    :attrs directory (str): directory of the segments.
+    :attrs fsync (bool): fsync each group; without it a commit survives a
+                         process crash but not a power loss.
+    :attrs next_lsn (int): LSN the next appended record gets.
+    :attrs segment_start (int): first LSN of the current segment.
+    :attrs commits (int): groups written so far.
+    :attrs records (int): records written so far.
+    :attrs on_commit (callable): called on the flusher thread after each
+                                 group is durable, with the LSN of its first
+                                 record and the list of its frames.
+    """
+
+    def __init__(self, directory, next_lsn=1, fsync=True):
+        self.directory = directory
+        self.fsync = fsync
+        self.next_lsn = next_lsn
+        self.commits = 0
+        self.records = 0
+        self.on_commit = None
+        self._pending = []
+        self._durable = next_lsn - 1
+        self._error = None
+        self._closed = False
+        self._rotating = False
+        self._cond = threading.Condition(threading.Lock())
+        os.makedirs(directory, exist_ok=True)
+        self._open_segment(next_lsn)
+        self._flusher = threading.Thread(target=self._run, name="WALFlusher", daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self, lsn):
+        self.segment_start = lsn
+        # A segment with this name can only hold a torn record (no record
+        # of it was replayed), so it is truncated
+        self._file = open(os.path.join(self.directory, _segment_name(lsn)), 'wb')
+        fsync_directory(self.directory)
+
+    def append(self, record):
+        """
+        Queues a record; durable after the next :meth:`flush`.
+
+        :param record (tuple): builtin values only.
+
+        :rtype int: LSN of the record.
+        """
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        frame = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            while self._rotating:
+                self._cond.wait()
+            if self._closed:
+                raise ValueError("write-ahead log is closed")
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            self._pending.append(frame)
+            if len(self._pending) == 1:
+                self._cond.notify_all()
+            return lsn
+
+    def flush(self):
+        """
+        Waits until every record appended so far is on disk.
+
+        :raises OSError: when the log could not be written.
+        """
+        with self._cond:
+            target = self.next_lsn - 1
+            while self._durable < target and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+
+    def rotate(self):
+        """
+        Flushes and starts a new segment.
+
+        :rtype int: first LSN of the new segment; every record before it is
+                    in the older segments.
+        """
+        with self._cond:
+            # Appends wait while the segment changes, so none lands in the old one
+            self._rotating = True
+            try:
+                while self._durable < self.next_lsn - 1:
+                    if self._error is not None:
+                        raise self._error
+                    self._cond.wait()
+                self._file.close()
+                self._open_segment(self.next_lsn)
+                return self.segment_start
+            finally:
+                self._rotating = False
+                self._cond.notify_all()
+
+    def truncate_before(self, lsn):
+        """Deletes the segments holding only records before ``lsn``."""
+        for first, path in segments(self.directory):
+            if first < lsn and first != self.segment_start:
+                os.unlink(path)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch = self._pending
+                self._pending = []
+                last = self.next_lsn - 1
+            try:
+                self._file.write(b''.join(batch))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except OSError as e:
+                print("[WAL] Write failed: {}".format(e))
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable = last
+                self.commits += 1
+                self.records += len(batch)
+                # Before the writers wake up: a record is published by the
+                # time the request that logged it is answered
+                if self.on_commit is not None:
+                    self.on_commit(last - len(batch) + 1, batch)
+                self._cond.notify_all()
+
+    def close(self):
+        """Flushes the pending records and stops the flusher."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._file.close()
+
+    def stats(self):
+        """
+        Returns the group-commit counters.
+
+        :rtype dict: next LSN, groups and records written, records per group.
+        """
+        with self._cond:
+            return {
+                'next_lsn': self.next_lsn,
+                'commits': self.commits,
+                'records': self.records,
+                'per_commit': round(float(self.records) / self.commits, 1) if self.commits else 0,
+            }